@@ -1,30 +1,101 @@
 # backend/app/api/endpoints.py
 import os
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import FileResponse
+import uuid
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 import traceback
 
 # Import services, models, and config
-from app.services import scraper_service, llm_service, s3_service
+from app.services import scraper_service, portfolio_service, batch_service, clone_service, coalescing_service, admission_service, worker_service, profiling_service, artifact_store
+from app.services.job_queue import get_job_queue
 from app.models.pydantic_models import (
     UrlRequest, PortfolioBuildConfig, ScrapedContextResponse, ClonedHtmlFileResponse,
-    GalleryResponse, GalleryItem
+    GalleryResponse, GalleryItem, BatchPortfolioBuildRequest, ClonedFile, Job
 )
-from app.core import config
+from app.core import config, metrics, json_encoding
+from app.core.json_encoding import FastJSONResponse
 
 router = APIRouter()
 
-@router.post("/get-scraped-context", response_model=ScrapedContextResponse, summary="Scrape and Clean Website Context")
-async def get_scraped_context_endpoint(req: UrlRequest):
+async def _clone_website(url: str, force_regenerate: bool = False) -> ClonedFile:
+    if config.EXECUTION_MODE == "queue":
+        return ClonedFile(**await worker_service.submit_and_wait("clone_website", {"url": url, "force_regenerate": force_regenerate}))
+    return await clone_service.clone_website_to_file(url, force_regenerate)
+
+async def _build_portfolio(build_config: PortfolioBuildConfig) -> ClonedHtmlFileResponse:
+    if config.EXECUTION_MODE == "queue":
+        return ClonedHtmlFileResponse(**await worker_service.submit_and_wait("build_portfolio", build_config.model_dump()))
+    return await portfolio_service.build_portfolio(build_config)
+
+# Endpoints that launch browsers or call the LLM are admitted (or shed with 503) up front.
+# Streamed batches are admitted in _stream_batch_results instead.
+admission = [Depends(admission_service.admit_request)]
+
+def _scrape_metadata(url: str, context_data) -> dict:
+    return {"original_url": url, "degraded": context_data.degraded, "missing_artifacts": context_data.missing_artifacts}
+
+async def _artifacts_response(url: str, context_data, request: Request) -> Response:
+    artifact_id, sizes = await artifact_store.save_scrape_artifacts(context_data)
+    base_url_parts = request.url.components
+    base_url = f"{base_url_parts.scheme}://{base_url_parts.netloc}"
+    artifacts = {
+        name: {"url": f"{base_url}/artifacts/{artifact_id}/{name}", "content_type": artifact_store.ARTIFACTS[name][1], "bytes": size}
+        for name, size in sizes.items()
+    }
+    return FastJSONResponse({**_scrape_metadata(url, context_data), "artifact_id": artifact_id, "artifacts": artifacts})
+
+def _multipart_response(url: str, context_data) -> StreamingResponse:
+    """multipart/mixed body: a JSON metadata part, then one raw part per available artifact."""
+    boundary = uuid.uuid4().hex
+
+    def part_header(name: str, content_type: str, length: int, filename: str | None = None) -> bytes:
+        disposition = f'inline; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        return (f"--{boundary}\r\nContent-Type: {content_type}\r\nContent-Disposition: {disposition}\r\n"
+                f"Content-Length: {length}\r\n\r\n").encode("ascii")
+
+    def body():
+        metadata = json_encoding.dumps(_scrape_metadata(url, context_data))
+        yield part_header("metadata", "application/json", len(metadata)) + metadata + b"\r\n"
+        for name in ("desktop_screenshot", "mobile_screenshot"):
+            data = getattr(context_data, f"{name}_base64")
+            if data:
+                file_name, content_type = artifact_store.ARTIFACTS[name]
+                yield part_header(name, content_type, artifact_store.base64_decoded_size(data), file_name)
+                yield from artifact_store.iter_base64_decoded(data)
+                yield b"\r\n"
+        if context_data.simplified_html:
+            html_bytes = context_data.simplified_html.encode("utf-8")
+            file_name, content_type = artifact_store.ARTIFACTS["simplified_html"]
+            yield part_header("simplified_html", content_type, len(html_bytes), file_name) + html_bytes + b"\r\n"
+        yield f"--{boundary}--\r\n".encode("ascii")
+
+    return StreamingResponse(body(), media_type=f"multipart/mixed; boundary={boundary}")
+
+@router.post("/get-scraped-context", response_model=ScrapedContextResponse, response_class=FastJSONResponse, dependencies=admission, summary="Scrape and Clean Website Context")
+async def get_scraped_context_endpoint(
+    req: UrlRequest,
+    request: Request,
+    format: Literal["json", "artifacts", "multipart"] = Query(
+        "json",
+        description="json: everything inline, screenshots as base64. artifacts: metadata with URLs of raw "
+                    "artifacts (GET /artifacts/...). multipart: one multipart/mixed stream with raw parts."
+    ),
+):
     try:
         print(f"Scraping URL for tester context: {req.url}")
         context_data = await scraper_service.scrape_website_context(req.url)
+        if format == "artifacts":
+            return await _artifacts_response(req.url, context_data, request)
+        if format == "multipart":
+            return _multipart_response(req.url, context_data)
         return ScrapedContextResponse(
             desktop_screenshot_base64=context_data.desktop_screenshot_base64,
             mobile_screenshot_base64=context_data.mobile_screenshot_base64,
             simplified_html=context_data.simplified_html,
-            original_url=req.url
+            original_url=req.url,
+            degraded=context_data.degraded,
+            missing_artifacts=context_data.missing_artifacts
         )
     except HTTPException as http_exc:
         raise http_exc
@@ -32,51 +103,38 @@ async def get_scraped_context_endpoint(req: UrlRequest):
         print(f"Unexpected error in /get-scraped-context: {type(e).__name__} - {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred. Error: {str(e)}")
 
-@router.post("/clone-website-and-save", response_model=ClonedHtmlFileResponse, summary="Clone Website and Save HTML to File")
-async def clone_website_and_save_endpoint(req_body: UrlRequest, request: Request):
+@router.get("/artifacts/{artifact_id}/{name}", summary="Fetch a Raw Scrape Artifact")
+async def get_artifact(artifact_id: str, name: str):
+    found = artifact_store.artifact_file(artifact_id, name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired.")
+    path, content_type = found
+    # Artifact sets are write-once, so clients may cache them for as long as they live.
+    return FileResponse(path, media_type=content_type, headers={
+        "Cache-Control": f"private, max-age={config.ARTIFACT_TTL_SECONDS}, immutable",
+        **artifact_store.SECURITY_HEADERS,
+    })
+
+@router.post("/clone-website-and-save", response_model=ClonedHtmlFileResponse, dependencies=admission, summary="Clone Website and Save HTML to File")
+async def clone_website_and_save_endpoint(
+    req_body: UrlRequest,
+    request: Request,
+    force_regenerate: bool = Query(False, description="Regenerate even if the site is unchanged since its last clone."),
+):
     try:
-        print(f"Step 1: Scraping URL for cloning: {req_body.url}")
-        context_data = await scraper_service.scrape_website_context(req_body.url)
-        if not context_data.simplified_html or "failed" in context_data.simplified_html.lower() or "empty" in context_data.simplified_html.lower():
-            raise HTTPException(status_code=422, detail=f"HTML scraping/cleaning failed. HTML: {context_data.simplified_html[:200]}")
-        
-        ENABLE_LLM_CLONING = True
-        llm_generated_html = ""
-
-        if ENABLE_LLM_CLONING:
-            print("Step 2: Generating HTML with LLM...")
-            llm_generated_html = await llm_service.generate_html_with_llm(
-                cleaned_html=context_data.simplified_html,
-                desktop_screenshot_base64=context_data.desktop_screenshot_base64,
-                mobile_screenshot_base64=context_data.mobile_screenshot_base64
-            )
-            print("Step 3: Received HTML from LLM processing.")
-            if not llm_generated_html.strip():
-                 print("Warning: LLM returned an effectively empty HTML string.")
-        else:
-            print("Step 2 & 3: LLM Cloning is disabled. Generating placeholder HTML.")
-            llm_generated_html = f"<html><body><h1>Placeholder for {req_body.url}</h1><p>LLM cloning is currently disabled.</p></body></html>"
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        sanitized_url_part = req_body.url.split('//')[-1].split('/')[0].replace('.', '_').replace(':', '_')
-        filename = f"clone_{sanitized_url_part}_{timestamp}.html"
-        file_path = os.path.join(config.GENERATED_HTML_DIR_PATH, filename)
-        
-        try:
-            with open(file_path, "w", encoding="utf-8") as f: f.write(llm_generated_html)
-            print(f"Successfully saved cloned HTML to: {file_path}")
-        except IOError as e:
-            print(f"Error saving HTML file: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to save generated HTML file. Error: {str(e)}")
-        
+        cloned = await coalescing_service.clone_website_coalescer.run(
+            coalescing_service.url_request_key(req_body, force_regenerate),
+            lambda: _clone_website(req_body.url, force_regenerate)
+        )
+
         base_url_parts = request.url.components
         base_url = f"{base_url_parts.scheme}://{base_url_parts.netloc}"
-        view_link_path = f"{config.STATIC_CLONES_PATH_PREFIX}/{filename}"
+        view_link_path = f"{config.STATIC_CLONES_PATH_PREFIX}/{cloned.filename}"
         view_link = f"{base_url}{view_link_path}"
         
         return ClonedHtmlFileResponse(
-            message="Website cloned and HTML saved." if ENABLE_LLM_CLONING else "Placeholder HTML generated.",
-            file_path=file_path,
+            message=cloned.message,
+            file_path=cloned.file_path,
             view_link=view_link
         )
     except HTTPException as http_exc:
@@ -85,6 +143,34 @@ async def clone_website_and_save_endpoint(req_body: UrlRequest, request: Request
         print(f"Unexpected error in /clone-website-and-save: {type(e).__name__} - {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred. Error: {str(e)}")
 
+@router.get("/metrics", summary="In-Process Service Metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+# Stack traces expose internals: profiles are only served to callers with the admin token.
+profiling_admin = [Depends(profiling_service.require_admin)]
+
+@router.get("/profiles", dependencies=profiling_admin, summary="List Stored Profiles")
+async def list_profiles():
+    return {"profiles": profiling_service.profile_store.list()}
+
+@router.get("/profiles/{profile_id}", dependencies=profiling_admin, summary="Get a Stored Profile")
+async def get_profile(profile_id: str, format: str = "json"):
+    """`format=folded` returns folded stacks as text, ready for flamegraph.pl or speedscope."""
+    profile = profiling_service.profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found.")
+    if format == "folded":
+        return PlainTextResponse(profiling_service.folded_text(profile))
+    return profile
+
+@router.get("/jobs/{job_id}", response_model=Job, response_model_exclude={"payload"}, summary="Get the Status of a Queued Pipeline Job")
+async def get_job(job_id: str):
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
 @router.get("/gallery-items", response_model=GalleryResponse, summary="Get Items for Website Clone Gallery")
 async def get_gallery_items(request: Request):
     items = []
@@ -124,69 +210,18 @@ async def get_test_dashboard():
         raise HTTPException(status_code=404, detail=f"tester.html not found at {tester_path} or alternate.")
     return FileResponse(tester_path)
 
-@router.post("/build-portfolio", response_model=ClonedHtmlFileResponse, summary="Build a Portfolio from a Reference URL and Resume")
+@router.post("/build-portfolio", response_model=ClonedHtmlFileResponse, dependencies=admission, summary="Build a Portfolio from a Reference URL and Resume")
 async def build_portfolio_endpoint(build_config: PortfolioBuildConfig, request: Request):
     """
-    Orchestrates the portfolio building process:
-    1. Scrapes the reference URL for style.
-    2. Parses the user's resume text into structured JSON.
-    3. Generates a new HTML portfolio with the user's data in the reference style.
-    4. Saves the generated HTML and returns a link to it.
+    Builds a portfolio (see portfolio_service.build_portfolio). Concurrent requests with the
+    same normalized reference URL and resume share one pipeline run, and a completed result
+    is reused for COALESCE_RESULT_TTL_SECONDS.
     """
     try:
-        # Step 1: Scrape the reference URL for its style and layout
-        print(f"Step 1: Scraping reference URL: {build_config.reference_url}")
-        scraped_context = await scraper_service.scrape_website_context(build_config.reference_url)
-        if not scraped_context.simplified_html:
-            raise HTTPException(status_code=422, detail="Scraping the reference URL failed. Cannot proceed.")
-        if "Application error: a client-side exception has occurred" in scraped_context.simplified_html:
-            print(f"ERROR: Detected a client-side crash on the reference site: {build_config.reference_url}")
-            # Stop the process immediately and return a helpful error to the user.
-            raise HTTPException(
-                status_code=422, # Unprocessable Content
-                detail="The provided reference website encountered a client-side error during processing. This can happen with some modern web frameworks. Please try a different reference URL.")
-        # NEW Check 2: Empty root div (SPA didn't load)
-        # We check if the simplified_html is very short and basically just the empty root div.
-        if scraped_context.simplified_html and len(scraped_context.simplified_html) < 100 and '<div id="root"></div>' in scraped_context.simplified_html:
-            print(f"ERROR: Scraped an empty shell for SPA site: {build_config.reference_url}")
-            raise HTTPException(
-                status_code=422,
-                detail="The reference site seems to be a dynamic application that did not load content in time. Please try a different URL."
-            )
-        # Step 2: Parse the user's resume text into structured JSON
-        print("Step 2: Parsing resume text with LLM...")
-        resume_json = await llm_service.parse_resume_to_json(build_config.resume_text)
-        if not resume_json.get("name") and not resume_json.get("experience"): # Basic check for successful parse
-            raise HTTPException(status_code=422, detail="Failed to parse resume text into a usable format.")
-
-        # Step 3: Generate the new portfolio HTML using the style and content
-        print("Step 3: Generating new portfolio HTML with LLM...")
-        generated_portfolio_html = await llm_service.generate_portfolio_from_context(
-            scraped_context=scraped_context.model_dump(), # Pass the context as a dictionary
-            resume_json=resume_json
-        )
-        print("Step 4: Received generated portfolio HTML.")
-
-        if not generated_portfolio_html.strip():
-            raise HTTPException(status_code=500, detail="LLM generated a blank portfolio. Please try a different reference URL or adjust resume text.")
-
-        # Step 5: Save the generated file and create a view link
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        # Use the person's name for a more descriptive filename if available
-        person_name = resume_json.get("name", "portfolio").strip().replace(" ", "_").lower()
-        filename = f"portfolios/{person_name}_portfolio_{timestamp}.html"
-        file_path = f"s3://{config.S3_BUCKET_NAME}/{filename}"
-
-        # Step 6: Upload to S3 using the new service function
-        public_url = s3_service.upload_html_to_s3(
-            html_content=generated_portfolio_html,
-            filename=filename
-        )
-        
-        return ClonedHtmlFileResponse(
-            message="Portfolio built and deployed successfully.",
-            file_path=file_path, # S3 URI
-            view_link=public_url # Public HTTP URL
+        # Identical builds (double-clicks, frontend retries) share one pipeline run.
+        return await coalescing_service.build_portfolio_coalescer.run(
+            coalescing_service.build_config_key(build_config),
+            lambda: _build_portfolio(build_config)
         )
 
     except HTTPException as http_exc:
@@ -195,4 +230,47 @@ async def build_portfolio_endpoint(build_config: PortfolioBuildConfig, request:
     except Exception as e:
         print(f"Unexpected error in /build-portfolio endpoint: {type(e).__name__} - {e}")
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during portfolio generation. Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during portfolio generation. Error: {str(e)}")
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """Closes the batch's admission when the stream ends, including when it never started."""
+
+    def __init__(self, content, batch_admission: admission_service.BatchAdmission, **kwargs):
+        super().__init__(content, **kwargs)
+        self.batch_admission = batch_admission
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.batch_admission.close()
+
+def _stream_batch_results(items: list[PortfolioBuildConfig]) -> StreamingResponse:
+    if not items:
+        raise HTTPException(status_code=422, detail="The batch contains no items.")
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(items)} items (max {config.BATCH_MAX_ITEMS}).")
+    # Admitted here rather than through the `admission` dependency, whose cleanup would run
+    # before the body is streamed. Each item counts as one request until its result is sent.
+    batch_admission = admission_service.admit_batch(len(items))
+
+    async def ndjson_lines():
+        async for result in batch_service.run_batch(items):
+            batch_admission.item_done()
+            yield result.model_dump_json() + "\n"
+
+    return _AdmittedStreamingResponse(ndjson_lines(), batch_admission, media_type="application/x-ndjson")
+
+@router.post("/build-portfolio/batch", summary="Build Many Portfolios, Streaming NDJSON Results")
+async def build_portfolio_batch_endpoint(batch: BatchPortfolioBuildRequest):
+    """
+    Builds a portfolio for each (reference_url, resume_text) item. Each distinct reference URL
+    is scraped once. One JSON result line per item is streamed back as soon as it completes,
+    in completion order; use `index` to match results to inputs.
+    """
+    return _stream_batch_results(batch.items)
+
+@router.post("/build-portfolio/batch/upload", summary="Build Many Portfolios from an Uploaded JSONL File")
+async def build_portfolio_batch_upload_endpoint(file: UploadFile = File(..., description="JSONL with one {reference_url, resume_text} object per line.")):
+    items = batch_service.parse_jsonl_items(await file.read())
+    return _stream_batch_results(items)
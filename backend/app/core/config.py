@@ -6,6 +6,40 @@ GCP_PROJECT_ID = "orchids-461923"
 #GCP_LOCATION = "global"
 GCP_LOCATION = 'us-central1'
 MODEL_NAME = "gemini-2.5-pro"
+# Model tiers and routing (see llm_service.choose_model_tier)
+MODEL_TIERS = {"fast": "gemini-2.5-flash", "pro": MODEL_NAME}
+MODEL_ROUTING_ENABLED = True
+ROUTE_FAST_MAX_HTML_CHARS = 60_000 # simplified_html larger than this goes to pro
+ROUTE_FAST_MAX_SCREENSHOT_HEIGHT = 6_000 # Full-page screenshots taller than this (px) go to pro
+ROUTE_FAST_MAX_RESUME_CHARS = 6_000 # Resume JSON larger than this goes to pro
+# Hedging: if the primary (pro) request hasn't answered after HEDGE_AFTER_SECONDS, also ask HEDGE_TIER.
+HEDGE_ENABLED = True
+HEDGE_TIER = "fast"
+HEDGE_AFTER_SECONDS = 45
+# Approximate list prices (USD per 1M tokens), used only for the cost figures in /metrics.
+MODEL_TIER_PRICING_PER_MTOK = {
+    "fast": {"input": 0.30, "output": 2.50},
+    "pro": {"input": 1.25, "output": 10.00},
+}
+# Local fake model (app/services/fake_llm.py) for testing routing/hedging without Vertex AI.
+LLM_FAKE_MODEL = os.getenv("LLM_FAKE_MODEL", "") == "1"
+FAKE_LLM_LATENCY = { # Log-normal latency per model: median seconds and sigma
+    "gemini-2.5-flash": {"median": 8.0, "sigma": 0.4},
+    "gemini-2.5-pro": {"median": 30.0, "sigma": 0.8},
+}
+
+# Continuation of truncated HTML generations (instead of regenerating from scratch)
+LLM_MAX_CONTINUATIONS = 3
+LLM_CONTINUATION_OVERLAP_WINDOW = 2000 # Chars compared when de-duplicating a continuation's overlap
+LLM_CONTINUATION_MIN_OVERLAP = 8 # Shorter overlaps are treated as coincidence
+# Local resume parsing (app/services/resume_parser.py) before falling back to the LLM.
+# Confidence >= HIGH: the local parse is used as-is; >= LOW: the LLM only fills the missing fields;
+# below LOW: full LLM parse.
+RESUME_LOCAL_PARSE_ENABLED = True
+RESUME_LOCAL_HIGH_CONFIDENCE = 0.75
+RESUME_LOCAL_LOW_CONFIDENCE = 0.45
+# Initialize Vertex AI in a background thread at startup (it is never on the critical path).
+WARM_VERTEX_AI_ON_STARTUP = True
 
 # Directory Configuration
 GENERATED_HTML_DIR_NAME = "generated_html_clones"
@@ -21,6 +55,142 @@ STATIC_CLONES_PATH_PREFIX = "/clones"
 S3_BUCKET_NAME = "ram-portfolio-clones"
 CLOUD_FRONT_DOMAIN = "https://d12dmeynqgk1fi.cloudfront.net"
 
+# Shared assets: inline CSS and repeated SVG icons of generated portfolios are uploaded once as
+# content-hashed objects under SHARED_ASSETS_PREFIX and referenced from the HTML (asset_extraction_service).
+SHARED_ASSETS_ENABLED = True
+SHARED_ASSETS_PREFIX = "assets"
+SHARED_ASSET_MIN_CSS_BYTES = 1024 # Smaller <style> blocks stay inline (not worth a request)
+SHARED_ASSET_MIN_SVG_BYTES = 200
+SHARED_ASSET_MIN_SVG_REPEATS = 2 # An SVG must occur this often in a page to be shared
+SHARED_ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SHARED_ASSET_MAX_KNOWN_KEYS = 10_000 # Asset keys remembered as uploaded; forgotten ones get one HEAD request again
+
+# Batch portfolio builds (/build-portfolio/batch)
+BATCH_MAX_ITEMS = 500
+BATCH_SCRAPE_CONCURRENCY = 2 # Distinct reference URLs scraped at once (one browser each)
+BATCH_RESUME_PARSE_CONCURRENCY = 8
+BATCH_GENERATION_CONCURRENCY = 4
+
+# Request coalescing for identical /build-portfolio and /clone-website-and-save requests
+COALESCE_RESULT_TTL_SECONDS = 120
+COALESCE_MAX_CACHED_RESULTS = 256
+
+# Admission control / backpressure (see admission_service)
+MAX_CONCURRENT_BROWSERS = 2 # Chromium instances alive at once
+MAX_CONCURRENT_LLM_CALLS = 4 # Vertex AI requests in flight at once
+ADMISSION_MAX_QUEUE_LENGTH = 20 # Admitted requests not yet holding a browser/LLM slot before new ones get 503
+ADMISSION_SHED_RSS_MB = 3072 # Shed new requests when API + browser processes exceed this RSS
+ADMISSION_MIN_RETRY_AFTER_SECONDS = 5
+ADMISSION_MAX_RETRY_AFTER_SECONDS = 120
+
+# Execution mode: "inline" runs scrape/LLM pipelines in the API process; "queue" hands them
+# to workers (python -m app.worker) through the job queue.
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "inline")
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory") # "memory" (in-process) or "sqlite"
+JOB_QUEUE_SQLITE_PATH = os.getenv("JOB_QUEUE_SQLITE_PATH", os.path.join(BASE_DIR, "job_queue", "jobs.sqlite3"))
+IN_PROCESS_WORKERS = 1 # Workers started inside the API process in queue mode with the memory backend
+WORKER_CONCURRENCY = 4 # Jobs a worker runs at once
+WORKER_BROWSER_PROCESSES = 2 # Dedicated processes for scraping, per worker
+WORKER_LLM_PROCESSES = 2 # Dedicated processes for LLM calls, per worker
+WORKER_HEARTBEAT_SECONDS = 10
+WORKER_LIVENESS_SECONDS = 30 # Workers silent for longer are not reported as live
+JOB_LEASE_SECONDS = 60 # A job whose lease isn't renewed within this is retried elsewhere
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BASE_DELAY_SECONDS = 5
+JOB_POLL_INTERVAL_SECONDS = 0.5
+JOB_QUEUE_STATS_REFRESH_SECONDS = 1 # How often the API refreshes queue stats for admission control and /metrics
+JOB_WAIT_TIMEOUT_SECONDS = 600 # How long the API waits on a queued job before returning 504
+JOB_RETENTION_SECONDS = 24 * 3600 # Finished jobs are pruned after this
+
+# Browserless fast path for static reference sites (see static_probe_service)
+STATIC_PROBE_ENABLED = True
+STATIC_PROBE_TIMEOUT_SECONDS = 8
+STATIC_PROBE_MAX_BYTES = 3_000_000 # Larger documents skip the fast path
+STATIC_PROBE_MIN_TEXT_CHARS = 300 # Visible body text below this looks like an unrendered shell
+STATIC_PROBE_MAX_EXTERNAL_SCRIPTS = 6
+STATIC_PROBE_MAX_INLINE_SCRIPT_BYTES = 100_000
+# "screenshots": the browser only takes screenshots (short settle, no hydration wait);
+# "text_only": no browser at all, the scraped context has empty screenshots.
+STATIC_SCRAPE_MODE = os.getenv("STATIC_SCRAPE_MODE", "screenshots")
+STATIC_SETTLE_MS = 1500
+STATIC_PROBE_AUDIT_LOG = os.path.join(BASE_DIR, "logs", "static_probe_audit.jsonl")
+
+# Checkpointed scrape steps (see scraper_service): each step has its own timeout (seconds) and
+# retry budget; a failed step is retried without discarding artifacts captured by earlier steps.
+SCRAPE_STEP_TIMEOUT_SECONDS = {
+    "navigate": 20, # Includes (re)launching the browser
+    "settle": 20,
+    "desktop_capture": 40,
+    "html_extract": 20,
+    "mobile_capture": 40,
+}
+SCRAPE_STEP_RETRIES = {"navigate": 1, "settle": 0, "desktop_capture": 1, "html_extract": 1, "mobile_capture": 1}
+SCRAPE_STEP_RETRY_DELAY_SECONDS = 1
+
+# How simplified_html is produced: "dom" serializes the page (page.content()) and cleans it with
+# BeautifulSoup; "layout" extracts visible elements with their computed styles in-page (layout_extractor).
+SCRAPE_EXTRACTION_MODE = os.getenv("SCRAPE_EXTRACTION_MODE", "dom")
+LAYOUT_MAX_NODES = 2000 # Visible elements extracted before the tree is truncated
+LAYOUT_MAX_TEXT_CHARS = 500 # Per text node
+LAYOUT_MAX_SVG_CHARS = 3000 # Larger inline SVGs are kept as an empty <svg> box
+LAYOUT_MAX_RENDER_DEPTH = 30 # Elements nested deeper are flattened into their ancestor's text
+
+# Raw scrape artifacts served by /artifacts (see artifact_store), for
+# /get-scraped-context?format=artifacts.
+ARTIFACT_DIR = os.path.join(BASE_DIR, "artifacts")
+ARTIFACT_TTL_SECONDS = 3600
+
+# Scrape cache for reference sites (see scrape_cache_service). Portfolio builds read through it;
+# clones always scrape fresh.
+SCRAPE_CACHE_DIR = os.path.join(BASE_DIR, "scrape_cache")
+SCRAPE_CACHE_TTL_SECONDS = 12 * 3600
+SCRAPE_CACHE_MAX_MEMORY_ENTRIES = 32 # Entries hold full-page screenshots; older ones stay on disk only
+SCRAPE_CACHE_MAX_DISK_ENTRIES = 500 # Least recently used entries beyond either cap are deleted
+SCRAPE_CACHE_MAX_DISK_MB = 1024
+
+# Background prewarming of popular references (see prewarm_service). Runs in the API process in
+# inline mode, using a browser only while no user scrape is running or waiting.
+PREWARM_ENABLED = True
+PREWARM_TOP_N = 10
+PREWARM_INTERVAL_SECONDS = 60
+PREWARM_REFRESH_AFTER_SECONDS = 8 * 3600 # Re-scrape before SCRAPE_CACHE_TTL_SECONDS expires the entry
+PREWARM_QUIET_SECONDS = 30 # No prewarm scrape starts within this long of a user request
+POPULARITY_HALF_LIFE_SECONDS = 24 * 3600
+POPULARITY_MAX_URLS = 1000 # Lowest-scoring URLs beyond this are forgotten
+# Gallery reference sites, seeded so they are warm before anyone asks for them.
+PREWARM_SEED_URLS = [
+    "https://www.olacabs.com",
+    "https://www.wix.com",
+    "https://wordpress.com",
+    "https://simple-greetings-1748253405653.vercel.app",
+    "https://www.uber.com",
+]
+PREWARM_SEED_WEIGHT = 3
+
+# Change detection for clones (see change_detection_service). A clone whose fresh scrape differs
+# from the last clone of the same URL by at most the threshold returns the existing HTML instead
+# of regenerating it; /clone-website-and-save?force_regenerate=true always regenerates.
+CHANGE_DETECTION_ENABLED = True
+CHANGE_DETECTION_THRESHOLD = 0.08 # Normalized difference, 0 = identical, 1 = unrelated
+CHANGE_DETECTION_BAND_ASPECT = 0.75 # Screenshot band height as a fraction of its width, one dHash per band
+CHANGE_DETECTION_MAX_BANDS = 32
+CHANGE_INDEX_PATH = os.path.join(BASE_DIR, "change_index", "clones.json")
+
+# Profiling (see profiling_service). Everything is off by default. Per-request profiling
+# (`X-Profile: 1` / `?profile=1`) and /profiles also require an `X-Admin-Token` header matching
+# PROFILING_ADMIN_TOKEN; with no token configured they are unavailable.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "") == "1" # Honour per-request profiling from admins
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_INTERVAL_MS = 5
+PROFILE_STORE_MAX_PROFILES = 50
+SLOW_REQUEST_SAMPLER_ENABLED = os.getenv("SLOW_REQUEST_SAMPLER_ENABLED", "") == "1" # Background sampling of the event loop for slow-request profiles
+SLOW_REQUEST_SAMPLE_INTERVAL_MS = 100
+SLOW_REQUEST_SECONDS = 30 # Requests slower than this get a profile from the sampler's buffer
+SLOW_REQUEST_RING_BUFFER_SECONDS = 120 # 1,200 stacks at the interval above
+LOOP_LAG_MONITOR_ENABLED = os.getenv("LOOP_LAG_MONITOR_ENABLED", "") == "1"
+LOOP_LAG_THRESHOLD_MS = 200 # Loop stalls longer than this are logged with the blocking stack
+LOOP_LAG_CHECK_INTERVAL_MS = 50
+
 # CORS Origins
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,24 @@
+# backend/app/core/json_encoding.py
+"""
+Fast JSON encoding for large metadata responses: orjson when it is installed, the stdlib
+json module otherwise. Both produce compact UTF-8 bytes.
+"""
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError: # Optional dependency
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
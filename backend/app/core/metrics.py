@@ -0,0 +1,16 @@
+# backend/app/core/metrics.py
+"""
+A tiny registry of in-process metric providers, served by GET /metrics.
+
+Services register a zero-argument callable returning a JSON-serializable dict;
+the endpoint calls every provider on each request, so snapshots are always current.
+"""
+from typing import Callable
+
+_providers: dict[str, Callable[[], dict]] = {}
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    _providers[name] = provider
+
+def snapshot() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,15 @@
+# backend/app/core/url_utils.py
+from urllib.parse import urlsplit, urlunsplit
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for use as a cache/coalescing key: trimmed, lower-case scheme
+    and host, default ports and fragments removed, and no trailing slash on the path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
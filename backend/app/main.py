@@ -1,8 +1,8 @@
 # backend/app/main.py
 import sys
 import os
+import asyncio
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -10,7 +10,7 @@ from fastapi.staticfiles import StaticFiles
 # Import the new modules
 from app.api import endpoints
 from app.core import config
-from app.services import llm_service
+from app.services import llm_service, worker_service, static_probe_service, prewarm_service, profiling_service
 
 # Create the FastAPI app instance
 app = FastAPI(
@@ -26,8 +26,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
 
+# Opt-in (X-Profile: 1 / ?profile=1) and slow-request profiling, see profiling_service.
+# HTTP middleware wraps every request, streaming ones included, so it's only installed when used.
+if profiling_service.request_profiling_enabled():
+    app.middleware("http")(profiling_service.profile_request)
+
 # Mount the static files directory for generated clones
 app.mount(
     config.STATIC_CLONES_PATH_PREFIX,
@@ -38,19 +44,83 @@ app.mount(
 # Include the API router
 app.include_router(endpoints.router)
 
+# Heavy SDKs checked by the readiness endpoint, keyed by the subsystem they back.
+# They are imported lazily by the services, so presence in sys.modules means "warm".
+WARMABLE_MODULES = {
+    "vertexai_sdk": "vertexai.generative_models",
+    "playwright": "playwright.async_api",
+    "bs4": "bs4",
+    "boto3": "boto3",
+    "httpx": "httpx",
+}
+
+_background_tasks = set()
+_stop_in_process_workers = asyncio.Event()
+
+async def _warm_vertex_ai():
+    # aiplatform.init() (and the SDK import it triggers) is blocking, so run it in a
+    # thread instead of holding up the event loop during startup.
+    await asyncio.to_thread(llm_service.initialize_vertex_ai)
+
 # Define startup event
 @app.on_event("startup")
 async def startup_event():
-    print("Application startup: Attempting to initialize Vertex AI...")
-    llm_service.initialize_vertex_ai()
+    if config.WARM_VERTEX_AI_ON_STARTUP:
+        print("Application startup: Initializing Vertex AI in the background...")
+        task = asyncio.create_task(_warm_vertex_ai())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    if config.EXECUTION_MODE == "queue":
+        worker_service.enable_queue_mode()
+        # The memory backend can't be shared across processes, so its workers live here.
+        if config.JOB_QUEUE_BACKEND == "memory":
+            print(f"Queue mode: starting {config.IN_PROCESS_WORKERS} in-process worker(s).")
+            for _ in range(config.IN_PROCESS_WORKERS):
+                task = asyncio.create_task(worker_service.Worker().run(_stop_in_process_workers))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        else:
+            print(f"Queue mode: jobs go to the {config.JOB_QUEUE_BACKEND} queue; run `python -m app.worker` to process them.")
+    profiling_service.start_background_monitors()
+    if config.PREWARM_ENABLED and config.EXECUTION_MODE == "inline":
+        prewarm_service.prewarm_scheduler.start()
     print("Startup complete.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    _stop_in_process_workers.set()
+    await prewarm_service.prewarm_scheduler.stop()
+    profiling_service.stop_background_monitors()
+    worker_service.shutdown_pools()
+    await static_probe_service.close_client()
+
 # Define a simple root endpoint for health checks
 @app.get("/", summary="Health Check")
 async def health_check():
     return {"status": "ok", "service": "Ram's Website Cloner API"}
 
+@app.get("/ready", summary="Readiness Check")
+async def readiness_check():
+    """
+    Reports which lazily-loaded subsystems are warm. The API is able to serve requests
+    as soon as this answers; cold subsystems are loaded on first use.
+
+    status is "warming" only while Vertex AI is being initialized at startup. It is "ready"
+    once that is done, or when nothing is warmed on startup, and "degraded" if it failed.
+    """
+    subsystems = {name: module in sys.modules for name, module in WARMABLE_MODULES.items()}
+    vertex_ai = llm_service.vertex_ai_state()
+    subsystems["vertex_ai"] = vertex_ai
+    if vertex_ai == "failed":
+        status = "degraded"
+    elif vertex_ai == "initializing" or (vertex_ai == "not_started" and config.WARM_VERTEX_AI_ON_STARTUP):
+        status = "warming"
+    else:
+        status = "ready"
+    return {"status": status, "subsystems": subsystems}
+
 # For running with `python -m app.main`
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
 #uvicorn app.main:app --reload --port 8000
\ No newline at end of file
@@ -11,6 +11,8 @@ class ScrapedContextResponse(BaseModel):
     mobile_screenshot_base64: str
     simplified_html: str | None
     original_url: str
+    degraded: bool = False
+    missing_artifacts: list[str] = []
 
 class ClonedHtmlFileResponse(BaseModel):
     message: str
@@ -33,6 +35,13 @@ class ScrapedContext(BaseModel):
     desktop_screenshot_base64: str
     mobile_screenshot_base64: str
     simplified_html: str | None
+    degraded: bool = False # True when some steps ran out of retries and their artifacts are missing
+    missing_artifacts: list[str] = [] # Any of "desktop_screenshot", "simplified_html", "mobile_screenshot"
+
+class ClonedFile(BaseModel):
+    message: str
+    filename: str # Relative to GENERATED_HTML_DIR_PATH / the static clones mount
+    file_path: str
 
 class PortfolioBuildConfig(BaseModel):
     reference_url: str = Field(
@@ -44,4 +53,37 @@ class PortfolioBuildConfig(BaseModel):
         ..., 
         example="John Doe\nSoftware Engineer at Tech Corp\nSkills: Python, React, AWS",
         description="The user's full resume or profile information as a block of text."
-    )
\ No newline at end of file
+    )
+
+class BatchPortfolioBuildRequest(BaseModel):
+    items: list[PortfolioBuildConfig] = Field(
+        ...,
+        min_length=1,
+        description="The (reference_url, resume_text) pairs to build. Items sharing a reference URL share one scrape."
+    )
+
+class BatchBuildItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the submitted batch.")
+    reference_url: str
+    status: str = Field(..., description="'ok' or 'error'.")
+    file_path: str | None = None
+    view_link: str | None = None
+    status_code: int | None = None
+    error: str | None = None
+
+# For the API tier <-> worker tier job queue
+class Job(BaseModel):
+    id: str
+    kind: str = Field(..., description="Pipeline to run, e.g. 'build_portfolio' or 'clone_website'.")
+    payload: dict
+    status: str = Field(..., description="'queued', 'running', 'succeeded' or 'failed'.")
+    attempts: int = 0
+    max_attempts: int
+    result: dict | None = None
+    error: str | None = None
+    status_code: int | None = None
+    worker_id: str | None = None
+    lease_expires_at: float | None = None
+    available_at: float
+    created_at: float
+    updated_at: float
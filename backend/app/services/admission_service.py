@@ -0,0 +1,215 @@
+# backend/app/services/admission_service.py
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Callable
+from fastapi import HTTPException
+
+from app.core import config, metrics
+
+
+class StageLimiter:
+    """
+    Bounds how many operations of one pipeline stage (browser scrapes, LLM calls) run at once.
+
+    Callers beyond the limit wait in FIFO order; `waiting` is the stage's queue depth.
+    An exponentially weighted average of slot hold time is kept to estimate Retry-After.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting_seen = 0
+        self.completed = 0
+        self.avg_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            elapsed = time.monotonic() - started
+            self.completed += 1
+            self.avg_seconds = elapsed if self.completed == 1 else 0.8 * self.avg_seconds + 0.2 * elapsed
+
+    def estimated_wait_seconds(self) -> float:
+        """Rough time until a newly queued caller would get a slot."""
+        return math.ceil((self.waiting + 1) / self.limit) * self.avg_seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting_seen": self.max_waiting_seen,
+            "completed": self.completed,
+            "avg_seconds": round(self.avg_seconds, 3),
+        }
+
+
+browser_stage = StageLimiter("browser", config.MAX_CONCURRENT_BROWSERS)
+llm_stage = StageLimiter("llm", config.MAX_CONCURRENT_LLM_CALLS)
+STAGES = (browser_stage, llm_stage)
+
+_rejected = {"queue_full": 0, "memory": 0}
+# Requests admitted and not yet finished. Those not holding a stage slot are queued, whether
+# they wait on a semaphore or are still in an earlier step (static probe, resume parse, coalescing).
+_admitted_in_flight = 0
+# Extra queues counted towards queue depth (e.g. jobs waiting for the worker tier).
+_queue_depth_sources: dict[str, Callable[[], int]] = {}
+_rss_cache = {"at": 0.0, "mb": None}
+
+
+def _process_tree_rss_mb() -> float | None:
+    """
+    RSS of this process plus all of its descendants (the Chromium processes Playwright
+    launches live outside our own RSS). Linux only: returns None where /proc is unavailable,
+    which disables memory-based shedding.
+    """
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        children: dict[int, list[int]] = {}
+        rss_pages: dict[int, int] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "rb") as f:
+                    stat = f.read()
+                # Fields after the parenthesised command name: state, ppid, ..., rss is field 24.
+                fields = stat[stat.rindex(b")") + 2:].split()
+                pid = int(entry)
+                children.setdefault(int(fields[1]), []).append(pid)
+                rss_pages[pid] = int(fields[21])
+            except (OSError, ValueError, IndexError):
+                continue
+    except (OSError, ValueError, AttributeError):
+        return None
+
+    total, stack = 0, [os.getpid()]
+    while stack:
+        pid = stack.pop()
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total * page_size / (1024 * 1024)
+
+
+def current_rss_mb() -> float | None:
+    # Scanning /proc costs a few ms; admission checks can share a reading for a second.
+    now = time.monotonic()
+    if now - _rss_cache["at"] > 1.0:
+        _rss_cache["mb"] = _process_tree_rss_mb()
+        _rss_cache["at"] = now
+    return _rss_cache["mb"]
+
+
+def register_queue_depth_source(name: str, source: Callable[[], int]) -> None:
+    _queue_depth_sources[name] = source
+
+
+def queue_depth() -> int:
+    """
+    Admitted requests not currently holding a stage slot, or the callers waiting on stage and
+    extra queues, whichever is larger. Taking the max rather than the sum avoids counting an
+    admitted request twice while it waits on a semaphore or a queued job.
+    """
+    admitted_pending = _admitted_in_flight - sum(stage.active for stage in STAGES)
+    queued = sum(stage.waiting for stage in STAGES) + sum(source() for source in _queue_depth_sources.values())
+    return max(admitted_pending, queued)
+
+
+def _retry_after_seconds() -> int:
+    estimate = max(stage.estimated_wait_seconds() for stage in STAGES)
+    return int(min(max(estimate, config.ADMISSION_MIN_RETRY_AFTER_SECONDS), config.ADMISSION_MAX_RETRY_AFTER_SECONDS))
+
+
+def _reject(reason: str, detail: str):
+    _rejected[reason] += 1
+    retry_after = _retry_after_seconds()
+    print(f"Admission: rejecting request ({reason}): {detail} Retry-After={retry_after}s")
+    raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+def _admit(weight: int = 1) -> None:
+    global _admitted_in_flight
+    depth = queue_depth()
+    if depth >= config.ADMISSION_MAX_QUEUE_LENGTH:
+        _reject("queue_full", f"Server is at capacity ({depth} requests queued). Please retry shortly.")
+    rss_mb = current_rss_mb()
+    if rss_mb is not None and rss_mb >= config.ADMISSION_SHED_RSS_MB:
+        _reject("memory", f"Server is under memory pressure ({rss_mb:.0f} MB in use). Please retry shortly.")
+    _admitted_in_flight += weight
+
+
+def _release(weight: int = 1) -> None:
+    global _admitted_in_flight
+    _admitted_in_flight -= weight
+
+
+async def admit_request():
+    """
+    FastAPI dependency guarding the scrape/LLM endpoints. Rejects fast with 503 and a
+    Retry-After header instead of queueing unboundedly when the stage queues are full or
+    the process tree (API + browsers) is over its memory budget. An admitted request counts
+    towards the queue depth until it finishes, so a burst can't all get in before any of it
+    reaches a stage semaphore.
+
+    Not for streaming endpoints: a dependency's cleanup runs before the response body is
+    streamed. Those use admit_batch instead.
+    """
+    _admit()
+    try:
+        yield
+    finally:
+        _release()
+
+
+class BatchAdmission:
+    """Admission held by a streamed batch: one admitted request per item that hasn't finished."""
+
+    def __init__(self, item_count: int):
+        self.pending = item_count
+
+    def item_done(self) -> None:
+        if self.pending > 0:
+            self.pending -= 1
+            _release()
+
+    def close(self) -> None:
+        _release(self.pending)
+        self.pending = 0
+
+
+def admit_batch(item_count: int) -> BatchAdmission:
+    """
+    Admits a batch of `item_count` builds, or raises 503 like admit_request. The caller
+    reports each finished item with item_done() and must close() the admission when the
+    stream ends, however it ends.
+    """
+    _admit(item_count)
+    return BatchAdmission(item_count)
+
+
+metrics.register("admission", lambda: {
+    "stages": {stage.name: stage.snapshot() for stage in STAGES},
+    "queue_depth": queue_depth(),
+    "admitted_in_flight": _admitted_in_flight,
+    "max_queue_length": config.ADMISSION_MAX_QUEUE_LENGTH,
+    "rejected": dict(_rejected),
+    "rss_mb": None if _rss_cache["mb"] is None else round(_rss_cache["mb"], 1),
+})
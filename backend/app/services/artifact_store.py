@@ -0,0 +1,96 @@
+# backend/app/services/artifact_store.py
+"""
+Local store for scrape artifacts served as raw files (GET /artifacts/{artifact_id}/{name}).
+
+Screenshots arrive from the scraper as base64; they are decoded once, in chunks, straight
+to disk, so later fetches stream raw PNG bytes from the file instead of every response
+carrying its own base64 copy. Artifact sets older than ARTIFACT_TTL_SECONDS are pruned
+whenever a new set is saved.
+"""
+import asyncio
+import base64
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Iterator
+
+from app.core import config
+from app.models.pydantic_models import ScrapedContext
+
+# Artifact name -> (file name, content type). The simplified HTML is third-party markup (layout
+# mode even keeps raw inline SVG), so it is served as text and never rendered on the API origin.
+ARTIFACTS = {
+    "desktop_screenshot": ("desktop.png", "image/png"),
+    "mobile_screenshot": ("mobile.png", "image/png"),
+    "simplified_html": ("simplified.html", "text/plain; charset=utf-8"),
+}
+# Sent with every artifact response; a browser navigating to one gets no script execution.
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "sandbox; default-src 'none'",
+}
+_ARTIFACT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_BASE64_CHUNK_CHARS = 1 << 20 # Multiple of 4, so chunks decode independently
+
+
+def iter_base64_decoded(data: str) -> Iterator[bytes]:
+    """Decodes base64 in chunks, avoiding a second full-size copy of large screenshots."""
+    for start in range(0, len(data), _BASE64_CHUNK_CHARS):
+        yield base64.b64decode(data[start:start + _BASE64_CHUNK_CHARS])
+
+
+def base64_decoded_size(data: str) -> int:
+    return len(data) // 4 * 3 - data[-2:].count("=") if data else 0
+
+
+def _prune_expired() -> None:
+    cutoff = time.time() - config.ARTIFACT_TTL_SECONDS
+    try:
+        entries = list(os.scandir(config.ARTIFACT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _write_artifacts(artifact_dir: str, context: ScrapedContext) -> dict[str, int]:
+    os.makedirs(artifact_dir, exist_ok=True)
+    sizes = {}
+    for name in ("desktop_screenshot", "mobile_screenshot"):
+        data = getattr(context, f"{name}_base64")
+        if not data:
+            continue
+        with open(os.path.join(artifact_dir, ARTIFACTS[name][0]), "wb") as f:
+            for chunk in iter_base64_decoded(data):
+                f.write(chunk)
+        sizes[name] = base64_decoded_size(data)
+    if context.simplified_html:
+        encoded = context.simplified_html.encode("utf-8")
+        with open(os.path.join(artifact_dir, ARTIFACTS["simplified_html"][0]), "wb") as f:
+            f.write(encoded)
+        sizes["simplified_html"] = len(encoded)
+    return sizes
+
+
+async def save_scrape_artifacts(context: ScrapedContext) -> tuple[str, dict[str, int]]:
+    """Writes the scrape's artifacts to disk; returns (artifact_id, {artifact name: size in bytes})."""
+    artifact_id = uuid.uuid4().hex
+    artifact_dir = os.path.join(config.ARTIFACT_DIR, artifact_id)
+    await asyncio.to_thread(_prune_expired)
+    sizes = await asyncio.to_thread(_write_artifacts, artifact_dir, context)
+    return artifact_id, sizes
+
+
+def artifact_file(artifact_id: str, name: str) -> tuple[str, str] | None:
+    """(path, content type) of a stored artifact, or None if it doesn't exist or the id/name is invalid."""
+    if not _ARTIFACT_ID_RE.match(artifact_id) or name not in ARTIFACTS:
+        return None
+    file_name, content_type = ARTIFACTS[name]
+    path = os.path.join(config.ARTIFACT_DIR, artifact_id, file_name)
+    return (path, content_type) if os.path.isfile(path) else None
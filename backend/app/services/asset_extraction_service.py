@@ -0,0 +1,122 @@
+# backend/app/services/asset_extraction_service.py
+"""
+Post-generation stage that moves shareable parts of a generated portfolio into
+content-addressed assets on the CDN.
+
+- Inline CSS <style> blocks become <link rel="stylesheet"> to assets/<hash>.css. Blocks with
+  another type (e.g. text/tailwindcss, which the Tailwind Play CDN compiles in-page) stay inline.
+- SVG icons repeated within the page are stored once in assets/<hash>.svg and each
+  occurrence keeps its <svg> wrapper (size, class, fill) but draws the shared content
+  through <use>, which inherits currentColor like the inline markup did.
+
+Asset keys are hashes of their content, so identical CSS/icons across portfolios map to the
+same object: it is uploaded once and browsers reuse their cached copy between portfolios.
+Portfolios and assets are served from the same CloudFront origin, which external <use>
+references require.
+"""
+import hashlib
+import re
+
+from app.core import config, metrics
+
+# Script bodies are left alone: a "<style>" or "<svg>" inside JS (e.g. a template string) is not markup.
+_SCRIPT_RE = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+_STYLE_RE = re.compile(r"<style\b([^>]*)>(.*?)</style\s*>", re.IGNORECASE | re.DOTALL)
+_SVG_RE = re.compile(r"<svg\b([^>]*)>(.*?)</svg\s*>", re.IGNORECASE | re.DOTALL)
+_MEDIA_ATTR_RE = re.compile(r"""\bmedia\s*=\s*("[^"]*"|'[^']*')""", re.IGNORECASE)
+_TYPE_ATTR_RE = re.compile(r"""\btype\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+# Relative url(...) and @import "..." references would resolve against the asset's location
+# instead of the page's.
+_RELATIVE_CSS_URL_RE = re.compile(r"""(?:url\(|@import\s+(?=['"]))(?!\s*['"]?(?:https?:|data:|//|#))""", re.IGNORECASE)
+# Content whose ids or internal references would break when moved into another document.
+_SVG_NOT_SHAREABLE_RE = re.compile(r"""\bid\s*=|url\(#|<style|<script|<svg\b|\bhref\s*=\s*["']#""", re.IGNORECASE)
+
+_stats = {"portfolios": 0, "css_assets": 0, "svg_assets": 0, "html_bytes_before": 0, "html_bytes_after": 0}
+
+
+def _asset(body: str, extension: str, content_type: str) -> dict:
+    encoded = body.encode("utf-8")
+    digest = hashlib.sha256(encoded).hexdigest()[:20]
+    key = f"{config.SHARED_ASSETS_PREFIX}/{digest}.{extension}"
+    return {"key": key, "url": f"{config.CLOUD_FRONT_DOMAIN}/{key}", "body": encoded, "content_type": content_type}
+
+
+def _normalize_css(css: str) -> str:
+    # Only indentation and blank lines differ between otherwise identical generations;
+    # anything inside a line (strings, selectors) is left untouched.
+    return "\n".join(line.strip() for line in css.splitlines() if line.strip())
+
+
+def _sub_outside_scripts(pattern: re.Pattern, repl, html: str) -> str:
+    parts, position = [], 0
+    for script in _SCRIPT_RE.finditer(html):
+        parts.append(pattern.sub(repl, html[position:script.start()]))
+        parts.append(script.group(0))
+        position = script.end()
+    parts.append(pattern.sub(repl, html[position:]))
+    return "".join(parts)
+
+
+def extract_shared_assets(html: str) -> tuple[str, list[dict]]:
+    """
+    Rewrites `html` to reference shared assets.
+
+    Returns:
+        (rewritten_html, assets), each asset a dict with key (S3 key), url, body (bytes)
+        and content_type. Unchanged html and no assets when nothing qualifies.
+    """
+    assets: dict[str, dict] = {}
+
+    def replace_style(match: re.Match) -> str:
+        attrs, css = match.group(1), match.group(2)
+        style_type = _TYPE_ATTR_RE.search(attrs)
+        if style_type and "".join(g or "" for g in style_type.groups()).strip().lower() not in ("", "text/css"):
+            return match.group(0)
+        css = _normalize_css(css)
+        if len(css) < config.SHARED_ASSET_MIN_CSS_BYTES or _RELATIVE_CSS_URL_RE.search(css):
+            return match.group(0)
+        asset = _asset(css, "css", "text/css; charset=utf-8")
+        assets[asset["key"]] = asset
+        media = _MEDIA_ATTR_RE.search(attrs)
+        return f'<link rel="stylesheet" href="{asset["url"]}"' + (f" media={media.group(1)}" if media else "") + ">"
+
+    html = _sub_outside_scripts(_STYLE_RE, replace_style, html)
+
+    occurrences: dict[str, int] = {}
+
+    def count_svg(match: re.Match) -> str:
+        occurrences[match.group(2)] = occurrences.get(match.group(2), 0) + 1
+        return match.group(0)
+
+    _sub_outside_scripts(_SVG_RE, count_svg, html)
+    shared_svgs = {
+        inner for inner, count in occurrences.items()
+        if count >= config.SHARED_ASSET_MIN_SVG_REPEATS
+        and len(inner) >= config.SHARED_ASSET_MIN_SVG_BYTES
+        and not _SVG_NOT_SHAREABLE_RE.search(inner)
+    }
+
+    def replace_svg(match: re.Match) -> str:
+        attrs, inner = match.group(1), match.group(2)
+        if inner not in shared_svgs:
+            return match.group(0)
+        asset = _asset(f'<svg xmlns="http://www.w3.org/2000/svg"><defs><g id="a">{inner.strip()}</g></defs></svg>',
+                       "svg", "image/svg+xml")
+        assets[asset["key"]] = asset
+        return f'<svg{attrs}><use href="{asset["url"]}#a"></use></svg>'
+
+    if shared_svgs:
+        html = _sub_outside_scripts(_SVG_RE, replace_svg, html)
+
+    return html, list(assets.values())
+
+
+def record(html_bytes_before: int, html_bytes_after: int, assets: list[dict]) -> None:
+    _stats["portfolios"] += 1
+    _stats["css_assets"] += sum(1 for a in assets if a["key"].endswith(".css"))
+    _stats["svg_assets"] += sum(1 for a in assets if a["key"].endswith(".svg"))
+    _stats["html_bytes_before"] += html_bytes_before
+    _stats["html_bytes_after"] += html_bytes_after
+
+
+metrics.register("shared_assets", lambda: {"enabled": config.SHARED_ASSETS_ENABLED, **_stats})
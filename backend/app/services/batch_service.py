@@ -0,0 +1,119 @@
+# backend/app/services/batch_service.py
+import asyncio
+import traceback
+from collections import defaultdict
+from typing import AsyncIterator
+from fastapi import HTTPException
+
+from app.services import scrape_cache_service, portfolio_service, worker_service
+from app.models.pydantic_models import PortfolioBuildConfig, ScrapedContext, BatchBuildItemResult, ClonedHtmlFileResponse
+from app.core import config
+from app.core.url_utils import normalize_url
+
+
+def parse_jsonl_items(raw: bytes) -> list[PortfolioBuildConfig]:
+    """
+    Parses an uploaded JSONL file with one {"reference_url": ..., "resume_text": ...} object per line.
+
+    Raises:
+        HTTPException (422): On the first line that is not a valid build config.
+    """
+    items = []
+    for line_number, line in enumerate(raw.decode("utf-8-sig").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(PortfolioBuildConfig.model_validate_json(line))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch item on line {line_number}: {e}")
+    return items
+
+
+def _error_result(index: int, item: PortfolioBuildConfig, exc: Exception) -> BatchBuildItemResult:
+    if isinstance(exc, HTTPException):
+        status_code, detail = exc.status_code, str(exc.detail)
+    else:
+        print(f"Unexpected error in batch item {index}: {type(exc).__name__} - {exc}\n{traceback.format_exc()}")
+        status_code, detail = 500, f"An unexpected server error occurred. Error: {str(exc)}"
+    return BatchBuildItemResult(index=index, reference_url=item.reference_url, status="error", status_code=status_code, error=detail)
+
+
+async def run_batch(items: list[PortfolioBuildConfig]) -> AsyncIterator[BatchBuildItemResult]:
+    """
+    Builds portfolios for many (reference_url, resume_text) pairs and yields each result as it completes.
+
+    Items are grouped by reference URL so every distinct reference is scraped and validated
+    exactly once, however many users share it. Resume parsing and generation run concurrently
+    under their own limits (config.BATCH_*_CONCURRENCY), so total cost scales with the number
+    of distinct references plus bounded LLM work rather than with one scrape per user.
+
+    With EXECUTION_MODE=queue the work runs on the worker tier: each distinct reference is
+    first scraped by a scrape_reference job, which fills the scrape cache the workers share,
+    then every item is built by its own build_portfolio job.
+    """
+    queued = config.EXECUTION_MODE == "queue"
+    scrape_slots = asyncio.Semaphore(config.BATCH_SCRAPE_CONCURRENCY)
+    parse_slots = asyncio.Semaphore(config.BATCH_RESUME_PARSE_CONCURRENCY)
+    generation_slots = asyncio.Semaphore(config.BATCH_GENERATION_CONCURRENCY)
+
+    # Keyed by normalized URL so "https://a.com" and "https://a.com/" share one scrape.
+    groups = defaultdict(list)
+    for index, item in enumerate(items):
+        groups[normalize_url(item.reference_url)].append(index)
+    print(f"Batch build: {len(items)} item(s) across {len(groups)} distinct reference URL(s).")
+
+    async def scrape_reference(key: str) -> ScrapedContext | None:
+        reference_url = items[groups[key][0]].reference_url
+        async with scrape_slots:
+            print(f"Batch: scraping reference URL {reference_url} for {len(groups[key])} item(s)")
+            if queued:
+                await worker_service.submit_and_wait("scrape_reference", {"reference_url": reference_url})
+                return None
+            scraped_context = await scrape_cache_service.get_or_scrape(reference_url)
+        portfolio_service.validate_reference_context(reference_url, scraped_context)
+        return scraped_context
+
+    async def parse_resume(resume_text: str) -> dict:
+        async with parse_slots:
+            return await portfolio_service.parse_resume(resume_text)
+
+    async def build_queued_item(index: int, item: PortfolioBuildConfig) -> ClonedHtmlFileResponse:
+        await reference_tasks[normalize_url(item.reference_url)]
+        async with generation_slots:
+            return ClonedHtmlFileResponse(**await worker_service.submit_and_wait(
+                "build_portfolio", {**item.model_dump(), "filename_suffix": f"_{index}"}
+            ))
+
+    async def build_item(index: int, item: PortfolioBuildConfig) -> BatchBuildItemResult:
+        if queued:
+            result = await build_queued_item(index, item)
+            return BatchBuildItemResult(index=index, reference_url=item.reference_url, status="ok", file_path=result.file_path, view_link=result.view_link)
+        # Parse the resume while the (shared) reference scrape is in flight.
+        parse_task = asyncio.create_task(parse_resume(item.resume_text))
+        try:
+            scraped_context = await reference_tasks[normalize_url(item.reference_url)]
+        except BaseException:
+            parse_task.cancel()
+            raise
+        resume_json = await parse_task
+        async with generation_slots:
+            result = await portfolio_service.generate_and_publish(scraped_context, resume_json, filename_suffix=f"_{index}")
+        return BatchBuildItemResult(index=index, reference_url=item.reference_url, status="ok", file_path=result.file_path, view_link=result.view_link)
+
+    async def run_item(index: int, item: PortfolioBuildConfig) -> BatchBuildItemResult:
+        try:
+            return await build_item(index, item)
+        except Exception as e:
+            return _error_result(index, item, e)
+
+    reference_tasks = {key: asyncio.create_task(scrape_reference(key)) for key in groups}
+    item_tasks = [asyncio.create_task(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(item_tasks):
+            yield await next_done
+    finally:
+        # The client may disconnect mid-stream; don't leave orphaned scrapes or generations running.
+        for task in (*item_tasks, *reference_tasks.values()):
+            task.cancel()
+        # Retrieve exceptions of shared reference tasks so asyncio doesn't warn about them.
+        await asyncio.gather(*reference_tasks.values(), return_exceptions=True)
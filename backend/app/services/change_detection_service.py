@@ -0,0 +1,191 @@
+# backend/app/services/change_detection_service.py
+"""
+Change detection for cloned sites, so an unchanged site isn't regenerated by the LLM.
+
+A fingerprint of a scrape has three parts:
+- desktop / mobile: perceptual difference hashes (dHash) of the screenshots, one 64-bit hash
+  per horizontal band so changes below the fold still count. Needs Pillow; without it an
+  exact SHA-256 of the PNG bytes is used, which only recognizes pixel-identical captures.
+- structure: a 64-bit SimHash over shingles of the simplified HTML's tag sequence.
+
+Fingerprints of the last clone of each URL are kept in a JSON index keyed by normalized URL.
+API and worker processes share the index; updates hold an exclusive flock on a sidecar lock file.
+"""
+import asyncio
+import base64
+import fcntl
+import hashlib
+import io
+import json
+import os
+import time
+from collections import deque
+from html.parser import HTMLParser
+
+from app.core import config, metrics
+from app.core.url_utils import normalize_url
+
+_stats = {"checked": 0, "unchanged_reused": 0, "regenerated": 0, "forced": 0}
+_recent_differences: deque = deque(maxlen=20)
+
+
+def _pillow_available() -> bool:
+    try:
+        import PIL.Image # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _dhash(image) -> int:
+    # 9x8 grayscale thumbnail; each bit says whether a pixel is brighter than its right neighbour.
+    pixels = list(image.convert("L").resize((9, 8)).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def screenshot_hash(screenshot_base64: str) -> dict | None:
+    """Perceptual hash of a screenshot as {"method": "dhash", "bands": [...]}, or an exact hash without Pillow."""
+    if not screenshot_base64:
+        return None
+    png = base64.b64decode(screenshot_base64)
+    if not _pillow_available():
+        return {"method": "exact", "sha256": hashlib.sha256(png).hexdigest()}
+    from PIL import Image
+    with Image.open(io.BytesIO(png)) as image:
+        width, height = image.size
+        band_height = max(1, int(width * config.CHANGE_DETECTION_BAND_ASPECT))
+        bands = []
+        for top in range(0, height, band_height)[:config.CHANGE_DETECTION_MAX_BANDS]:
+            bands.append(f"{_dhash(image.crop((0, top, width, min(top + band_height, height)))):016x}")
+    return {"method": "dhash", "bands": bands}
+
+
+class _TagSequence(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tags: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append(tag)
+
+    def handle_endtag(self, tag):
+        self.tags.append(f"/{tag}")
+
+
+def structure_hash(simplified_html: str | None) -> str | None:
+    """64-bit SimHash of 4-tag shingles: similar structures give hashes a few bits apart."""
+    if not simplified_html:
+        return None
+    parser = _TagSequence()
+    parser.feed(simplified_html)
+    tags = parser.tags
+    shingles = [" ".join(tags[i:i + 4]) for i in range(max(1, len(tags) - 3))]
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return f"{sum(1 << bit for bit in range(64) if weights[bit] > 0):016x}"
+
+
+def fingerprint(context) -> dict:
+    """Fingerprint of a ScrapedContext. CPU-bound (image decoding); run it in a thread."""
+    return {
+        "desktop": screenshot_hash(context.desktop_screenshot_base64),
+        "mobile": screenshot_hash(context.mobile_screenshot_base64),
+        "structure": structure_hash(context.simplified_html),
+    }
+
+
+def _hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def _screenshot_difference(a: dict, b: dict) -> float:
+    if a["method"] != b["method"]:
+        return 1.0
+    if a["method"] == "exact":
+        return 0.0 if a["sha256"] == b["sha256"] else 1.0
+    bands_a, bands_b = a["bands"], b["bands"]
+    # Bands only one of the captures has (the page got longer/shorter) count as fully different.
+    total = sum(_hamming(x, y) / 64 for x, y in zip(bands_a, bands_b)) + abs(len(bands_a) - len(bands_b))
+    return total / max(len(bands_a), len(bands_b), 1)
+
+
+def difference(previous: dict, current: dict) -> float:
+    """Largest normalized difference across the fingerprint parts: 0 = identical, 1 = unrelated."""
+    parts = []
+    for name in ("desktop", "mobile"):
+        if previous.get(name) is None and current.get(name) is None:
+            continue
+        if previous.get(name) is None or current.get(name) is None:
+            return 1.0
+        parts.append(_screenshot_difference(previous[name], current[name]))
+    if previous.get("structure") and current.get("structure"):
+        parts.append(_hamming(previous["structure"], current["structure"]) / 64)
+    elif previous.get("structure") or current.get("structure"):
+        return 1.0
+    return max(parts) if parts else 1.0
+
+
+def _load_index() -> dict:
+    try:
+        with open(config.CHANGE_INDEX_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index: dict) -> None:
+    os.makedirs(os.path.dirname(config.CHANGE_INDEX_PATH), exist_ok=True)
+    tmp_path = f"{config.CHANGE_INDEX_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, config.CHANGE_INDEX_PATH)
+
+
+async def lookup(url: str) -> dict | None:
+    """The index entry of the last clone of `url`: fingerprint, filename, file_path, cloned_at."""
+    return (await asyncio.to_thread(_load_index)).get(normalize_url(url))
+
+
+def _update_index(key: str, entry: dict) -> None:
+    # flock serializes the read-modify-write across processes (and threads, which open their own
+    # lock file descriptions). Readers need no lock: _save_index replaces the file atomically.
+    os.makedirs(os.path.dirname(config.CHANGE_INDEX_PATH), exist_ok=True)
+    with open(f"{config.CHANGE_INDEX_PATH}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when the file is closed
+        index = _load_index()
+        index[key] = entry
+        _save_index(index)
+
+
+async def record(url: str, fingerprint_data: dict, filename: str, file_path: str) -> None:
+    await asyncio.to_thread(_update_index, normalize_url(url), {
+        "fingerprint": fingerprint_data,
+        "filename": filename,
+        "file_path": file_path,
+        "cloned_at": time.time(),
+    })
+
+
+def record_outcome(url: str, outcome: str, diff: float | None = None) -> None:
+    """outcome: "unchanged_reused", "regenerated" (diff is None for a first clone) or "forced"."""
+    _stats[outcome] += 1
+    if outcome != "forced":
+        _stats["checked"] += 1
+    _recent_differences.append({"url": normalize_url(url), "outcome": outcome,
+                                "difference": None if diff is None else round(diff, 4)})
+
+
+metrics.register("change_detection", lambda: {
+    "enabled": config.CHANGE_DETECTION_ENABLED,
+    "threshold": config.CHANGE_DETECTION_THRESHOLD,
+    "screenshot_hash": "dhash" if _pillow_available() else "exact",
+    **_stats,
+    "recent": list(_recent_differences),
+})
@@ -0,0 +1,114 @@
+# backend/app/services/clone_service.py
+import asyncio
+import os
+from datetime import datetime
+from fastapi import HTTPException
+
+from app.services import scraper_service, llm_service, change_detection_service
+from app.models.pydantic_models import ClonedFile, ScrapedContext
+from app.core import config
+
+ENABLE_LLM_CLONING = True
+
+
+def validate_clone_context(context_data: ScrapedContext) -> None:
+    if not context_data.simplified_html or "failed" in context_data.simplified_html.lower() or "empty" in context_data.simplified_html.lower():
+        raise HTTPException(status_code=422, detail=f"HTML scraping/cleaning failed. HTML: {(context_data.simplified_html or '')[:200]}")
+
+
+async def generate_clone_html(url: str, context_data: ScrapedContext) -> str:
+    llm_generated_html = ""
+
+    if ENABLE_LLM_CLONING:
+        print("Step 2: Generating HTML with LLM...")
+        llm_generated_html = await llm_service.generate_html_with_llm(
+            cleaned_html=context_data.simplified_html,
+            desktop_screenshot_base64=context_data.desktop_screenshot_base64,
+            mobile_screenshot_base64=context_data.mobile_screenshot_base64
+        )
+        print("Step 3: Received HTML from LLM processing.")
+        if not llm_generated_html.strip():
+             print("Warning: LLM returned an effectively empty HTML string.")
+    else:
+        print("Step 2 & 3: LLM Cloning is disabled. Generating placeholder HTML.")
+        llm_generated_html = f"<html><body><h1>Placeholder for {url}</h1><p>LLM cloning is currently disabled.</p></body></html>"
+    return llm_generated_html
+
+
+def save_clone_html(url: str, llm_generated_html: str) -> ClonedFile:
+    """Saves generated clone HTML under GENERATED_HTML_DIR_PATH."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sanitized_url_part = url.split('//')[-1].split('/')[0].replace('.', '_').replace(':', '_')
+    filename = f"clone_{sanitized_url_part}_{timestamp}.html"
+    file_path = os.path.join(config.GENERATED_HTML_DIR_PATH, filename)
+
+    try:
+        with open(file_path, "w", encoding="utf-8") as f: f.write(llm_generated_html)
+        print(f"Successfully saved cloned HTML to: {file_path}")
+    except IOError as e:
+        print(f"Error saving HTML file: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save generated HTML file. Error: {str(e)}")
+
+    return ClonedFile(
+        message="Website cloned and HTML saved." if ENABLE_LLM_CLONING else "Placeholder HTML generated.",
+        filename=filename,
+        file_path=file_path
+    )
+
+
+async def find_unchanged_clone(url: str, context_data: ScrapedContext, force_regenerate: bool = False) -> tuple[ClonedFile | None, dict | None]:
+    """
+    Compares the fresh scrape with the last clone of `url` (change_detection_service).
+
+    Returns:
+        (existing_clone, fingerprint): existing_clone is set when the site hasn't changed
+        beyond CHANGE_DETECTION_THRESHOLD and its HTML is still on disk. fingerprint is None
+        when change detection is disabled; pass it to record_clone after saving a new clone.
+    """
+    if not config.CHANGE_DETECTION_ENABLED:
+        return None, None
+    fingerprint = await asyncio.to_thread(change_detection_service.fingerprint, context_data)
+    if force_regenerate:
+        change_detection_service.record_outcome(url, "forced")
+        return None, fingerprint
+
+    previous = await change_detection_service.lookup(url)
+    if previous is None or not os.path.exists(previous["file_path"]):
+        change_detection_service.record_outcome(url, "regenerated")
+        return None, fingerprint
+    diff = change_detection_service.difference(previous["fingerprint"], fingerprint)
+    if diff > config.CHANGE_DETECTION_THRESHOLD:
+        print(f"Change detection: {url} changed (difference {diff:.3f}); regenerating.")
+        change_detection_service.record_outcome(url, "regenerated", diff)
+        return None, fingerprint
+    print(f"Change detection: {url} unchanged (difference {diff:.3f}); reusing {previous['filename']}.")
+    change_detection_service.record_outcome(url, "unchanged_reused", diff)
+    existing = ClonedFile(
+        message="Website unchanged since its last clone; returning the existing HTML.",
+        filename=previous["filename"],
+        file_path=previous["file_path"]
+    )
+    return existing, fingerprint
+
+
+async def record_clone(url: str, fingerprint: dict | None, cloned: ClonedFile) -> None:
+    if fingerprint is not None:
+        await change_detection_service.record(url, fingerprint, cloned.filename, cloned.file_path)
+
+
+async def clone_website_to_file(url: str, force_regenerate: bool = False) -> ClonedFile:
+    """
+    Scrapes `url`, regenerates it with the LLM and saves the HTML under GENERATED_HTML_DIR_PATH.
+    If the site looks the same as at its last clone, that clone is returned instead, unless
+    `force_regenerate` is set. The caller turns the returned filename into a view link for its own host.
+    """
+    print(f"Step 1: Scraping URL for cloning: {url}")
+    context_data = await scraper_service.scrape_website_context(url)
+    validate_clone_context(context_data)
+    existing, fingerprint = await find_unchanged_clone(url, context_data, force_regenerate)
+    if existing is not None:
+        return existing
+    llm_generated_html = await generate_clone_html(url, context_data)
+    cloned = save_clone_html(url, llm_generated_html)
+    await record_clone(url, fingerprint, cloned)
+    return cloned
@@ -0,0 +1,126 @@
+# backend/app/services/coalescing_service.py
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from app.core import config, metrics
+from app.core.url_utils import normalize_url
+from app.models.pydantic_models import PortfolioBuildConfig, UrlRequest
+
+
+def _normalize_text(text: str) -> str:
+    lines = (line.rstrip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"))
+    return "\n".join(line for line in lines if line).strip()
+
+def _hash_key(kind: str, payload: dict) -> str:
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return f"{kind}:{hashlib.sha256(encoded).hexdigest()}"
+
+def build_config_key(build_config: PortfolioBuildConfig) -> str:
+    """Coalescing key for a portfolio build: normalized reference URL plus normalized resume text."""
+    return _hash_key("build", {
+        "reference_url": normalize_url(build_config.reference_url),
+        "resume_text": _normalize_text(build_config.resume_text),
+    })
+
+def url_request_key(req: UrlRequest, force_regenerate: bool = False) -> str:
+    """Coalescing key for a website clone. Forced regenerations don't share results with normal clones."""
+    return _hash_key("clone", {"url": normalize_url(req.url), "force_regenerate": force_regenerate})
+
+
+class RequestCoalescer:
+    """
+    Collapses identical concurrent requests onto a single execution.
+
+    The first caller for a key starts the pipeline as its own task; callers that arrive
+    while it is running await the same task. Successful results are kept for
+    `ttl_seconds` so retries and double-clicks shortly after completion are served from
+    memory. Failures are not cached: every waiter gets the exception and the next
+    request executes again.
+
+    The shared task keeps running when its callers go away, unless `cancel_when_abandoned`
+    is set: then it is cancelled once its last waiter is.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_cached_results: int, cancel_when_abandoned: bool = False):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_cached_results = max_cached_results
+        self.cancel_when_abandoned = cancel_when_abandoned
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+        self._results: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.executed = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def _get_cached(self, key: str):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._results[key]
+            return None
+        return value
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._results[key] = (time.monotonic() + self.ttl_seconds, task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_cached_results:
+            self._results.popitem(last=False)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._get_cached(key)
+        if cached is not None:
+            self.cache_hits += 1
+            print(f"[{self.name}] Serving result from coalescing cache for {key[:24]}...")
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            print(f"[{self.name}] Attaching to in-flight request for {key[:24]}...")
+        else:
+            self.executed += 1
+            task = asyncio.create_task(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        # Shield so one caller disconnecting doesn't cancel the pipeline the others are waiting on.
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.cancel_when_abandoned and self._waiters[key] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "in_flight": len(self._in_flight),
+            "cached_results": len(self._results),
+        }
+
+
+build_portfolio_coalescer = RequestCoalescer("build_portfolio", config.COALESCE_RESULT_TTL_SECONDS, config.COALESCE_MAX_CACHED_RESULTS)
+clone_website_coalescer = RequestCoalescer("clone_website", config.COALESCE_RESULT_TTL_SECONDS, config.COALESCE_MAX_CACHED_RESULTS)
+# Scrape cache misses. Results go to the scrape cache, so none are kept here, and a scrape
+# nobody waits for any more is cancelled to free its browser.
+reference_scrape_coalescer = RequestCoalescer("reference_scrape", 0, 0, cancel_when_abandoned=True)
+
+metrics.register("coalescing", lambda: {
+    coalescer.name: coalescer.snapshot() for coalescer in (build_portfolio_coalescer, clone_website_coalescer, reference_scrape_coalescer)
+})
@@ -0,0 +1,129 @@
+# backend/app/services/fake_llm.py
+"""
+A local stand-in for vertexai's GenerativeModel, for exercising model routing and hedging
+without network calls or cost. Enable with LLM_FAKE_MODEL=1.
+
+Latency per model is drawn from a log-normal distribution (config.FAKE_LLM_LATENCY) so
+slow tails can be reproduced; `set_latency_sampler` overrides it with any callable.
+
+The module also stands in for the vertexai.generative_models classes the services build
+prompts with (Part, Image, Content, GenerationConfig, ...), so fake mode runs without the SDK.
+"""
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+from typing import Callable
+
+from app.core import config
+
+_latency_samplers: dict[str, Callable[[], float]] = {}
+
+_FAKE_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="UTF-8"><title>Fake {model}</title></head>
+<body><h1>Generated by fake {model}</h1><p>Simulated latency: {latency:.2f}s</p></body>
+</html>"""
+
+_FAKE_RESUME = {"name": "Fake User", "headline": "Software Engineer", "skills": [], "experience": [], "projects": [], "education": []}
+
+
+def set_latency_sampler(model_name: str, sampler: Callable[[], float]) -> None:
+    """Overrides the latency distribution (in seconds) of one fake model."""
+    _latency_samplers[model_name] = sampler
+
+
+def _sample_latency(model_name: str) -> float:
+    if model_name in _latency_samplers:
+        return max(0.0, _latency_samplers[model_name]())
+    params = config.FAKE_LLM_LATENCY.get(model_name, {"median": 1.0, "sigma": 0.5})
+    return random.lognormvariate(0.0, params["sigma"]) * params["median"]
+
+
+# --- Stand-ins for vertexai.generative_models ---
+
+class Image:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "Image":
+        return Image(data)
+
+
+class Part:
+    def __init__(self, text: str | None = None, inline_data=None):
+        self.text = text
+        self.inline_data = inline_data
+
+    @staticmethod
+    def from_text(text: str) -> "Part":
+        return Part(text=text)
+
+    @staticmethod
+    def from_image(image: Image) -> "Part":
+        return Part(inline_data=SimpleNamespace(data=image.data, mime_type="image/png"))
+
+
+class Content:
+    def __init__(self, role: str, parts: list):
+        self.role = role
+        self.parts = parts
+
+
+class GenerationConfig:
+    def __init__(self, **kwargs):
+        self._config = kwargs
+
+    def to_dict(self) -> dict:
+        return dict(self._config)
+
+
+class SafetySetting:
+    def __init__(self, category: str, threshold: str):
+        self.category = category
+        self.threshold = threshold
+
+
+class HarmCategory:
+    HARM_CATEGORY_HARASSMENT = "HARM_CATEGORY_HARASSMENT"
+    HARM_CATEGORY_HATE_SPEECH = "HARM_CATEGORY_HATE_SPEECH"
+    HARM_CATEGORY_SEXUALLY_EXPLICIT = "HARM_CATEGORY_SEXUALLY_EXPLICIT"
+    HARM_CATEGORY_DANGEROUS_CONTENT = "HARM_CATEGORY_DANGEROUS_CONTENT"
+
+
+class HarmBlockThreshold:
+    BLOCK_MEDIUM_AND_ABOVE = "BLOCK_MEDIUM_AND_ABOVE"
+
+
+class ResourceExhausted(Exception):
+    """Stands in for google.api_core.exceptions.ResourceExhausted."""
+
+
+class FakeGenerativeModel:
+    """Implements the parts of GenerativeModel the services use: generate_content_async and response.text."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents, generation_config=None, safety_settings=None):
+        latency = _sample_latency(self.model_name)
+        await asyncio.sleep(latency)
+        try:
+            mime_type = generation_config.to_dict().get("response_mime_type") if generation_config is not None else None
+        except AttributeError:
+            mime_type = None
+        if mime_type == "application/json":
+            text = json.dumps(_FAKE_RESUME)
+        else:
+            text = _FAKE_HTML.format(model=self.model_name, latency=latency)
+        candidate = SimpleNamespace(
+            content=SimpleNamespace(parts=[SimpleNamespace(text=text)]),
+            finish_reason=1,
+            safety_ratings=[],
+        )
+        usage = SimpleNamespace(prompt_token_count=1000, candidates_token_count=len(text) // 4)
+        return SimpleNamespace(candidates=[candidate], usage_metadata=usage, text=text)
+
+
+GenerativeModel = FakeGenerativeModel
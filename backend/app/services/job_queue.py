@@ -0,0 +1,349 @@
+# backend/app/services/job_queue.py
+"""
+Job queue between the API tier and the worker tier.
+
+`JobQueue` is the interface every backend implements. Two backends ship:
+- `InMemoryJobQueue`: a dict inside the API process; workers must run in the same process.
+- `SQLiteJobQueue`: a SQLite file shared by the API process and any number of
+  `python -m app.worker` processes on the same machine.
+
+A networked broker (Redis, SQS, Postgres...) can be added by implementing the same methods
+and wiring it into `get_job_queue`.
+
+Jobs are leased rather than popped: a worker owns a job until `lease_expires_at` and must
+keep extending the lease with `heartbeat`. If a worker dies, its lease runs out and the job
+becomes leasable again, up to `max_attempts` leases in total.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import closing
+
+from app.core import config
+from app.models.pydantic_models import Job
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobQueue(ABC):
+
+    @abstractmethod
+    async def enqueue(self, kind: str, payload: dict, max_attempts: int | None = None) -> Job: ...
+
+    @abstractmethod
+    async def lease(self, worker_id: str, lease_seconds: float) -> Job | None:
+        """Claims the oldest available job (queued, or running with an expired lease)."""
+
+    @abstractmethod
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extends the lease. Returns False if the worker no longer owns the job."""
+
+    @abstractmethod
+    async def complete(self, job_id: str, worker_id: str, result: dict) -> bool: ...
+
+    @abstractmethod
+    async def fail(self, job_id: str, worker_id: str, error: str, status_code: int, retry_delay: float | None = None) -> bool:
+        """Fails the current attempt. With a retry_delay the job is requeued if attempts remain."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Job | None: ...
+
+    @abstractmethod
+    async def record_worker_heartbeat(self, worker_id: str, info: dict) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Synchronous snapshot of job counts per status and live workers, for /metrics."""
+
+    async def stats_async(self) -> dict:
+        """stats() for the event loop; backends whose stats() blocks run it in a thread."""
+        return self.stats()
+
+    async def wait(self, job_id: str, timeout: float) -> Job:
+        """Polls until the job reaches a terminal status. Raises TimeoutError."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job.status in TERMINAL_STATUSES:
+                return job
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout}s (status: {job.status}).")
+            await asyncio.sleep(config.JOB_POLL_INTERVAL_SECONDS)
+
+
+def _new_job(kind: str, payload: dict, max_attempts: int | None) -> Job:
+    now = time.time()
+    return Job(
+        id=uuid.uuid4().hex, kind=kind, payload=payload, status="queued",
+        max_attempts=max_attempts or config.JOB_MAX_ATTEMPTS,
+        available_at=now, created_at=now, updated_at=now,
+    )
+
+
+def _is_leasable(job: Job, now: float) -> bool:
+    if job.status == "queued":
+        return job.available_at <= now
+    return job.status == "running" and job.lease_expires_at is not None and job.lease_expires_at < now
+
+
+def _expire_if_exhausted(job: Job, now: float) -> bool:
+    """Marks a job whose worker died on its final attempt as failed. Returns True if it did."""
+    if job.status == "running" and job.attempts >= job.max_attempts:
+        print(f"Job {job.id}: lease of worker {job.worker_id} expired on final attempt {job.attempts}; failing.")
+        job.status, job.status_code, job.updated_at = "failed", 500, now
+        job.error = f"Worker lease expired {job.attempts} time(s); giving up."
+        job.worker_id = job.lease_expires_at = None
+        return True
+    return False
+
+
+class InMemoryJobQueue(JobQueue):
+    """Single-process backend. Good for development and for running workers inside the API process."""
+
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+        self._workers: dict[str, tuple[float, dict]] = {}
+
+    async def enqueue(self, kind, payload, max_attempts=None):
+        job = _new_job(kind, payload, max_attempts)
+        cutoff = job.created_at - config.JOB_RETENTION_SECONDS
+        for old in [j for j in self._jobs.values() if j.status in TERMINAL_STATUSES and j.updated_at < cutoff]:
+            del self._jobs[old.id]
+        self._jobs[job.id] = job
+        return job.model_copy()
+
+    async def lease(self, worker_id, lease_seconds):
+        now = time.time()
+        for job in sorted(self._jobs.values(), key=lambda j: j.available_at):
+            if not _is_leasable(job, now) or _expire_if_exhausted(job, now):
+                continue
+            job.status, job.worker_id, job.attempts = "running", worker_id, job.attempts + 1
+            job.lease_expires_at, job.updated_at = now + lease_seconds, now
+            return job.model_copy()
+        return None
+
+    def _owned(self, job_id, worker_id) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None or job.status != "running" or job.worker_id != worker_id:
+            return None
+        return job
+
+    async def heartbeat(self, job_id, worker_id, lease_seconds):
+        job = self._owned(job_id, worker_id)
+        if job is None:
+            return False
+        job.lease_expires_at = time.time() + lease_seconds
+        return True
+
+    async def complete(self, job_id, worker_id, result):
+        job = self._owned(job_id, worker_id)
+        if job is None:
+            return False
+        job.status, job.result, job.updated_at = "succeeded", result, time.time()
+        job.lease_expires_at = job.error = job.status_code = None
+        return True
+
+    async def fail(self, job_id, worker_id, error, status_code, retry_delay=None):
+        job = self._owned(job_id, worker_id)
+        if job is None:
+            return False
+        now = time.time()
+        job.error, job.status_code, job.updated_at, job.lease_expires_at = error, status_code, now, None
+        if retry_delay is not None and job.attempts < job.max_attempts:
+            job.status, job.worker_id, job.available_at = "queued", None, now + retry_delay
+        else:
+            job.status = "failed"
+        return True
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.model_copy() if job else None
+
+    async def record_worker_heartbeat(self, worker_id, info):
+        self._workers[worker_id] = (time.time(), info)
+
+    def stats(self):
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        cutoff = time.time() - config.WORKER_LIVENESS_SECONDS
+        return {
+            "backend": "memory",
+            "jobs": counts,
+            "live_workers": {wid: info for wid, (seen, info) in self._workers.items() if seen >= cutoff},
+        }
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Multi-process backend on a local SQLite file (WAL mode). Leasing runs inside a
+    `BEGIN IMMEDIATE` transaction so two workers can never claim the same job.
+    Blocking sqlite3 calls run in a thread to keep the event loop free.
+    """
+
+    _COLUMNS = ("id", "kind", "payload", "status", "attempts", "max_attempts", "result", "error",
+                "status_code", "worker_id", "lease_expires_at", "available_at", "created_at", "updated_at")
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL, result TEXT, error TEXT,
+                    status_code INTEGER, worker_id TEXT, lease_expires_at REAL, available_at REAL NOT NULL,
+                    created_at REAL NOT NULL, updated_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_available ON jobs (status, available_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, last_seen REAL NOT NULL, info TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _row_to_job(self, row: sqlite3.Row) -> Job:
+        data = dict(row)
+        data["payload"] = json.loads(data["payload"])
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        return Job(**data)
+
+    def _write(self, conn: sqlite3.Connection, job: Job) -> None:
+        data = job.model_dump()
+        data["payload"] = json.dumps(data["payload"])
+        data["result"] = json.dumps(data["result"]) if data["result"] is not None else None
+        conn.execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+            [data[c] for c in self._COLUMNS],
+        )
+
+    def _transaction(self, fn):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return value
+        finally:
+            conn.close()
+
+    def _load_owned(self, conn, job_id, worker_id) -> Job | None:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ? AND status = 'running' AND worker_id = ?", (job_id, worker_id)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    async def enqueue(self, kind, payload, max_attempts=None):
+        job = _new_job(kind, payload, max_attempts)
+        def insert(conn):
+            conn.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                         (job.created_at - config.JOB_RETENTION_SECONDS,))
+            self._write(conn, job)
+        await asyncio.to_thread(self._transaction, insert)
+        return job
+
+    async def lease(self, worker_id, lease_seconds):
+        def claim(conn):
+            now = time.time()
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'running' AND lease_expires_at < ?) ORDER BY available_at LIMIT 1",
+                    (now, now)).fetchone()
+                if row is None:
+                    return None
+                job = self._row_to_job(row)
+                if _expire_if_exhausted(job, now):
+                    self._write(conn, job)
+                    continue
+                job.status, job.worker_id, job.attempts = "running", worker_id, job.attempts + 1
+                job.lease_expires_at, job.updated_at = now + lease_seconds, now
+                self._write(conn, job)
+                return job
+        return await asyncio.to_thread(self._transaction, claim)
+
+    async def heartbeat(self, job_id, worker_id, lease_seconds):
+        def extend(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running' AND worker_id = ?",
+                (time.time() + lease_seconds, job_id, worker_id))
+            return cursor.rowcount == 1
+        return await asyncio.to_thread(self._transaction, extend)
+
+    async def complete(self, job_id, worker_id, result):
+        def finish(conn):
+            job = self._load_owned(conn, job_id, worker_id)
+            if job is None:
+                return False
+            job.status, job.result, job.updated_at = "succeeded", result, time.time()
+            job.lease_expires_at = job.error = job.status_code = None
+            self._write(conn, job)
+            return True
+        return await asyncio.to_thread(self._transaction, finish)
+
+    async def fail(self, job_id, worker_id, error, status_code, retry_delay=None):
+        def fail_attempt(conn):
+            job = self._load_owned(conn, job_id, worker_id)
+            if job is None:
+                return False
+            now = time.time()
+            job.error, job.status_code, job.updated_at, job.lease_expires_at = error, status_code, now, None
+            if retry_delay is not None and job.attempts < job.max_attempts:
+                job.status, job.worker_id, job.available_at = "queued", None, now + retry_delay
+            else:
+                job.status = "failed"
+            self._write(conn, job)
+            return True
+        return await asyncio.to_thread(self._transaction, fail_attempt)
+
+    async def get(self, job_id):
+        def load():
+            with closing(self._connect()) as conn:
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row) if row else None
+        return await asyncio.to_thread(load)
+
+    async def record_worker_heartbeat(self, worker_id, info):
+        def upsert(conn):
+            conn.execute("INSERT OR REPLACE INTO workers (worker_id, last_seen, info) VALUES (?, ?, ?)",
+                         (worker_id, time.time(), json.dumps(info)))
+        await asyncio.to_thread(self._transaction, upsert)
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            cutoff = time.time() - config.WORKER_LIVENESS_SECONDS
+            workers = conn.execute("SELECT worker_id, info FROM workers WHERE last_seen >= ?", (cutoff,)).fetchall()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "jobs": counts,
+            "live_workers": {row["worker_id"]: json.loads(row["info"]) for row in workers},
+        }
+
+    async def stats_async(self):
+        return await asyncio.to_thread(self.stats)
+
+
+_job_queue: JobQueue | None = None
+
+def get_job_queue() -> JobQueue:
+    """Returns the process-wide queue for config.JOB_QUEUE_BACKEND ('memory' or 'sqlite')."""
+    global _job_queue
+    if _job_queue is None:
+        if config.JOB_QUEUE_BACKEND == "sqlite":
+            _job_queue = SQLiteJobQueue(config.JOB_QUEUE_SQLITE_PATH)
+        elif config.JOB_QUEUE_BACKEND == "memory":
+            _job_queue = InMemoryJobQueue()
+        else:
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {config.JOB_QUEUE_BACKEND!r}")
+    return _job_queue
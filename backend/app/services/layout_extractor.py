@@ -0,0 +1,172 @@
+# backend/app/services/layout_extractor.py
+"""
+In-browser layout extraction (SCRAPE_EXTRACTION_MODE = "layout").
+
+Instead of serializing the whole DOM with page.content() and re-parsing it with
+BeautifulSoup, one page.evaluate() call walks the rendered page, drops invisible and
+offscreen nodes and returns a compact tree of the visible elements with the computed
+styles that define the look (colors, fonts, spacing, layout) and their boxes.
+`render_layout_tree` turns that tree into the simplified_html handed to the LLM.
+"""
+import html
+
+from app.core import config
+
+# Runs inside the page. Styles are only reported where they differ from the parent (inherited
+# properties) or from the property's initial value, which keeps the payload small.
+LAYOUT_EXTRACTION_JS = r"""
+(opts) => {
+  const SKIP = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'META', 'LINK', 'IFRAME', 'HEAD', 'TITLE', 'BASE']);
+  const INHERITED = ['color', 'font-family', 'font-size', 'font-weight', 'font-style', 'line-height',
+                     'letter-spacing', 'text-align', 'text-transform'];
+  const OWN = {
+    'background-color': ['rgba(0, 0, 0, 0)', 'transparent'], 'background-image': ['none'],
+    'display': ['inline', 'block'], 'position': ['static'], 'flex-direction': ['row'],
+    'justify-content': ['normal', 'flex-start'], 'align-items': ['normal', 'stretch'], 'gap': ['normal', '0px'],
+    'grid-template-columns': ['none'], 'margin': ['0px'], 'padding': ['0px'], 'border': ['0px none', 'none'],
+    'border-radius': ['0px'], 'box-shadow': ['none'], 'max-width': ['none'], 'opacity': ['1'],
+  };
+  const ATTRS = ['id', 'href', 'alt', 'role', 'aria-label', 'type', 'placeholder'];
+  const vw = window.innerWidth;
+  const docHeight = document.documentElement.scrollHeight;
+  let count = 0, truncated = false;
+
+  const clip = (s, n) => (s.length > n ? s.slice(0, n) + '…' : s);
+
+  function isVisible(cs, rect) {
+    if (cs.display === 'none' || cs.visibility === 'hidden' || cs.visibility === 'collapse') return false;
+    if (parseFloat(cs.opacity) === 0) return false;
+    if (cs.display !== 'contents' && rect.width < 1 && rect.height < 1 && cs.overflow !== 'visible') return false;
+    const left = rect.left + window.scrollX, top = rect.top + window.scrollY;
+    return !(rect.right + window.scrollX <= 0 || left >= vw || rect.bottom + window.scrollY <= 0 || top >= docHeight);
+  }
+
+  function walk(el, parentCs) {
+    if (SKIP.has(el.tagName)) return null;
+    if (count >= opts.maxNodes) { truncated = true; return null; }
+    const cs = getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    if (!isVisible(cs, rect)) return null;
+    count++;
+
+    const node = { t: el.tagName.toLowerCase() };
+    const style = {};
+    for (const p of INHERITED) {
+      const v = cs.getPropertyValue(p);
+      if (!parentCs || v !== parentCs.getPropertyValue(p)) style[p] = v;
+    }
+    for (const [p, initial] of Object.entries(OWN)) {
+      let v = cs.getPropertyValue(p);
+      if (p === 'border' && !v) v = `${cs.borderTopWidth} ${cs.borderTopStyle} ${cs.borderTopColor}`;
+      if (v && !initial.includes(v) && !v.startsWith('0px none')) style[p] = clip(v, 300);
+    }
+    if (Object.keys(style).length) node.s = style;
+    node.b = [Math.round(rect.left + window.scrollX), Math.round(rect.top + window.scrollY),
+              Math.round(rect.width), Math.round(rect.height)];
+
+    const attrs = {};
+    for (const a of ATTRS) { if (el.hasAttribute(a)) attrs[a] = clip(el.getAttribute(a), 200); }
+    if (el.classList.length) attrs['class'] = Array.from(el.classList).slice(0, 4).join(' ');
+    if (el.tagName === 'IMG') attrs['src'] = el.currentSrc || el.src;
+    if (Object.keys(attrs).length) node.a = attrs;
+
+    if (el.tagName.toLowerCase() === 'svg') {
+      const markup = el.outerHTML;
+      if (markup.length <= opts.maxSvgChars) node.svg = markup;
+      return node;
+    }
+
+    const children = [];
+    for (const child of el.childNodes) {
+      if (child.nodeType === Node.TEXT_NODE) {
+        const text = child.textContent.replace(/\s+/g, ' ').trim();
+        if (text) children.push(clip(text, opts.maxTextChars));
+      } else if (child.nodeType === Node.ELEMENT_NODE) {
+        const c = walk(child, cs);
+        if (c) children.push(c);
+      }
+    }
+    if (children.length) node.c = children;
+    return node;
+  }
+
+  const fonts = new Set();
+  document.fonts.forEach((f) => { if (f.status === 'loaded') fonts.add(f.family.replace(/["']/g, '')); });
+
+  return {
+    title: document.title,
+    lang: document.documentElement.lang || null,
+    viewport: { width: vw, height: window.innerHeight },
+    document_height: docHeight,
+    fonts: Array.from(fonts),
+    node_count: count,
+    truncated: truncated,
+    root: walk(document.body, null),
+  };
+}
+"""
+
+_VOID_TAGS = {"img", "br", "hr", "input", "wbr", "source", "area", "col", "embed", "track"}
+
+
+def _subtree_text(node) -> list[str]:
+    if isinstance(node, str):
+        return [node]
+    return [text for child in node.get("c", []) for text in _subtree_text(child)]
+
+
+def _render_node(node, out: list[str], depth: int) -> None:
+    indent = " " * depth
+    if isinstance(node, str):
+        out.append(f"{indent}{html.escape(node, quote=False)}")
+        return
+    if "svg" in node:
+        out.append(f"{indent}{node['svg']}")
+        return
+
+    tag = node["t"]
+    attrs = dict(node.get("a", {}))
+    if node.get("s"):
+        attrs["style"] = "; ".join(f"{k}: {v}" for k, v in node["s"].items())
+    attrs["data-box"] = ",".join(str(v) for v in node["b"])
+    attr_text = "".join(f' {k}="{html.escape(str(v))}"' for k, v in attrs.items())
+
+    if tag in _VOID_TAGS:
+        out.append(f"{indent}<{tag}{attr_text}>")
+        return
+    children = node.get("c", [])
+    if depth >= config.LAYOUT_MAX_RENDER_DEPTH and children:
+        # Wrapper soup this deep adds indentation, not style information: keep only the text.
+        children = [" ".join(_subtree_text(node))]
+    if len(children) == 1 and isinstance(children[0], str):
+        out.append(f"{indent}<{tag}{attr_text}>{html.escape(children[0], quote=False)}</{tag}>")
+        return
+    out.append(f"{indent}<{tag}{attr_text}>")
+    for child in children:
+        _render_node(child, out, depth + 1)
+    out.append(f"{indent}</{tag}>")
+
+
+def render_layout_tree(layout: dict) -> str:
+    """
+    Renders the extracted layout tree as compact HTML: computed styles inline, and each
+    element's page box (x, y, width, height in CSS px) in a data-box attribute. Elements at
+    LAYOUT_MAX_RENDER_DEPTH get the text of their whole subtree instead of child elements.
+    """
+    if not layout or not layout.get("root"):
+        return "<!-- Layout extraction returned no visible content -->"
+    viewport = layout["viewport"]
+    out = [
+        "<!DOCTYPE html>",
+        f'<html lang="{html.escape(layout.get("lang") or "")}">',
+        "<head>",
+        f" <title>{html.escape(layout.get('title') or '')}</title>",
+        f" <!-- Rendered layout at {viewport['width']}x{viewport['height']}, document height "
+        f"{layout['document_height']}px, {layout['node_count']} visible elements"
+        f"{' (truncated)' if layout.get('truncated') else ''}. Loaded fonts: "
+        f"{', '.join(layout.get('fonts') or []) or 'none'}. data-box = x,y,width,height -->",
+        "</head>",
+    ]
+    _render_node(layout["root"], out, 0)
+    out.append("</html>")
+    return "\n".join(out)
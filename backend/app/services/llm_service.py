@@ -1,45 +1,504 @@
 # backend/app/services/llm_service.py
 import base64
 import asyncio
+import math
+import threading
+import time
 import traceback
 from fastapi import HTTPException
 
-import google.cloud.aiplatform as aiplatform
-from vertexai.generative_models import GenerativeModel, Part, Image
-from vertexai.generative_models import GenerationConfig, SafetySetting, HarmCategory, HarmBlockThreshold
-import google.api_core.exceptions
 import json
+from html.parser import HTMLParser
 # Import config variables
-from app.core import config
+from app.core import config, metrics
+from app.services import admission_service, resume_parser
+
+# NOTE: google.cloud.aiplatform / vertexai are heavy (several seconds of import time).
+# They are imported inside the functions that need them so the API process can
+# answer health checks before the SDK is loaded.
 
 _vertex_ai_initialized = False
+_vertex_ai_state = "not_started" # not_started -> initializing -> ready | failed
+_vertex_ai_init_lock = threading.Lock()
 
 def initialize_vertex_ai():
-    global _vertex_ai_initialized
+    """
+    Imports the Vertex AI SDK and initializes it. Blocking (seconds of import time): call it from
+    a worker thread, or from async code through ensure_vertex_ai().
+    """
+    global _vertex_ai_initialized, _vertex_ai_state
     if _vertex_ai_initialized: return True
-    if not config.GCP_PROJECT_ID:
-        print("CRITICAL: GCP_PROJECT_ID is not defined. LLM functionality will be unavailable.")
-        _vertex_ai_initialized = False
-        return False
-    try:
-        print(f"Attempting to initialize Vertex AI for project {config.GCP_PROJECT_ID} in {config.GCP_LOCATION}...")
-        aiplatform.init(project=config.GCP_PROJECT_ID, location=config.GCP_LOCATION)
-        print(f"Vertex AI successfully initialized for project {config.GCP_PROJECT_ID} in {config.GCP_LOCATION}.")
+    if config.LLM_FAKE_MODEL:
+        # The fake model makes no network calls; nothing to initialize.
         _vertex_ai_initialized = True
+        _vertex_ai_state = "ready"
         return True
+    # Startup warms this in a worker thread; a request may race it, so serialize.
+    with _vertex_ai_init_lock:
+        if _vertex_ai_initialized: return True
+        _vertex_ai_state = "initializing"
+        if not config.GCP_PROJECT_ID:
+            print("CRITICAL: GCP_PROJECT_ID is not defined. LLM functionality will be unavailable.")
+            _vertex_ai_initialized = False
+            _vertex_ai_state = "failed"
+            return False
+        try:
+            print(f"Attempting to initialize Vertex AI for project {config.GCP_PROJECT_ID} in {config.GCP_LOCATION}...")
+            import google.cloud.aiplatform as aiplatform
+            # Loaded here so the function-level imports in the generation code are sys.modules hits.
+            import vertexai.generative_models # noqa: F401
+            import google.api_core.exceptions # noqa: F401
+            aiplatform.init(project=config.GCP_PROJECT_ID, location=config.GCP_LOCATION)
+            print(f"Vertex AI successfully initialized for project {config.GCP_PROJECT_ID} in {config.GCP_LOCATION}.")
+            _vertex_ai_initialized = True
+            _vertex_ai_state = "ready"
+            return True
+        except Exception as e:
+            print(f"CRITICAL: Error initializing Vertex AI: {e}\n{traceback.format_exc()}")
+            _vertex_ai_initialized = False
+            _vertex_ai_state = "failed"
+            return False
+
+async def ensure_vertex_ai() -> bool:
+    """initialize_vertex_ai() for async callers: the import and the init lock are waited on in a thread."""
+    if _vertex_ai_initialized: return True
+    return await asyncio.to_thread(initialize_vertex_ai)
+
+def is_vertex_ai_initialized() -> bool:
+    return _vertex_ai_initialized
+
+def vertex_ai_state() -> str:
+    """One of "not_started", "initializing", "ready" or "failed". A later request retries a failed init."""
+    return _vertex_ai_state
+
+# --- Truncation handling for long HTML generations ---
+
+_FINISH_REASON_STOP = 1
+_FINISH_REASON_MAX_TOKENS = 2
+
+# Elements that never have a closing tag, and ones whose closing tag HTML lets authors omit.
+_VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+_OPTIONAL_CLOSE_ELEMENTS = {"p", "li", "dt", "dd", "option", "optgroup", "tr", "td", "th", "thead", "tbody", "tfoot", "colgroup", "rt", "rp", "head", "body", "html"}
+
+_CONTINUATION_PROMPT = (
+    "Your previous response was cut off because it hit the output length limit. "
+    "Continue the HTML document EXACTLY where it stopped, starting with the very next character. "
+    "Do not repeat any earlier content, do not restart the document, and do not wrap the output in markdown fences."
+)
+
+
+class _TagStackParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack: list[str] = []
+        self.stray_closes: list[str] = []
+        self.implicitly_closed: list[str] = [] # Non-optional tags closed only by an outer end tag
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in _VOID_ELEMENTS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_ELEMENTS:
+            return
+        # Pop back to the matching open tag; anything skipped must have an optional close tag.
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i] == tag:
+                self.implicitly_closed.extend(t for t in self.stack[i + 1:] if t not in _OPTIONAL_CLOSE_ELEMENTS)
+                del self.stack[i:]
+                return
+        self.stray_closes.append(tag)
+
+
+def validate_html_structure(html: str) -> list[str]:
+    """
+    Cheap structural check of a generated HTML document (a single pass of the stdlib parser,
+    no DOM). Returns a list of problems; an empty list means the document looks complete.
+    """
+    problems = []
+    stripped = html.strip()
+    lowered = stripped.lower()
+    if not lowered.startswith(("<!doctype html", "<html")):
+        problems.append("document does not start with <!DOCTYPE html> or <html>")
+    if not lowered.endswith("</html>"):
+        problems.append("document does not end with </html>")
+    if stripped.rfind("<") > stripped.rfind(">"):
+        problems.append("document ends inside a tag")
+
+    parser = _TagStackParser()
+    try:
+        parser.feed(stripped)
+        parser.close()
     except Exception as e:
-        print(f"CRITICAL: Error initializing Vertex AI: {e}\n{traceback.format_exc()}")
-        _vertex_ai_initialized = False
-        return False
+        problems.append(f"HTML parser error: {e}")
+        return problems
+    unclosed = parser.implicitly_closed + [tag for tag in parser.stack if tag not in _OPTIONAL_CLOSE_ELEMENTS]
+    if unclosed:
+        problems.append(f"unclosed tags: {', '.join(unclosed[-10:])}")
+    return problems
+
+
+def _is_truncated(finish_reason, html: str) -> bool:
+    return finish_reason == _FINISH_REASON_MAX_TOKENS or not html.strip().lower().endswith("</html>")
+
+
+def _strip_markdown_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```html"): text = text[7:]
+    elif text.startswith("```"): text = text[3:]
+    if text.endswith("```"): text = text[:-3]
+    return text
+
+
+def _splice_continuation(partial: str, continuation: str) -> str:
+    """
+    Appends a continuation to a truncated document. Models often re-emit the tail of what
+    they already wrote (typically the last, incomplete line), so the longest suffix of
+    `partial` that is also a prefix of `continuation` is emitted only once.
+    """
+    window = min(len(partial), len(continuation), config.LLM_CONTINUATION_OVERLAP_WINDOW)
+    for size in range(window, config.LLM_CONTINUATION_MIN_OVERLAP - 1, -1):
+        if partial.endswith(continuation[:size]):
+            return partial + continuation[size:]
+    # Also tolerate the continuation restarting the line the partial output was cut in.
+    last_line_start = partial.rfind("\n") + 1
+    last_line = partial[last_line_start:].lstrip()
+    if len(last_line) >= config.LLM_CONTINUATION_MIN_OVERLAP and continuation.lstrip().startswith(last_line):
+        return partial[:last_line_start] + continuation.lstrip()
+    return partial + continuation
+
+
+def _candidate_text(response) -> tuple[str, object]:
+    """Returns (text, finish_reason) of the first candidate, or ("", None) if there is none."""
+    if not response or not response.candidates:
+        return "", None
+    candidate = response.candidates[0]
+    if not candidate.content or not candidate.content.parts:
+        return "", candidate.finish_reason
+    text = "".join(p.text for p in candidate.content.parts if hasattr(p, 'text') and p.text)
+    return text, candidate.finish_reason
+
+
+def _add_usage(usage: dict | None, response) -> None:
+    if usage is not None:
+        usage.pop("pending_input_tokens", None)
+    metadata = getattr(response, "usage_metadata", None)
+    if usage is None or metadata is None:
+        return
+    usage["input_tokens"] = usage.get("input_tokens", 0) + (getattr(metadata, "prompt_token_count", 0) or 0)
+    usage["output_tokens"] = usage.get("output_tokens", 0) + (getattr(metadata, "candidates_token_count", 0) or 0)
+
+
+async def _generate_html_document(model, prompt_parts: list, generation_config, safety_settings, label: str, usage: dict | None = None) -> str:
+    """
+    Runs one HTML generation and, if the output was truncated (MAX_TOKENS finish reason or
+    no closing </html>), asks the model to continue from where it stopped instead of
+    regenerating from scratch. Continuations are spliced with overlap de-duplication.
+    Token usage across all calls is added to `usage` when given.
+
+    Raises:
+        HTTPException (500): If the model returned no content, or the document is still
+            truncated after LLM_MAX_CONTINUATIONS continuations.
+    """
+    if usage is not None:
+        usage["pending_input_tokens"] = _estimate_prompt_tokens(prompt_parts)
+    async with admission_service.llm_stage.slot():
+        response = await model.generate_content_async(contents=prompt_parts, generation_config=generation_config, safety_settings=safety_settings)
+    _add_usage(usage, response)
+    print(f"[{label}] Received response from Gemini.")
+    if response and response.candidates:
+        candidate = response.candidates[0]
+        print(f"[{label}] Candidate Finish Reason: {candidate.finish_reason}")
+        if hasattr(candidate, 'safety_ratings'): print(f"[{label}] Candidate Safety Ratings: {candidate.safety_ratings}")
+        if hasattr(response, 'usage_metadata'): print(f"[{label}] Usage Metadata: {response.usage_metadata}")
+
+    raw_generated_text, finish_reason = _candidate_text(response)
+    if not raw_generated_text:
+        raise HTTPException(status_code=500, detail="LLM response did not contain valid candidates or content.")
+    print(f"[{label}] RAW LLM OUTPUT (first 500 chars):\n---\n{raw_generated_text[:500]}...\n---")
+    generated_html = _strip_markdown_fences(raw_generated_text)
+
+    continuations = 0
+    while _is_truncated(finish_reason, generated_html):
+        if finish_reason == _FINISH_REASON_STOP and continuations == 0 and not validate_html_structure(generated_html + "</html>"):
+            # Model finished naturally and only omitted the final tag.
+            generated_html += "\n</html>"
+            break
+        if continuations >= config.LLM_MAX_CONTINUATIONS:
+            raise HTTPException(status_code=500, detail=f"LLM output was still truncated after {continuations} continuation(s).")
+        generative_models = _generative_models()
+        Content, Part = generative_models.Content, generative_models.Part
+        continuations += 1
+        print(f"[{label}] Output truncated (finish reason {finish_reason}, {len(generated_html)} chars); requesting continuation {continuations}/{config.LLM_MAX_CONTINUATIONS}...")
+        contents = [
+            Content(role="user", parts=prompt_parts),
+            Content(role="model", parts=[Part.from_text(generated_html)]),
+            Content(role="user", parts=[Part.from_text(_CONTINUATION_PROMPT)]),
+        ]
+        if usage is not None:
+            usage["pending_input_tokens"] = _estimate_prompt_tokens(contents)
+        async with admission_service.llm_stage.slot():
+            response = await model.generate_content_async(contents=contents, generation_config=generation_config, safety_settings=safety_settings)
+        _add_usage(usage, response)
+        continuation_text, finish_reason = _candidate_text(response)
+        continuation_text = _strip_markdown_fences(continuation_text) if continuation_text.strip().startswith("```") else continuation_text
+        if not continuation_text.strip():
+            raise HTTPException(status_code=500, detail="LLM returned an empty continuation for a truncated document.")
+        if continuation_text.lstrip().lower().startswith(("<!doctype html", "<html")):
+            print(f"[{label}] Continuation restarted the document; using it as the new output.")
+            generated_html = continuation_text.strip()
+        else:
+            generated_html = _splice_continuation(generated_html, continuation_text)
+
+    problems = validate_html_structure(generated_html)
+    if problems:
+        print(f"[{label}] Warning: generated HTML has structural problems: {'; '.join(problems)}")
+    if continuations:
+        print(f"[{label}] Completed document after {continuations} continuation(s) ({len(generated_html)} chars).")
+    return generated_html.strip()
+
+
+# --- Model tier routing and hedged requests ---
+
+class RoutingStats:
+    """Routing decisions, hedges, winners and token cost per model tier, for /metrics."""
+
+    def __init__(self):
+        self.decisions: dict[str, int] = {}
+        self.hedges_fired = 0
+        self.winners: dict[str, int] = {}
+        self.tiers: dict[str, dict] = {}
+
+    def _tier(self, tier: str) -> dict:
+        return self.tiers.setdefault(tier, {"calls": 0, "failed": 0, "cancelled": 0, "total_seconds": 0.0,
+                                            "input_tokens": 0, "output_tokens": 0, "estimated_cost_usd": 0.0})
+
+    def record_decision(self, tier: str, reason: str) -> None:
+        key = f"{tier}:{reason}"
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+
+    def record_call(self, tier: str, outcome: str, seconds: float, usage: dict) -> None:
+        stats = self._tier(tier)
+        stats["calls"] += 1
+        if outcome != "ok":
+            stats[outcome] += 1
+        stats["total_seconds"] += seconds
+        stats["input_tokens"] += usage.get("input_tokens", 0)
+        stats["output_tokens"] += usage.get("output_tokens", 0)
+        pricing = config.MODEL_TIER_PRICING_PER_MTOK.get(tier, {"input": 0.0, "output": 0.0})
+        stats["estimated_cost_usd"] += (usage.get("input_tokens", 0) * pricing["input"] + usage.get("output_tokens", 0) * pricing["output"]) / 1_000_000
+
+    def record_winner(self, label: str) -> None:
+        self.winners[label] = self.winners.get(label, 0) + 1
+
+    def snapshot(self) -> dict:
+        tiers = {}
+        for tier, stats in self.tiers.items():
+            tiers[tier] = {**stats, "avg_seconds": round(stats["total_seconds"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                           "estimated_cost_usd": round(stats["estimated_cost_usd"], 4)}
+            del tiers[tier]["total_seconds"]
+        return {"decisions": dict(self.decisions), "hedges_fired": self.hedges_fired, "winners": dict(self.winners), "tiers": tiers}
+
+
+routing_stats = RoutingStats()
+metrics.register("llm_routing", routing_stats.snapshot)
+
+
+def _generative_models():
+    """vertexai.generative_models, or fake_llm's stand-ins for its classes when LLM_FAKE_MODEL is set."""
+    if config.LLM_FAKE_MODEL:
+        from app.services import fake_llm
+        return fake_llm
+    import vertexai.generative_models
+    return vertexai.generative_models
+
+
+def _resource_exhausted_error() -> type[Exception]:
+    if config.LLM_FAKE_MODEL:
+        from app.services.fake_llm import ResourceExhausted
+        return ResourceExhausted
+    import google.api_core.exceptions
+    return google.api_core.exceptions.ResourceExhausted
+
+
+def _get_model(model_name: str):
+    """GenerativeModel for `model_name`, or the local fake when LLM_FAKE_MODEL is set."""
+    return _generative_models().GenerativeModel(model_name)
+
+
+def _png_dimensions(header: bytes) -> tuple[int, int]:
+    """(width, height) from a PNG's IHDR header, or (0, 0) if it isn't a PNG."""
+    if header[:8] != b"\x89PNG\r\n\x1a\n" or len(header) < 24:
+        return 0, 0
+    return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+
+
+def _png_height(screenshot_base64: str) -> int:
+    """Reads the image height from the PNG IHDR header without decoding the whole screenshot."""
+    try:
+        return _png_dimensions(base64.b64decode(screenshot_base64[:32]))[1]
+    except (ValueError, TypeError):
+        return 0
+
+
+def _estimate_prompt_tokens(contents) -> int:
+    """
+    Rough input token count of a prompt (parts, Content turns or strings), for calls whose
+    usage metadata never arrives: ~4 characters per text token, 258 tokens per image up to
+    384px and per 768px tile for larger images.
+    """
+    tokens = 0
+    for item in contents:
+        if isinstance(item, str):
+            tokens += len(item) // 4
+            continue
+        if getattr(item, "role", None) is not None:
+            tokens += _estimate_prompt_tokens(item.parts)
+            continue
+        try:
+            text = item.text
+        except (AttributeError, ValueError):
+            text = None
+        if text:
+            tokens += len(text) // 4
+            continue
+        data = getattr(getattr(item, "inline_data", None), "data", None)
+        if data:
+            width, height = _png_dimensions(data[:24])
+            if width <= 384 and height <= 384:
+                tokens += 258
+            else:
+                tokens += 258 * math.ceil(width / 768) * math.ceil(height / 768)
+    return tokens
+
+
+def extract_routing_features(simplified_html: str | None, desktop_screenshot_base64: str, mobile_screenshot_base64: str, resume_json: dict | None = None) -> dict:
+    return {
+        "html_chars": len(simplified_html or ""),
+        "screenshot_height": max(_png_height(desktop_screenshot_base64 or ""), _png_height(mobile_screenshot_base64 or "")),
+        "resume_chars": len(json.dumps(resume_json)) if resume_json is not None else 0,
+    }
+
+
+def choose_model_tier(features: dict) -> tuple[str, str]:
+    """
+    Picks the model tier for a generation from cheap input features. Small pages (little HTML,
+    short screenshots, short resume) go to the fast tier; anything larger stays on pro.
+    Returns (tier, reason).
+    """
+    if not config.MODEL_ROUTING_ENABLED:
+        return "pro", "routing_disabled"
+    if features["html_chars"] > config.ROUTE_FAST_MAX_HTML_CHARS:
+        return "pro", "large_html"
+    if features["screenshot_height"] > config.ROUTE_FAST_MAX_SCREENSHOT_HEIGHT:
+        return "pro", "tall_page"
+    if features["resume_chars"] > config.ROUTE_FAST_MAX_RESUME_CHARS:
+        return "pro", "large_resume"
+    return "fast", "simple_page"
+
+
+async def _generate_on_tier(tier: str, prompt_parts: list, generation_config, safety_settings, label: str) -> str:
+    model_name = config.MODEL_TIERS[tier]
+    usage: dict = {}
+    started = time.monotonic()
+    outcome = "failed"
+    try:
+        print(f"[{label}] Generating on tier '{tier}' ({model_name})...")
+        html = await _generate_html_document(_get_model(model_name), prompt_parts, generation_config, safety_settings, f"{label}/{tier}", usage)
+        outcome = "ok"
+        return html
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        # The cancelled call's prompt is billed even though its usage metadata never arrives
+        # (its output is too, but that can't be known).
+        usage["input_tokens"] = usage.get("input_tokens", 0) + usage.pop("pending_input_tokens", 0)
+        raise
+    finally:
+        routing_stats.record_call(tier, outcome, time.monotonic() - started, usage)
+
+
+async def _generate_with_routing(prompt_parts: list, generation_config, safety_settings, label: str, features: dict) -> str:
+    """
+    Generates on the tier chosen by `choose_model_tier`. When that is not the fast tier and
+    hedging is on, a fast-tier request is fired if the primary hasn't answered within
+    HEDGE_AFTER_SECONDS; the first structurally valid document wins and the other request
+    is cancelled. If neither result validates, the first one to arrive is returned.
+    """
+    tier, reason = choose_model_tier(features)
+    routing_stats.record_decision(tier, reason)
+    print(f"[{label}] Routing to tier '{tier}' ({reason}); features={features}")
+    primary = asyncio.create_task(_generate_on_tier(tier, prompt_parts, generation_config, safety_settings, label))
+
+    if not config.HEDGE_ENABLED or tier == config.HEDGE_TIER:
+        result = await primary
+        routing_stats.record_winner(f"{tier}:primary")
+        return result
+
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=config.HEDGE_AFTER_SECONDS)
+        if done:
+            routing_stats.record_winner(f"{tier}:primary")
+            return primary.result()
+
+        print(f"[{label}] Tier '{tier}' slower than {config.HEDGE_AFTER_SECONDS}s; hedging on '{config.HEDGE_TIER}'.")
+        routing_stats.hedges_fired += 1
+        hedge = asyncio.create_task(_generate_on_tier(config.HEDGE_TIER, prompt_parts, generation_config, safety_settings, label))
+        labels = {primary: f"{tier}:primary", hedge: f"{config.HEDGE_TIER}:hedge"}
+        pending = {primary, hedge}
+        fallback = None
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    first_error = first_error or task.exception()
+                    continue
+                if not validate_html_structure(task.result()):
+                    routing_stats.record_winner(labels[task])
+                    return task.result()
+                fallback = fallback or task
+        if fallback is not None:
+            routing_stats.record_winner(labels[fallback])
+            return fallback.result()
+        raise first_error
+    finally:
+        # Cancel the loser (or both, if we were cancelled ourselves).
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+def _screenshot_parts(caption: str, screenshot_base64: str | None) -> list:
+    """Prompt parts for one screenshot; none when the scrape has no screenshot (static text_only mode)."""
+    if not screenshot_base64:
+        return []
+    generative_models = _generative_models()
+    Part, Image = generative_models.Part, generative_models.Image
+    return [Part.from_text(caption), Part.from_image(Image.from_bytes(base64.b64decode(screenshot_base64)))]
+
+
+def _no_screenshots_note(*screenshots: str | None) -> list:
+    if any(screenshots):
+        return []
+    return [_generative_models().Part.from_text("\nNo screenshots are available for this site; infer the visual design from the HTML and its CSS.\n")]
+
 
 async def generate_html_with_llm(cleaned_html: str, desktop_screenshot_base64: str, mobile_screenshot_base64: str) -> str:
     '''
     This function is for any website, not for a portfolio website
     doesnt take resume in form of json unlike the other one.
     '''
-    if not initialize_vertex_ai():
+    if not await ensure_vertex_ai():
         raise HTTPException(status_code=500, detail="Vertex AI not initialized or initialization failed.")
-    
+    generative_models = _generative_models()
+    Part, GenerationConfig, SafetySetting = generative_models.Part, generative_models.GenerationConfig, generative_models.SafetySetting
+    HarmCategory, HarmBlockThreshold = generative_models.HarmCategory, generative_models.HarmBlockThreshold
+    ResourceExhausted = _resource_exhausted_error()
+
     system_prompt = """
 You are an expert web developer specializing in creating HTML and CSS replicas of websites.
 Your goal is to generate a single, self-contained HTML file with an embedded CSS <style> block in the <head> that visually replicates the provided website design as closely as possible.
@@ -66,13 +525,12 @@ Instructions:
 
     for attempt in range(max_retries + 1):
         try:
-            model = GenerativeModel(config.MODEL_NAME)
             prompt_parts = [
                 Part.from_text(system_prompt), Part.from_text("\n\nHere is the design context:\n\nCleaned HTML Structure:\n```html\n"),
-                Part.from_text(cleaned_html), Part.from_text("\n```\n\nDesktop Screenshot (Base64 PNG):\n"),
-                Part.from_image(Image.from_bytes(base64.b64decode(desktop_screenshot_base64))),
-                Part.from_text("\n\nMobile Screenshot (Base64 PNG):\n"),
-                Part.from_image(Image.from_bytes(base64.b64decode(mobile_screenshot_base64))),
+                Part.from_text(cleaned_html), Part.from_text("\n```\n"),
+                *_screenshot_parts("\nDesktop Screenshot (Base64 PNG):\n", desktop_screenshot_base64),
+                *_screenshot_parts("\n\nMobile Screenshot (Base64 PNG):\n", mobile_screenshot_base64),
+                *_no_screenshots_note(desktop_screenshot_base64, mobile_screenshot_base64),
                 Part.from_text("\n\nPlease generate the complete HTML code as a single block, starting with <!DOCTYPE html>.")
             ]
             generation_config_obj = GenerationConfig(temperature=0.2, top_p=0.95, top_k=40, max_output_tokens=current_max_output_tokens, response_mime_type="text/plain")
@@ -83,32 +541,11 @@ Instructions:
                 SafetySetting(category=HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, threshold=HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE)
             ]
             
-            print(f"Sending request to Gemini model (Attempt {attempt + 1}): {config.MODEL_NAME} with max_output_tokens={current_max_output_tokens}...")
-            response = await model.generate_content_async(contents=prompt_parts, generation_config=generation_config_obj, safety_settings=safety_settings_list)
-            print("Received response from Gemini.")
-            
-            if response and response.candidates:
-                candidate = response.candidates[0]
-                print(f"Candidate Finish Reason: {candidate.finish_reason}")
-                if hasattr(candidate, 'safety_ratings'): print(f"Candidate Safety Ratings: {candidate.safety_ratings}")
-                if hasattr(response, 'usage_metadata'): print(f"Usage Metadata: {response.usage_metadata}")
-                
-                if candidate.finish_reason == 2: print("Warning: Output truncated due to MAX_TOKENS limit.")
-                
-                if candidate.content and candidate.content.parts:
-                    raw_generated_text = "".join(p.text for p in candidate.content.parts if hasattr(p, 'text') and p.text)
-                    print(f"RAW LLM OUTPUT (first 500 chars):\n---\n{raw_generated_text[:500]}...\n---")
-                    
-                    generated_html = raw_generated_text
-                    if generated_html.strip().startswith("```html"): generated_html = generated_html.strip()[7:]
-                    if generated_html.strip().endswith("```"): generated_html = generated_html.strip()[:-3]
-                    
-                    if not generated_html.strip() and candidate.finish_reason == 1: 
-                         print("Warning: Generated HTML is empty after stripping markdown, though model stopped naturally.")
-                    return generated_html.strip() 
-            raise HTTPException(status_code=500, detail="LLM response did not contain valid candidates or content.")
-        
-        except google.api_core.exceptions.ResourceExhausted as e_res_exhausted:
+            print(f"Sending clone request to Gemini (Attempt {attempt + 1}) with max_output_tokens={current_max_output_tokens}...")
+            features = extract_routing_features(cleaned_html, desktop_screenshot_base64, mobile_screenshot_base64)
+            return await _generate_with_routing(prompt_parts, generation_config_obj, safety_settings_list, "clone", features)
+
+        except ResourceExhausted as e_res_exhausted:
             print(f"ResourceExhausted error (Attempt {attempt + 1}): {e_res_exhausted}")
             if attempt < max_retries:
                 delay = base_delay * (2 ** attempt)
@@ -117,6 +554,8 @@ Instructions:
             else:
                 print("Max retries reached for ResourceExhausted error.")
                 raise HTTPException(status_code=429, detail=f"Resource exhausted after multiple retries: {str(e_res_exhausted)}")
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error calling LLM: {type(e).__name__} - {e}\n{traceback.format_exc()}")
             raise HTTPException(status_code=500, detail=f"Failed to generate HTML with LLM. Error: {str(e)}")
@@ -125,12 +564,79 @@ Instructions:
 
 
 # --- NEW FUNCTION for parsing resume text ---
+class ResumeParseStats:
+    """Counts how resumes were parsed: locally (fast path), locally + LLM fill-in, or fully by the LLM."""
+
+    def __init__(self):
+        self.counts = {"local": 0, "llm_fill": 0, "llm_full": 0}
+        self.fill_fallbacks = 0 # llm_fill parses whose LLM call failed and that returned the local parse
+        self.local_parse_ms_total = 0.0
+
+    def record(self, outcome: str, local_ms: float) -> None:
+        self.counts[outcome] += 1
+        self.local_parse_ms_total += local_ms
+
+    def snapshot(self) -> dict:
+        total = sum(self.counts.values())
+        return {
+            **self.counts,
+            "total": total,
+            "fast_path_hit_rate": round(self.counts["local"] / total, 3) if total else None,
+            "llm_calls_avoided": self.counts["local"],
+            "llm_fill_fallbacks": self.fill_fallbacks,
+            "avg_local_parse_ms": round(self.local_parse_ms_total / total, 2) if total else None,
+        }
+
+
+resume_parse_stats = ResumeParseStats()
+metrics.register("resume_parsing", resume_parse_stats.snapshot)
+
+
 async def parse_resume_to_json(resume_text: str) -> dict:
     """
-    Uses an LLM to parse raw resume text into a structured JSON object.
+    Parses raw resume text into a structured JSON object.
+
+    The local deterministic parser runs first; the LLM is only asked to fill in the fields it
+    missed or is unsure of (medium confidence) or to parse the whole resume (low confidence).
+    If a fill-in call fails, the local parse is returned as it is.
     """
-    if not initialize_vertex_ai():
+    if not config.RESUME_LOCAL_PARSE_ENABLED:
+        return await _parse_resume_with_llm(resume_text)
+
+    started = time.perf_counter()
+    local_json, confidence, fields = resume_parser.parse_resume_locally(resume_text)
+    local_ms = (time.perf_counter() - started) * 1000
+
+    # A medium-confidence parse with nothing left to fill is as good as the LLM would do.
+    if confidence >= config.RESUME_LOCAL_HIGH_CONFIDENCE or (confidence >= config.RESUME_LOCAL_LOW_CONFIDENCE and not fields):
+        print(f"Resume parsed locally in {local_ms:.1f}ms (confidence {confidence:.2f}); skipping LLM.")
+        resume_parse_stats.record("local", local_ms)
+        return local_json
+    if confidence >= config.RESUME_LOCAL_LOW_CONFIDENCE and fields:
+        print(f"Resume parsed locally (confidence {confidence:.2f}); asking LLM to fill: {', '.join(fields)}")
+        resume_parse_stats.record("llm_fill", local_ms)
+        try:
+            filled = await _parse_resume_with_llm(resume_text, partial_resume=local_json, fields=fields)
+        except Exception as e:
+            # The local parse is usable on its own; a failed fill-in shouldn't fail the build.
+            detail = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__} - {e}"
+            print(f"LLM fill-in of resume fields failed ({detail}); falling back to the local parse.")
+            resume_parse_stats.fill_fallbacks += 1
+            return local_json
+        return {**local_json, **{key: filled[key] for key in fields if filled.get(key)}}
+    print(f"Local resume parse confidence {confidence:.2f} is too low; using LLM parser.")
+    resume_parse_stats.record("llm_full", local_ms)
+    return await _parse_resume_with_llm(resume_text)
+
+
+async def _parse_resume_with_llm(resume_text: str, partial_resume: dict | None = None, fields: list[str] | None = None) -> dict:
+    """
+    Uses an LLM to parse raw resume text into a structured JSON object. With `partial_resume`
+    and `fields`, only those fields are requested (the rest were already extracted locally).
+    """
+    if not await ensure_vertex_ai():
         raise HTTPException(status_code=500, detail="Vertex AI not initialized for resume parsing.")
+    GenerationConfig = _generative_models().GenerationConfig
 
     # A cheaper, faster model might be suitable for this parsing task.
     # We can use a config variable or hardcode it for now.
@@ -184,9 +690,15 @@ The JSON object must have the following schema:
 }
 If a field is not present in the resume text, omit the key or set its value to null. For arrays like 'experience', if there are no items, provide an empty array [].
 The entire output must be ONLY the JSON object, with no surrounding text, comments, or markdown fences like ```json.
+"""
+    if partial_resume is not None:
+        system_prompt += f"""
+The following fields were already extracted and must NOT be repeated:
+{json.dumps({k: v for k, v in partial_resume.items() if k not in fields}, indent=2)}
+Return a JSON object containing ONLY these keys: {", ".join(fields)}.
 """
     try:
-        model = GenerativeModel(parser_model_name)
+        model = _get_model(parser_model_name)
         
         # We need to explicitly ask for JSON output
         generation_config = GenerationConfig(
@@ -195,10 +707,11 @@ The entire output must be ONLY the JSON object, with no surrounding text, commen
         )
         
         print(f"Sending resume text to {parser_model_name} for parsing...")
-        response = await model.generate_content_async(
-            [system_prompt, resume_text],
-            generation_config=generation_config
-        )
+        async with admission_service.llm_stage.slot():
+            response = await model.generate_content_async(
+                [system_prompt, resume_text],
+                generation_config=generation_config
+            )
 
         print("Received parsed resume from LLM.")
         
@@ -206,7 +719,6 @@ The entire output must be ONLY the JSON object, with no surrounding text, commen
         parsed_json_text = response.text
         
         # Use a robust way to parse the JSON from the response text
-        import json
         return json.loads(parsed_json_text)
 
     except Exception as e:
@@ -223,10 +735,13 @@ async def generate_portfolio_from_context(
     """
     Uses style context and structured user data (JSON) to generate a portfolio page.
     """
-    if not initialize_vertex_ai():
+    if not await ensure_vertex_ai():
         raise HTTPException(status_code=500, detail="Vertex AI not initialized for portfolio generation.")
+    generative_models = _generative_models()
+    Part, GenerationConfig, SafetySetting = generative_models.Part, generative_models.GenerationConfig, generative_models.SafetySetting
+    HarmCategory, HarmBlockThreshold = generative_models.HarmCategory, generative_models.HarmBlockThreshold
+    ResourceExhausted = _resource_exhausted_error()
 
-    builder_model_name = config.MODEL_NAME # Or config.BUILDER_MODEL_NAME
     system_prompt = """
     You are an expert web developer and UI/UX designer. You are building a single-page personal portfolio.
 
@@ -288,15 +803,12 @@ async def generate_portfolio_from_context(
 
     for attempt in range(max_retries + 1):
         try:
-            model = GenerativeModel(builder_model_name)
-            
             prompt_parts = [
                 Part.from_text(system_prompt),
                 Part.from_text("\n\n--- STYLE AND STRUCTURAL GUIDE ---\n"),
-                Part.from_text("Desktop Screenshot:\n"),
-                Part.from_image(Image.from_bytes(base64.b64decode(scraped_context['desktop_screenshot_base64']))),
-                Part.from_text("\nMobile Screenshot:\n"),
-                Part.from_image(Image.from_bytes(base64.b64decode(scraped_context['mobile_screenshot_base64']))),
+                *_screenshot_parts("Desktop Screenshot:\n", scraped_context['desktop_screenshot_base64']),
+                *_screenshot_parts("\nMobile Screenshot:\n", scraped_context['mobile_screenshot_base64']),
+                *_no_screenshots_note(scraped_context['desktop_screenshot_base64'], scraped_context['mobile_screenshot_base64']),
                 Part.from_text("\nCleaned HTML Structure:\n```html\n"),
                 Part.from_text(scraped_context['simplified_html'] or "<!-- No HTML structure provided -->"),
                 Part.from_text("\n```\n\n--- USER CONTENT (JSON) ---\n```json\n"),
@@ -313,31 +825,22 @@ async def generate_portfolio_from_context(
                 SafetySetting(category=HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, threshold=HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE)
             ]
             
-            print(f"Sending context to {builder_model_name} for portfolio generation (Attempt {attempt + 1})...")
-            response = await model.generate_content_async(contents=prompt_parts, generation_config=generation_config_obj, safety_settings=safety_settings_list)
-            print("Received portfolio response from Gemini.")
-            
-            if response and response.candidates and response.candidates[0].content.parts:
-                candidate = response.candidates[0]
-                print(f"Portfolio Gen Finish Reason: {candidate.finish_reason}")
-                
-                raw_generated_text = "".join(p.text for p in candidate.content.parts if hasattr(p, 'text'))
-                
-                generated_html = raw_generated_text
-                if generated_html.strip().startswith("```html"): generated_html = generated_html.strip()[7:]
-                if generated_html.strip().endswith("```"): generated_html = generated_html.strip()[:-3]
-                
-                return generated_html.strip()
-            
-            raise HTTPException(status_code=500, detail="LLM response for portfolio generation was invalid.")
+            print(f"Sending context to Gemini for portfolio generation (Attempt {attempt + 1})...")
+            features = extract_routing_features(
+                scraped_context['simplified_html'], scraped_context['desktop_screenshot_base64'],
+                scraped_context['mobile_screenshot_base64'], resume_json
+            )
+            return await _generate_with_routing(prompt_parts, generation_config_obj, safety_settings_list, "portfolio", features)
 
-        except google.api_core.exceptions.ResourceExhausted as e:
+        except ResourceExhausted as e:
             # ... (Retry logic as in generate_html_with_llm) ...
             print(f"ResourceExhausted on portfolio gen (Attempt {attempt + 1}): {e}")
             if attempt < max_retries:
                 await asyncio.sleep(base_delay * (2 ** attempt))
             else:
                 raise HTTPException(status_code=429, detail=f"Resource exhausted for portfolio generation: {str(e)}")
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error generating portfolio with LLM: {type(e).__name__} - {e}\n{traceback.format_exc()}")
             raise HTTPException(status_code=500, detail=f"Failed to generate portfolio with LLM. Error: {str(e)}")
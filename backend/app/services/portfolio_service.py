@@ -0,0 +1,135 @@
+# backend/app/services/portfolio_service.py
+import asyncio
+from datetime import datetime
+from fastapi import HTTPException
+
+from app.services import scrape_cache_service, llm_service, s3_service, asset_extraction_service
+from app.models.pydantic_models import ScrapedContext, ClonedHtmlFileResponse, PortfolioBuildConfig
+from app.core import config
+
+
+def validate_reference_context(reference_url: str, scraped_context: ScrapedContext) -> None:
+    """
+    Rejects scraped reference sites that cannot be used as a style guide.
+
+    Raises:
+        HTTPException (422): If the scrape is empty, crashed client-side, or is an empty SPA shell.
+    """
+    if not scraped_context.simplified_html:
+        raise HTTPException(status_code=422, detail="Scraping the reference URL failed. Cannot proceed.")
+    if "Application error: a client-side exception has occurred" in scraped_context.simplified_html:
+        print(f"ERROR: Detected a client-side crash on the reference site: {reference_url}")
+        # Stop the process immediately and return a helpful error to the user.
+        raise HTTPException(
+            status_code=422, # Unprocessable Content
+            detail="The provided reference website encountered a client-side error during processing. This can happen with some modern web frameworks. Please try a different reference URL.")
+    # We check if the simplified_html is very short and basically just the empty root div.
+    if len(scraped_context.simplified_html) < 100 and '<div id="root"></div>' in scraped_context.simplified_html:
+        print(f"ERROR: Scraped an empty shell for SPA site: {reference_url}")
+        raise HTTPException(
+            status_code=422,
+            detail="The reference site seems to be a dynamic application that did not load content in time. Please try a different URL."
+        )
+
+
+async def parse_resume(resume_text: str) -> dict:
+    """Parses resume text into structured JSON and rejects unusable results."""
+    resume_json = await llm_service.parse_resume_to_json(resume_text)
+    if not resume_json.get("name") and not resume_json.get("experience"): # Basic check for successful parse
+        raise HTTPException(status_code=422, detail="Failed to parse resume text into a usable format.")
+    return resume_json
+
+
+async def generate_portfolio_html(scraped_context: ScrapedContext, resume_json: dict) -> str:
+    """Generates the portfolio HTML for an already scraped reference and parsed resume."""
+    generated_portfolio_html = await llm_service.generate_portfolio_from_context(
+        scraped_context=scraped_context.model_dump(), # Pass the context as a dictionary
+        resume_json=resume_json
+    )
+    print("Received generated portfolio HTML.")
+
+    if not generated_portfolio_html.strip():
+        raise HTTPException(status_code=500, detail="LLM generated a blank portfolio. Please try a different reference URL or adjust resume text.")
+    return generated_portfolio_html
+
+
+async def _externalize_shared_assets(html: str) -> str:
+    """
+    Uploads the portfolio's shareable CSS/SVG as content-hashed assets and returns the HTML
+    rewritten to reference them. Falls back to the self-contained HTML if an upload fails.
+    """
+    rewritten_html, assets = asset_extraction_service.extract_shared_assets(html)
+    if not assets:
+        return html
+    try:
+        uploaded = await asyncio.gather(*(
+            asyncio.to_thread(s3_service.upload_asset_if_missing, asset["key"], asset["body"], asset["content_type"])
+            for asset in assets
+        ))
+    except HTTPException as e:
+        print(f"Shared asset upload failed, publishing self-contained HTML instead: {e.detail}")
+        return html
+    before, after = len(html.encode("utf-8")), len(rewritten_html.encode("utf-8"))
+    asset_extraction_service.record(before, after, assets)
+    print(f"Shared assets: {len(assets)} referenced ({sum(uploaded)} newly uploaded); HTML {before} -> {after} bytes.")
+    return rewritten_html
+
+
+async def publish_portfolio(generated_portfolio_html: str, resume_json: dict, filename_suffix: str = "") -> ClonedHtmlFileResponse:
+    """
+    Uploads generated portfolio HTML to S3 and returns the links.
+
+    Args:
+        generated_portfolio_html: Output of `generate_portfolio_html`.
+        resume_json: The structured resume; its name is used in the filename.
+        filename_suffix: Appended to the generated filename, to keep names unique within a batch.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Use the person's name for a more descriptive filename if available
+    person_name = (resume_json.get("name") or "portfolio").strip().replace(" ", "_").lower()
+    filename = f"portfolios/{person_name}_portfolio_{timestamp}{filename_suffix}.html"
+    file_path = f"s3://{config.S3_BUCKET_NAME}/{filename}"
+
+    if config.SHARED_ASSETS_ENABLED:
+        generated_portfolio_html = await _externalize_shared_assets(generated_portfolio_html)
+
+    # The boto3 client is blocking; keep it off the event loop.
+    public_url = await asyncio.to_thread(
+        s3_service.upload_html_to_s3,
+        html_content=generated_portfolio_html,
+        filename=filename
+    )
+
+    return ClonedHtmlFileResponse(
+        message="Portfolio built and deployed successfully.",
+        file_path=file_path, # S3 URI
+        view_link=public_url # Public HTTP URL
+    )
+
+
+async def generate_and_publish(scraped_context: ScrapedContext, resume_json: dict, filename_suffix: str = "") -> ClonedHtmlFileResponse:
+    """Generates the portfolio HTML and publishes it (see `publish_portfolio`)."""
+    generated_portfolio_html = await generate_portfolio_html(scraped_context, resume_json)
+    return await publish_portfolio(generated_portfolio_html, resume_json, filename_suffix)
+
+
+async def build_portfolio(build_config: PortfolioBuildConfig) -> ClonedHtmlFileResponse:
+    """
+    Orchestrates the portfolio building process:
+    1. Scrapes the reference URL for style.
+    2. Parses the user's resume text into structured JSON.
+    3. Generates a new HTML portfolio with the user's data in the reference style.
+    4. Uploads the generated HTML and returns a link to it.
+    """
+    # Step 1: Scrape the reference URL for its style and layout
+    print(f"Step 1: Scraping reference URL: {build_config.reference_url}")
+    scraped_context = await scrape_cache_service.get_or_scrape(build_config.reference_url)
+    validate_reference_context(build_config.reference_url, scraped_context)
+
+    # Step 2: Parse the user's resume text into structured JSON
+    print("Step 2: Parsing resume text with LLM...")
+    resume_json = await parse_resume(build_config.resume_text)
+
+    # Step 3: Generate the new portfolio HTML, save it to S3 and return the links
+    print("Step 3: Generating new portfolio HTML with LLM and uploading to S3...")
+    return await generate_and_publish(scraped_context, resume_json)
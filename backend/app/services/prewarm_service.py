@@ -0,0 +1,93 @@
+# backend/app/services/prewarm_service.py
+"""
+Background prewarming of popular reference sites.
+
+Every PREWARM_INTERVAL_SECONDS the scheduler looks at the most popular reference URLs
+(scrape_cache_service.popularity) and re-scrapes those whose cache entry is missing or due
+for refresh, so user requests for them hit the cache. It only uses idle browser capacity:
+nothing starts while a user scrape is running or waiting, or shortly after user traffic,
+and a prewarm scrape is cancelled as soon as a user request queues for a browser slot.
+"""
+import asyncio
+import time
+
+from app.core import config, metrics
+from app.services import admission_service, scraper_service
+from app.services.scrape_cache_service import scrape_cache, popularity
+
+
+class PrewarmScheduler:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.stats = {"cycles": 0, "scraped": 0, "failed": 0, "preempted": 0, "skipped_busy": 0}
+        self.current_url: str | None = None
+
+    def _idle(self) -> bool:
+        stage = admission_service.browser_stage
+        quiet_for = time.monotonic() - popularity.last_user_request_at
+        return stage.active == 0 and stage.waiting == 0 and quiet_for >= config.PREWARM_QUIET_SECONDS
+
+    async def _due_urls(self) -> list[str]:
+        now = time.time()
+        due = []
+        for url, _score in popularity.top(config.PREWARM_TOP_N):
+            scraped_at = await scrape_cache.scraped_at(url)
+            if scraped_at is None or now - scraped_at >= config.PREWARM_REFRESH_AFTER_SECONDS:
+                due.append(url)
+        return due
+
+    async def _prewarm(self, url: str) -> None:
+        self.current_url = url
+        scrape = asyncio.create_task(scraper_service.scrape_website_context(url))
+        try:
+            # Back off as soon as a user request is waiting for a browser slot.
+            while not scrape.done():
+                await asyncio.wait({scrape}, timeout=0.5)
+                if not scrape.done() and admission_service.browser_stage.waiting > 0:
+                    scrape.cancel()
+                    self.stats["preempted"] += 1
+                    print(f"Prewarm: user traffic arrived; cancelled prewarm scrape of {url}")
+                    return
+            context = scrape.result()
+            await scrape_cache.put(url, context)
+            self.stats["scraped"] += 1
+            print(f"Prewarm: refreshed scrape cache for {url}")
+        except asyncio.CancelledError:
+            scrape.cancel()
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Prewarm: scrape of {url} failed: {type(e).__name__} - {e}")
+        finally:
+            self.current_url = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.PREWARM_INTERVAL_SECONDS)
+            self.stats["cycles"] += 1
+            for url in await self._due_urls():
+                if not self._idle():
+                    self.stats["skipped_busy"] += 1
+                    break
+                await self._prewarm(url)
+
+    def start(self) -> None:
+        if self._task is None:
+            print(f"Prewarm scheduler started (top {config.PREWARM_TOP_N} references every {config.PREWARM_INTERVAL_SECONDS}s).")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "running": self._task is not None, "current_url": self.current_url}
+
+
+prewarm_scheduler = PrewarmScheduler()
+metrics.register("prewarm", prewarm_scheduler.snapshot)
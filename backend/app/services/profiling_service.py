@@ -0,0 +1,297 @@
+# backend/app/services/profiling_service.py
+"""
+Stdlib-only profiling surface.
+
+- Opt-in request profiling: a request with `X-Profile: 1` or `?profile=1` runs under a
+  sampling profiler; the profile id comes back in the X-Profile-Id response header.
+- Slow-request sampler: a low-rate background sampler keeps a ring buffer of event-loop
+  stacks; requests slower than SLOW_REQUEST_SECONDS get a profile cut from that buffer.
+- Event-loop lag monitor: a watchdog thread notices when the loop stops turning and records
+  the stack that was blocking it and for how long.
+
+Profiles are folded stacks ("frame;frame;frame count" lines, the input format of
+flamegraph.pl and speedscope), kept in a bounded in-memory store served by /profiles.
+All three are off by default; per-request profiling and /profiles are admin-only.
+Since all requests share the event loop thread, a request profile also contains whatever
+other requests ran on the loop at the same time; frames ending in select() are the loop
+waiting on I/O.
+"""
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+
+from fastapi import HTTPException, Request
+
+from app.core import config, metrics
+
+_profiler_thread_ids: set[int] = set()
+
+
+def _folded_stack(frame, limit: int = 64) -> str:
+    parts = []
+    while frame is not None and len(parts) < limit:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class ProfileStore:
+    """Most recent profiles, bounded to `max_profiles`. Written from the loop and the watchdog thread."""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._profiles: OrderedDict[str, dict] = OrderedDict()
+        self.counts = Counter()
+
+    def add(self, kind: str, samples: Counter, interval_ms: float, **details) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        profile = {
+            "id": profile_id,
+            "kind": kind,
+            "created_at": time.time(),
+            "interval_ms": interval_ms,
+            "sample_count": sum(samples.values()),
+            **details,
+            "folded": dict(samples.most_common()),
+        }
+        with self._lock:
+            self._profiles[profile_id] = profile
+            self.counts[kind] += 1
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> dict | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [{k: v for k, v in p.items() if k != "folded"} for p in reversed(profiles)]
+
+
+def folded_text(profile: dict) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in profile["folded"].items())
+
+
+class SamplingProfiler:
+    """Samples every thread's stack (except the profiler's own threads) until stopped."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        _profiler_thread_ids.add(threading.get_ident())
+        try:
+            while not self._stop.wait(self.interval_seconds):
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id in _profiler_thread_ids:
+                        continue
+                    self.samples[f"{names.get(thread_id, thread_id)};{_folded_stack(frame)}"] += 1
+        finally:
+            _profiler_thread_ids.discard(threading.get_ident())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+class RingSampler:
+    """Continuously samples one thread (the event loop) into a time-bounded ring buffer."""
+
+    def __init__(self, thread_id: int, interval_seconds: float, buffer_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self._buffer: deque[tuple[float, str]] = deque(maxlen=max(1, int(buffer_seconds / interval_seconds)))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+
+    def _run(self):
+        _profiler_thread_ids.add(threading.get_ident())
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._buffer.append((time.monotonic(), _folded_stack(frame)))
+
+    def samples_between(self, start: float, end: float) -> Counter:
+        return Counter(stack for at, stack in list(self._buffer) if start <= at <= end)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class LoopLagMonitor:
+    """
+    The loop reschedules a heartbeat every check interval; a watchdog thread that sees no
+    heartbeat for longer than the threshold samples the loop thread until it resumes, then
+    logs the blocking stack and stores it as a "loop_lag" profile.
+    """
+
+    def __init__(self, loop, threshold_seconds: float, check_interval_seconds: float):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident() # Created from the loop's thread
+        self.threshold_seconds = threshold_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.last_beat = time.monotonic()
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self.recent_stalls: deque[dict] = deque(maxlen=20)
+        self._handle = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loop-lag-monitor", daemon=True)
+
+    def _beat(self):
+        self.last_beat = time.monotonic()
+        self._handle = self.loop.call_later(self.check_interval_seconds, self._beat)
+
+    def _run(self):
+        _profiler_thread_ids.add(threading.get_ident())
+        stall_samples: Counter | None = None
+        stall_due_at = 0.0
+        while not self._stop.wait(self.check_interval_seconds):
+            last_beat = self.last_beat
+            if time.monotonic() - last_beat - self.check_interval_seconds > self.threshold_seconds:
+                if stall_samples is None:
+                    stall_samples, stall_due_at = Counter(), last_beat + self.check_interval_seconds
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    stall_samples[_folded_stack(frame)] += 1
+            elif stall_samples is not None:
+                # The heartbeat has run again; the loop was blocked from when it was due until then.
+                self._record_stall(stall_samples, (last_beat - stall_due_at) * 1000)
+                stall_samples = None
+
+    def _record_stall(self, samples: Counter, blocked_ms: float):
+        blocked_ms = round(blocked_ms, 1)
+        self.stalls += 1
+        self.max_lag_ms = max(self.max_lag_ms, blocked_ms)
+        top_stack = samples.most_common(1)[0][0] if samples else "<unknown>"
+        profile_id = profile_store.add("loop_lag", samples, self.check_interval_seconds * 1000, duration_ms=blocked_ms)
+        self.recent_stalls.append({"at": time.time(), "blocked_ms": blocked_ms, "profile_id": profile_id,
+                                   "frame": top_stack.rsplit(";", 1)[-1]})
+        print(f"Event loop blocked for ~{blocked_ms}ms (profile {profile_id}). Blocking stack:\n  "
+              + "\n  ".join(top_stack.split(";")[-12:]))
+
+    def start(self):
+        self.loop.call_soon_threadsafe(self._beat)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+
+profile_store = ProfileStore(config.PROFILE_STORE_MAX_PROFILES)
+_monitors: dict[str, RingSampler | LoopLagMonitor] = {}
+
+
+def start_background_monitors() -> None:
+    """Starts the slow-request sampler and loop lag monitor; call from the event loop's thread."""
+    loop = asyncio.get_running_loop()
+    if config.SLOW_REQUEST_SAMPLER_ENABLED and "slow_requests" not in _monitors:
+        _monitors["slow_requests"] = RingSampler(threading.get_ident(), config.SLOW_REQUEST_SAMPLE_INTERVAL_MS / 1000,
+                                                 config.SLOW_REQUEST_RING_BUFFER_SECONDS)
+        _monitors["slow_requests"].start()
+    if config.LOOP_LAG_MONITOR_ENABLED and "loop_lag" not in _monitors:
+        _monitors["loop_lag"] = LoopLagMonitor(loop, config.LOOP_LAG_THRESHOLD_MS / 1000, config.LOOP_LAG_CHECK_INTERVAL_MS / 1000)
+        _monitors["loop_lag"].start()
+
+
+def stop_background_monitors() -> None:
+    for monitor in _monitors.values():
+        monitor.stop()
+    _monitors.clear()
+
+
+def is_admin(request) -> bool:
+    """Whether the request carries the PROFILING_ADMIN_TOKEN (never, if none is configured)."""
+    token = config.PROFILING_ADMIN_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), token.encode())
+
+
+async def require_admin(request: Request) -> None:
+    """FastAPI dependency guarding /profiles."""
+    if not config.PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token header is required.")
+
+
+def _profile_requested(request) -> bool:
+    return config.PROFILING_ENABLED and (
+        request.headers.get("x-profile", "").lower() in ("1", "true")
+        or request.query_params.get("profile") == "1"
+    ) and is_admin(request)
+
+
+def request_profiling_enabled() -> bool:
+    """Whether profile_request has anything to do: per-request profiling or the slow-request sampler."""
+    return config.PROFILING_ENABLED or config.SLOW_REQUEST_SAMPLER_ENABLED
+
+
+async def profile_request(request, call_next):
+    """
+    HTTP middleware body. Profiles the request when asked to, or cuts a profile from the
+    slow-request sampler's buffer when it took longer than SLOW_REQUEST_SECONDS. For streaming
+    responses only the time until the response starts is covered.
+    """
+    profiler = None
+    if _profile_requested(request):
+        profiler = SamplingProfiler(config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        profiler.start()
+    started = time.monotonic()
+    try:
+        response = await call_next(request)
+    finally:
+        samples = profiler.stop() if profiler else None
+    elapsed = time.monotonic() - started
+    details = {"method": request.method, "path": request.url.path, "duration_ms": round(elapsed * 1000, 1),
+               "status_code": response.status_code}
+
+    if profiler:
+        profile_id = profile_store.add("requested", samples, config.PROFILE_SAMPLE_INTERVAL_MS, **details)
+        response.headers["X-Profile-Id"] = profile_id
+    elif elapsed >= config.SLOW_REQUEST_SECONDS and "slow_requests" in _monitors:
+        sampler = _monitors["slow_requests"]
+        profile_id = profile_store.add("slow", sampler.samples_between(started, started + elapsed),
+                                       config.SLOW_REQUEST_SAMPLE_INTERVAL_MS, **details)
+        response.headers["X-Profile-Id"] = profile_id
+        print(f"Slow request {request.method} {request.url.path} took {elapsed:.1f}s; stored profile {profile_id}")
+    return response
+
+
+def _snapshot() -> dict:
+    lag = _monitors.get("loop_lag")
+    return {
+        "profiles_stored": len(profile_store.list()),
+        "profiles_created": dict(profile_store.counts),
+        "slow_request_sampler": "slow_requests" in _monitors,
+        "loop_lag": None if lag is None else {
+            "stalls": lag.stalls,
+            "max_blocked_ms": lag.max_lag_ms,
+            "recent": list(lag.recent_stalls)[-5:],
+        },
+    }
+
+
+metrics.register("profiling", _snapshot)
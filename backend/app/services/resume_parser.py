@@ -0,0 +1,352 @@
+# backend/app/services/resume_parser.py
+"""
+Deterministic, local resume parsing: the fast path in front of the LLM parser.
+
+Handles pasted JSON, Markdown and plain-text resumes that use recognizable section headers
+("Experience", "Education", "Skills", ...). Produces the same schema as
+llm_service.parse_resume_to_json plus a confidence score in [0, 1] so the caller can decide
+whether the LLM is needed at all.
+"""
+import json
+import re
+from typing import Collection
+
+SCHEMA_LIST_FIELDS = ("skills", "experience", "projects", "education")
+CONTACT_FIELDS = ("email", "phone", "linkedin", "github", "portfolio")
+
+# Canonical section -> header aliases (compared lower-case, without punctuation).
+SECTION_ALIASES = {
+    "summary": ("summary", "professional summary", "profile", "about", "about me", "objective", "career objective", "overview"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "career history", "relevant experience"),
+    "education": ("education", "academic background", "education and training", "academics", "qualifications"),
+    "skills": ("skills", "technical skills", "core skills", "core competencies", "technologies", "tech stack",
+               "tools and technologies", "key skills"),
+    "projects": ("projects", "personal projects", "selected projects", "side projects", "key projects", "open source"),
+}
+_ALIAS_TO_SECTION = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"(?<!\w)(?:\+?\d{1,3}[\s.-]?)?(?:\(\d{2,4}\)[\s.-]?)?\d{3,4}[\s.-]?\d{3,4}(?:[\s.-]?\d{2,4})?(?!\w)")
+_URL_RE = re.compile(r"(?:https?://|www\.)[^\s<>()\"',;|]+|(?:linkedin\.com|github\.com)/[^\s<>()\"',;|]+", re.IGNORECASE)
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s+\d{{4}}|\d{{1,2}}/\d{{4}}|\d{{4}})"
+_DATE_RANGE_RE = re.compile(rf"({_DATE})\s*(?:-|–|—|to|until)\s*({_DATE}|present|current|now|today)", re.IGNORECASE)
+_SINGLE_DATE_RE = re.compile(rf"\b{_DATE}\b", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪‣◦●]|\d{1,2}[.)])\s+")
+_MARKDOWN_HEADER_RE = re.compile(r"^\s*#{1,6}\s*")
+_DEGREE_RE = re.compile(r"\b(?:bachelor|master|b\.?\s?s\.?c?|m\.?\s?s\.?c?|b\.?\s?a\.?|m\.?\s?a\.?|b\.?\s?tech|m\.?\s?tech|b\.?\s?e\.?|m\.?\s?e\.?|ph\.?\s?d|mba|associate|diploma|degree|certificate)\b", re.IGNORECASE)
+_INSTITUTION_RE = re.compile(r"\b(?:university|college|institute|school|academy|polytechnic|iit|mit)\b", re.IGNORECASE)
+_ROLE_SEPARATORS_RE = re.compile(r"\s+(?:at|@)\s+|\s*[|•·]\s*|\s+[-–—]\s+|,\s+")
+_TECH_RE = re.compile(r"^(?:tech(?:nologies|nology| stack)?|stack|built with|tools)\s*:\s*", re.IGNORECASE)
+# Hints for telling "Role | Company" from "Company | Role" in experience headers. Words that also
+# appear in job titles ("Software Engineer", "Systems Analyst") are left out of the company hints.
+_COMPANY_HINT_RE = re.compile(r"\b(?:inc|corp|corporation|llc|ltd|limited|gmbh|plc|pvt|co|company|studios|partners|ventures|"
+                              r"agency|university)\b", re.IGNORECASE)
+_ROLE_HINT_RE = re.compile(r"\b(?:engineer|developer|programmer|manager|designer|intern|analyst|lead|director|consultant|scientist|"
+                           r"architect|officer|head|specialist|administrator|researcher|founder|co-founder|cto|ceo|vp|president|"
+                           r"associate|assistant|coordinator|technician|teacher|instructor|writer|editor|sde|swe)\b", re.IGNORECASE)
+
+
+def _clean_line(line: str) -> str:
+    line = _MARKDOWN_HEADER_RE.sub("", line)
+    return line.replace("**", "").replace("__", "").strip()
+
+
+def _header_section(line: str) -> tuple[str | None, str]:
+    """If `line` is a section header, returns (section, inline content after a colon)."""
+    text = _clean_line(line)
+    head, sep, rest = text.partition(":")
+    key = re.sub(r"[^a-z& ]", "", head.lower()).replace("&", "and").strip()
+    key = re.sub(r"\s+", " ", key)
+    if key in _ALIAS_TO_SECTION and (sep or len(text) <= 40):
+        return _ALIAS_TO_SECTION[key], rest.strip()
+    return None, ""
+
+
+def _is_contact_line(line: str) -> bool:
+    stripped = _EMAIL_RE.sub("", _URL_RE.sub("", _PHONE_RE.sub("", line)))
+    return len(re.sub(r"[\s|,•·/:-]", "", stripped)) < 3
+
+
+def _extract_contact_info(text: str) -> dict:
+    contact = {}
+    email = _EMAIL_RE.search(text)
+    if email:
+        contact["email"] = email.group(0)
+    for match in _PHONE_RE.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        # Skip year ranges ("2019 2021") and other short numbers.
+        if 9 <= len(digits) <= 15 and not _DATE_RANGE_RE.search(match.group(0)):
+            contact["phone"] = match.group(0).strip()
+            break
+    for match in _URL_RE.finditer(text):
+        url = match.group(0).rstrip(".")
+        full = url if url.lower().startswith("http") else f"https://{url}"
+        if "linkedin.com" in url.lower():
+            contact.setdefault("linkedin", full)
+        elif "github.com" in url.lower():
+            contact.setdefault("github", full)
+        else:
+            contact.setdefault("portfolio", full)
+    return contact
+
+
+def _strip_urls(text: str) -> str:
+    """Removes URLs, and the brackets they leave empty ("Demo (https://...)" -> "Demo")."""
+    text = re.sub(r"\(\s*\)|\[\s*\]", "", _URL_RE.sub("", text))
+    return re.sub(r"\s{2,}", " ", text).strip()
+
+
+def _pop_dates(text: str) -> tuple[str, str | None]:
+    """Removes a date range (or a single date) from `text`; returns (remaining text, dates)."""
+    match = _DATE_RANGE_RE.search(text) or _SINGLE_DATE_RE.search(text)
+    if not match:
+        return text, None
+    dates = match.group(0).strip()
+    remaining = (text[:match.start()] + text[match.end():]).strip(" \t|,-–—()")
+    if match.re is _DATE_RANGE_RE:
+        dates = f"{match.group(1)} - {match.group(2)}"
+    return re.sub(r"\s{2,}", " ", remaining), dates
+
+
+def _split_entries(lines: list[str]) -> list[tuple[list[str], list[str]]]:
+    """
+    Groups a section's lines into entries of (header lines, bullet points). A non-bullet line
+    after bullets starts a new entry; consecutive non-bullet lines share one entry header.
+    """
+    entries: list[tuple[list[str], list[str]]] = []
+    for line in lines:
+        if _BULLET_RE.match(line):
+            if not entries:
+                entries.append(([], []))
+            entries[-1][1].append(_BULLET_RE.sub("", line).strip())
+        elif not entries or entries[-1][1]:
+            entries.append(([line], []))
+        else:
+            entries[-1][0].append(line)
+    return entries
+
+
+def _role_company_order(first: str, second: str) -> bool | None:
+    """
+    True if `first` is the role, False if it is the company, None when the hints don't tell.
+    Role hints are checked first; company hints only break ties.
+    """
+    for hint_re in (_ROLE_HINT_RE, _COMPANY_HINT_RE):
+        in_first, in_second = bool(hint_re.search(first)), bool(hint_re.search(second))
+        if in_first != in_second:
+            return in_first if hint_re is _ROLE_HINT_RE else in_second
+    return None
+
+
+def _parse_experience(lines: list[str]) -> tuple[list[dict], int]:
+    """Returns (entries, number of entries whose role/company order could not be determined)."""
+    experience = []
+    ambiguous = 0
+    for header, bullets in _split_entries(lines):
+        dates = None
+        parts: list[str] = []
+        for line in header:
+            line, found = _pop_dates(line)
+            dates = dates or found
+            parts.extend(p.strip() for p in _ROLE_SEPARATORS_RE.split(line) if p and p.strip())
+        if not parts and not bullets:
+            continue
+        if len(parts) > 1:
+            role_first = _role_company_order(parts[0], parts[1])
+            if role_first is False:
+                parts[0], parts[1] = parts[1], parts[0]
+            elif role_first is None:
+                ambiguous += 1
+        entry = {"role": parts[0] if parts else None, "company": parts[1] if len(parts) > 1 else None,
+                 "location": parts[2] if len(parts) > 2 else None, "dates": dates, "description_points": bullets}
+        experience.append(entry)
+    return experience, ambiguous
+
+
+def _parse_education(lines: list[str]) -> list[dict]:
+    education = []
+    for header, bullets in _split_entries(lines):
+        dates = None
+        institution = degree = None
+        leftovers = []
+        for line in header + bullets:
+            line, found = _pop_dates(line)
+            dates = dates or found
+            for part in (p.strip() for p in _ROLE_SEPARATORS_RE.split(line) if p and p.strip()):
+                if institution is None and _INSTITUTION_RE.search(part):
+                    institution = part
+                elif degree is None and _DEGREE_RE.search(part):
+                    degree = part
+                else:
+                    leftovers.append(part)
+        institution = institution or (leftovers.pop(0) if leftovers else None)
+        if institution or degree:
+            education.append({"institution": institution, "degree": degree, "dates": dates})
+    return education
+
+
+def _parse_skills(lines: list[str]) -> list[str]:
+    skills = []
+    for line in lines:
+        line = _BULLET_RE.sub("", line)
+        # "Languages: Python, Go" -> keep only the list part.
+        if ":" in line and len(line.split(":", 1)[0]) <= 30:
+            line = line.split(":", 1)[1]
+        for skill in re.split(r"\s*[,|•·;/]\s*|\s{2,}", line):
+            skill = skill.strip(" .")
+            if skill and len(skill) <= 50 and skill.lower() not in (s.lower() for s in skills):
+                skills.append(skill)
+    return skills
+
+
+def _parse_projects(lines: list[str]) -> list[dict]:
+    projects = []
+    for header, bullets in _split_entries(lines):
+        if not header and not bullets:
+            continue
+        # Before the title is taken out of the bullets: the link may be the only thing in it.
+        link = _URL_RE.search(" ".join(header + bullets))
+        title = header[0] if header else bullets.pop(0)
+        title = _strip_urls(title).strip(" |-–—:")
+        name, inline_description = (re.split(r"\s+[-–—:|]\s+|:\s+", title, maxsplit=1) + [""])[:2]
+        technologies = []
+        description_parts = [inline_description] if inline_description else []
+        for line in header[1:] + bullets:
+            if _TECH_RE.match(line):
+                technologies.extend(_parse_skills([_TECH_RE.sub("", line)]))
+            else:
+                description_parts.append(_strip_urls(line))
+        paren_tech = re.search(r"\(([^)]+)\)\s*$", name)
+        if paren_tech and not technologies:
+            technologies = _parse_skills([paren_tech.group(1)])
+            name = name[:paren_tech.start()].strip()
+        projects.append({
+            "name": name.strip() or None,
+            "description": " ".join(p for p in description_parts if p) or None,
+            "technologies": technologies,
+            "link": (link.group(0) if link.group(0).lower().startswith("http") else f"https://{link.group(0)}") if link else None,
+        })
+    return projects
+
+
+def _from_pasted_json(text: str) -> dict | None:
+    stripped = text.strip()
+    if stripped.startswith("```"):
+        stripped = stripped.strip("`").removeprefix("json").strip()
+    if not stripped.startswith("{"):
+        return None
+    try:
+        data = json.loads(stripped)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not ({"name", "experience", "education", "skills"} & data.keys()):
+        return None
+    resume = {key: data.get(key) for key in ("name", "headline", "summary")}
+    resume["contact_info"] = data.get("contact_info") if isinstance(data.get("contact_info"), dict) else {
+        key: data[key] for key in CONTACT_FIELDS if key in data}
+    for key in SCHEMA_LIST_FIELDS:
+        value = data.get(key)
+        if key == "skills" and isinstance(value, str):
+            value = _parse_skills([value])
+        resume[key] = value if isinstance(value, list) else []
+    return resume
+
+
+def incomplete_fields(resume: dict, sections: Collection[str] = ()) -> list[str]:
+    """
+    Schema fields the parse left empty, plus 'experience' when entries lack a role or company/dates.
+    Fields that come from a section (summary, experience, ...) only count when the resume has a
+    heading for that section: a resume without a Projects section isn't missing its projects.
+    """
+    fields = [key for key in ("name", "headline", "summary", *SCHEMA_LIST_FIELDS)
+              if not resume.get(key) and (key not in SECTION_ALIASES or key in sections)]
+    if any(not e.get("role") or not (e.get("company") or e.get("dates")) for e in resume.get("experience") or []):
+        fields.append("experience")
+    return fields
+
+
+def _score(resume: dict, sections_found: int, unassigned_lines: int, total_lines: int, ambiguous_experience: int = 0) -> float:
+    score = 0.0
+    if resume.get("name"):
+        score += 0.25
+    if resume.get("contact_info", {}).get("email"):
+        score += 0.1
+    score += min(sections_found, 3) * 0.05
+    experience = resume.get("experience") or []
+    if experience:
+        complete = sum(1 for e in experience if e.get("role") and (e.get("company") or e.get("dates")))
+        # Entries whose role and company may be swapped count as incomplete, and cost extra.
+        score += 0.25 * max(complete - ambiguous_experience, 0) / len(experience)
+        score -= 0.15 * ambiguous_experience / len(experience)
+    if resume.get("skills"):
+        score += 0.1
+    if resume.get("education"):
+        score += 0.1
+    if total_lines:
+        score += 0.05 * (1 - unassigned_lines / total_lines)
+    return round(min(score, 1.0), 3)
+
+
+def parse_resume_locally(resume_text: str) -> tuple[dict, float, list[str]]:
+    """
+    Parses resume text without any network call.
+
+    Returns:
+        (resume_json, confidence, fields) where resume_json follows the LLM parser's schema,
+        confidence in [0, 1] estimates how completely the text was understood, and fields are
+        the ones the LLM should fill in: incomplete_fields(), plus 'experience' when the
+        role/company order of an entry is ambiguous.
+    """
+    pasted = _from_pasted_json(resume_text)
+    if pasted is not None:
+        confidence = 1.0 if pasted.get("name") and (pasted["experience"] or pasted["education"] or pasted["skills"]) else 0.5
+        # Pasted JSON has nothing more to offer for keys it left out or empty.
+        return pasted, confidence, incomplete_fields(pasted)
+
+    lines = [line.rstrip() for line in resume_text.replace("\r\n", "\n").split("\n")]
+    lines = [line for line in lines if line.strip() and not re.fullmatch(r"\s*[-=_*]{3,}\s*", line)]
+
+    sections: dict[str, list[str]] = {}
+    preamble: list[str] = []
+    current = None
+    for line in lines:
+        section, inline = _header_section(line)
+        if section:
+            current = section
+            sections.setdefault(section, [])
+            if inline:
+                sections[section].append(inline)
+            continue
+        (sections[current] if current else preamble).append(_clean_line(line) if not _BULLET_RE.match(line) else line.strip())
+
+    # Project and employer URLs are not the candidate's own links.
+    contact_lines = preamble + [line for section, section_lines in sections.items()
+                                if section not in ("projects", "experience") for line in section_lines]
+    resume = {"name": None, "headline": None, "contact_info": _extract_contact_info("\n".join(contact_lines)), "summary": None}
+    unassigned = 0
+    for line in preamble:
+        if _is_contact_line(line):
+            continue
+        if resume["name"] is None and len(line.split()) <= 5 and not re.search(r"\d", line):
+            resume["name"] = line.strip(" |")
+        elif resume["headline"] is None and len(line) <= 100:
+            headline = _PHONE_RE.sub("", _EMAIL_RE.sub("", _URL_RE.sub("", line)))
+            resume["headline"] = re.sub(r"(?:\s*[|,•·]\s*)+$", "", headline).strip(" |,•·")
+        elif "summary" not in sections:
+            resume["summary"] = f"{resume['summary']} {line}".strip() if resume["summary"] else line
+        else:
+            unassigned += 1
+
+    if sections.get("summary"):
+        resume["summary"] = " ".join(_BULLET_RE.sub("", line) for line in sections["summary"])
+    resume["skills"] = _parse_skills(sections.get("skills", []))
+    resume["experience"], ambiguous_experience = _parse_experience(sections.get("experience", []))
+    resume["projects"] = _parse_projects(sections.get("projects", []))
+    resume["education"] = _parse_education(sections.get("education", []))
+
+    fields = incomplete_fields(resume, sections.keys())
+    if ambiguous_experience and "experience" not in fields:
+        fields.append("experience")
+    return resume, _score(resume, len(sections), unassigned, len(lines), ambiguous_experience), fields
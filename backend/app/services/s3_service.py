@@ -1,5 +1,4 @@
-import boto3
-from botocore.exceptions import NoCredentialsError
+import threading
 from fastapi import HTTPException
 import traceback
 
@@ -20,6 +19,9 @@ def upload_html_to_s3(html_content: str, filename: str) -> str:
         HTTPException: If the upload fails due to credentials or other AWS errors.
     """
     print(f"Uploading {filename} to S3 bucket: {config.S3_BUCKET_NAME}")
+    # boto3 is imported lazily; it adds noticeably to API cold start.
+    import boto3
+    from botocore.exceptions import NoCredentialsError
     
     try:
         s3_client = boto3.client('s3')
@@ -48,4 +50,76 @@ def upload_html_to_s3(html_content: str, filename: str) -> str:
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to upload generated file to cloud storage. Error: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+# Content-addressed asset keys known to exist in the bucket (uploaded or seen by this process), least
+# recently used first. Uploads run in worker threads, so access goes through _known_asset_keys_lock.
+_known_asset_keys: dict[str, None] = {}
+_known_asset_keys_lock = threading.Lock()
+
+def _asset_known(key: str) -> bool:
+    with _known_asset_keys_lock:
+        if key not in _known_asset_keys:
+            return False
+        _known_asset_keys[key] = _known_asset_keys.pop(key)
+        return True
+
+def _remember_asset(key: str) -> None:
+    with _known_asset_keys_lock:
+        _known_asset_keys.pop(key, None)
+        _known_asset_keys[key] = None
+        if len(_known_asset_keys) > config.SHARED_ASSET_MAX_KNOWN_KEYS:
+            # Prune to 80% of the cap, so a full map isn't trimmed on every upload.
+            for stale in list(_known_asset_keys)[:len(_known_asset_keys) - int(config.SHARED_ASSET_MAX_KNOWN_KEYS * 0.8)]:
+                del _known_asset_keys[stale]
+
+def upload_asset_if_missing(key: str, body: bytes, content_type: str) -> bool:
+    """
+    Uploads a content-addressed asset (its key is a hash of `body`) unless the bucket already
+    has it. Assets never change under their key, so they are served with immutable caching.
+
+    Returns:
+        True if the asset was uploaded, False if it already existed.
+
+    Raises:
+        HTTPException: If the upload fails due to credentials or other AWS errors.
+    """
+    if _asset_known(key):
+        return False
+    import boto3
+    from botocore.exceptions import ClientError, NoCredentialsError
+
+    try:
+        s3_client = boto3.client('s3')
+        try:
+            s3_client.head_object(Bucket=config.S3_BUCKET_NAME, Key=key)
+            exists = True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                raise
+            exists = False
+
+        if not exists:
+            s3_client.put_object(
+                Bucket=config.S3_BUCKET_NAME,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                CacheControl=config.SHARED_ASSET_CACHE_CONTROL
+            )
+            print(f"Uploaded shared asset {key} ({len(body)} bytes).")
+        _remember_asset(key)
+        return not exists
+
+    except NoCredentialsError:
+        print("ERROR: AWS credentials not found. Configure AWS CLI (`aws configure`) or environment variables.")
+        raise HTTPException(
+            status_code=500,
+            detail="Server is not configured for AWS uploads. Credentials missing."
+        )
+    except Exception as e:
+        print(f"ERROR uploading asset {key} to S3: {e}\n{traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload shared asset to cloud storage. Error: {str(e)}"
+        )
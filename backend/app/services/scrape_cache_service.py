@@ -0,0 +1,220 @@
+# backend/app/services/scrape_cache_service.py
+"""
+Cache of scraped reference sites, keyed by normalized URL.
+
+Recent entries are kept in memory; every entry is also written to disk so worker processes
+and restarts share it. A disk entry's mtime is when it was scraped and its atime when it was
+last used. Expired disk entries are deleted when read, and the directory is kept under
+SCRAPE_CACHE_MAX_DISK_ENTRIES / SCRAPE_CACHE_MAX_DISK_MB by evicting the least recently used
+entries. Concurrent misses for one URL share a single scrape. Portfolio builds (single and batch) read through the cache, while
+clones always scrape fresh. Lookups feed a popularity tracker that prewarm_service uses to
+keep the most requested references warm.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from app.core import config, metrics
+from app.core.url_utils import normalize_url
+from app.models.pydantic_models import ScrapedContext
+from app.services import scraper_service, coalescing_service
+
+
+class ScrapeCache:
+    def __init__(self, directory: str, ttl_seconds: float, max_memory_entries: int, max_disk_entries: int, max_disk_bytes: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, tuple[float, ScrapedContext]] = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "disk_evictions": 0, "disk_expired": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _remember(self, key: str, scraped_at: float, context: ScrapedContext) -> None:
+        self._memory[key] = (scraped_at, context)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _remove(self, path: str, reason: str) -> None:
+        try:
+            os.remove(path)
+            self.stats[reason] += 1
+        except OSError:
+            pass # Already removed by another process
+
+    def _read_disk(self, key: str) -> tuple[float, ScrapedContext] | None:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            scraped_at = entry["scraped_at"]
+            if time.time() - scraped_at >= self.ttl_seconds:
+                self._remove(path, "disk_expired")
+                return None
+            os.utime(path, (time.time(), scraped_at)) # Marks the entry as used for LRU eviction
+            return scraped_at, ScrapedContext(**entry["context"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _enforce_disk_limits(self) -> None:
+        """Deletes expired entries, then the least recently used ones while over the count/size caps."""
+        now = time.time()
+        entries = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not item.name.endswith(".json"):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                if now - stat.st_mtime >= self.ttl_seconds:
+                    self._remove(item.path, "disk_expired")
+                else:
+                    entries.append((stat.st_atime, stat.st_size, item.path))
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_disk_entries or total_bytes > self.max_disk_bytes):
+            _, size, path = entries.pop(0)
+            total_bytes -= size
+            self._remove(path, "disk_evictions")
+
+    def _write_disk(self, key: str, url: str, scraped_at: float, context: ScrapedContext) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "scraped_at": scraped_at, "context": context.model_dump()}, f)
+        os.replace(tmp_path, path) # Atomic, so concurrent readers never see a partial file
+        os.utime(path, (scraped_at, scraped_at))
+        self._enforce_disk_limits()
+
+    def _disk_scraped_at(self, key: str) -> float | None:
+        try:
+            return os.stat(self._path(key)).st_mtime
+        except OSError:
+            return None
+
+    async def scraped_at(self, url: str) -> float | None:
+        """
+        When the cached entry for `url` was scraped (None if absent). Doesn't count as a lookup:
+        the entry isn't read or marked as used, so polling it doesn't keep it from being evicted.
+        """
+        key = normalize_url(url)
+        if key in self._memory:
+            return self._memory[key][0]
+        return await asyncio.to_thread(self._disk_scraped_at, key)
+
+    async def get(self, url: str) -> ScrapedContext | None:
+        key = normalize_url(url)
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry and now - entry[0] < self.ttl_seconds:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return entry[1]
+        entry = await asyncio.to_thread(self._read_disk, key)
+        if entry and now - entry[0] < self.ttl_seconds:
+            self._remember(key, *entry)
+            self.stats["disk_hits"] += 1
+            return entry[1]
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, url: str, context: ScrapedContext) -> None:
+        if context.degraded:
+            return # Don't pin a partial scrape for the whole TTL.
+        key = normalize_url(url)
+        scraped_at = time.time()
+        self._remember(key, scraped_at, context)
+        self.stats["stores"] += 1
+        try:
+            await asyncio.to_thread(self._write_disk, key, url, scraped_at, context)
+        except OSError as e:
+            print(f"Scrape cache: could not write entry for {url}: {e}")
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class PopularityTracker:
+    """
+    Request counts per normalized URL with exponential decay, so popularity follows recent demand.
+    At most `max_urls` are tracked; beyond that the lowest-scoring URLs are dropped.
+    """
+
+    def __init__(self, half_life_seconds: float, max_urls: int):
+        self.half_life_seconds = half_life_seconds
+        self.max_urls = max_urls
+        self._scores: dict[str, tuple[float, float]] = {} # key -> (score, updated_at)
+        self.last_user_request_at = 0.0
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * math.pow(0.5, (now - updated_at) / self.half_life_seconds)
+
+    def record(self, url: str, weight: float = 1.0, user_request: bool = True) -> None:
+        now = time.time()
+        key = normalize_url(url)
+        score, updated_at = self._scores.get(key, (0.0, now))
+        self._scores[key] = (self._decayed(score, updated_at, now) + weight, now)
+        if len(self._scores) > self.max_urls:
+            # Prune to 80% of the cap, so a full map isn't re-sorted on every request.
+            keep = {key for key, _ in self.top(int(self.max_urls * 0.8))}
+            self._scores = {key: value for key, value in self._scores.items() if key in keep}
+        if user_request:
+            self.last_user_request_at = time.monotonic()
+
+    def top(self, n: int) -> list[tuple[str, float]]:
+        now = time.time()
+        scored = [(key, self._decayed(score, updated_at, now)) for key, (score, updated_at) in self._scores.items()]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:n]
+
+
+scrape_cache = ScrapeCache(config.SCRAPE_CACHE_DIR, config.SCRAPE_CACHE_TTL_SECONDS, config.SCRAPE_CACHE_MAX_MEMORY_ENTRIES,
+                           config.SCRAPE_CACHE_MAX_DISK_ENTRIES, config.SCRAPE_CACHE_MAX_DISK_MB * 1024 * 1024)
+popularity = PopularityTracker(config.POPULARITY_HALF_LIFE_SECONDS, config.POPULARITY_MAX_URLS)
+for _seed_url in config.PREWARM_SEED_URLS:
+    popularity.record(_seed_url, weight=config.PREWARM_SEED_WEIGHT, user_request=False)
+
+
+async def get_or_scrape(url: str, scrape: Callable[[str], Awaitable[ScrapedContext]] | None = None) -> ScrapedContext:
+    """
+    Returns the cached scrape of `url`, scraping (and caching) it on a miss. Concurrent misses
+    for the same URL wait on one scrape. `scrape` overrides how a miss is scraped (the worker
+    tier runs it in its browser process pool).
+    """
+    popularity.record(url)
+    cached = await scrape_cache.get(url)
+    if cached is not None:
+        print(f"Scrape cache hit for {url}")
+        return cached
+
+    async def scrape_and_store() -> ScrapedContext:
+        context = await (scrape or scraper_service.scrape_website_context)(url)
+        await scrape_cache.put(url, context)
+        return context
+
+    return await coalescing_service.reference_scrape_coalescer.run(normalize_url(url), scrape_and_store)
+
+
+metrics.register("scrape_cache", lambda: {
+    **scrape_cache.snapshot(),
+    "popular": [{"url": key, "score": round(score, 2)} for key, score in popularity.top(config.PREWARM_TOP_N)],
+})
@@ -1,21 +1,23 @@
 # backend/app/services/scraper_service.py
 import base64
 import asyncio
+import time
 import traceback
-from bs4 import BeautifulSoup, Comment
-from playwright.async_api import async_playwright, Route
-from playwright_stealth import stealth_async
 from fastapi import HTTPException
 
 import os
-from app.models.pydantic_models import ScrapedContext
-from app.core import config # Import config to get BASE_DIR
+from app.core import config, metrics # Import config to get BASE_DIR
+from app.services import admission_service, static_probe_service, layout_extractor
 # Import the internal Pydantic model
 from app.models.pydantic_models import ScrapedContext
+
+# NOTE: playwright and bs4 are imported where they are used so that importing this
+# module (and therefore starting the API) does not pay for them.
     
 def clean_html_for_llm(html_content: str) -> str:
     if not html_content: return "<!-- HTML content was empty -->"
     try:
+        from bs4 import BeautifulSoup, Comment
         soup = BeautifulSoup(html_content, "html.parser")
         
         # 1. Remove ONLY non-visual/behavioral tags. 
@@ -79,109 +81,322 @@ def clean_html_for_llm(html_content: str) -> str:
         return f"<!-- HTML cleaning failed: {str(e)} -->"
 
 
-async def scrape_website_context(url: str, retries: int = 1) -> ScrapedContext:
-    last_exception = None
-    browser = None
+async def _extract_layout_html(page) -> str:
+    """Single in-page pass returning visible elements with computed styles, rendered as simplified HTML."""
+    print("Extracting rendered layout and computed styles in-page...")
+    layout = await page.evaluate(layout_extractor.LAYOUT_EXTRACTION_JS, {
+        "maxNodes": config.LAYOUT_MAX_NODES,
+        "maxTextChars": config.LAYOUT_MAX_TEXT_CHARS,
+        "maxSvgChars": config.LAYOUT_MAX_SVG_CHARS,
+    })
+    if not layout or not layout.get("node_count"):
+        raise ValueError("Layout extraction found no visible content.")
+    simplified_html = layout_extractor.render_layout_tree(layout)
+    if "Application error" in simplified_html:
+        raise ValueError("Scraped content was a known error page.")
+    print(f"Layout extraction: {layout['node_count']} visible elements -> {len(simplified_html)} chars of HTML.")
+    return simplified_html
+
+
+# Page steps bring the page to a capturable state; artifact steps each produce one artifact and
+# depend only on the page steps, so a failed capture never throws away the other artifacts.
+SCRAPE_STEPS = ("navigate", "settle", "desktop_capture", "html_extract", "mobile_capture")
+ARTIFACT_STEPS = {"desktop_capture": "desktop_screenshot", "html_extract": "simplified_html", "mobile_capture": "mobile_screenshot"}
+
+
+class ScrapeStats:
+    """Step failures, degraded results and browser time lost to failed or repeated steps."""
+
+    def __init__(self):
+        self.scrapes = 0
+        self.degraded = 0
+        self.failed = 0
+        self.relaunches = 0
+        self.step_failures = {step: 0 for step in SCRAPE_STEPS}
+        self.artifacts_kept_on_retry = 0
+        self.wasted_browser_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "scrapes": self.scrapes,
+            "degraded": self.degraded,
+            "failed": self.failed,
+            "relaunches": self.relaunches,
+            "step_failures": dict(self.step_failures),
+            "artifacts_kept_on_retry": self.artifacts_kept_on_retry,
+            "wasted_browser_seconds": round(self.wasted_browser_seconds, 1),
+        }
+
+
+scrape_stats = ScrapeStats()
+metrics.register("scraping", scrape_stats.snapshot)
+
+
+async def scrape_website_context(url: str, retries: int | None = None) -> ScrapedContext:
+    """
+    Scrapes `url` into screenshots and simplified HTML (see _scrape_website_context).
+
+    Args:
+        retries: Extra attempts for each scrape step. Before scrapes were split into steps this
+            counted extra attempts of the whole scrape. None uses config.SCRAPE_STEP_RETRIES.
+    """
+    static_html = None
+    if config.STATIC_PROBE_ENABLED:
+        # Static pages don't need the browser for their HTML (and in text_only mode not at all).
+        is_static, raw_html = await static_probe_service.probe_static_page(url)
+        if is_static:
+            # BeautifulSoup on a whole document takes long enough to stall the event loop.
+            static_html = await asyncio.to_thread(clean_html_for_llm, raw_html)
+            if config.STATIC_SCRAPE_MODE == "text_only":
+                return ScrapedContext(desktop_screenshot_base64="", mobile_screenshot_base64="", simplified_html=static_html)
+
+    # Each scrape runs its own Chromium; cap how many exist at once across all requests.
+    async with admission_service.browser_stage.slot():
+        return await _scrape_website_context(url, retries, static_html)
+
+
+async def _launch_page(p):
+    browser = await p.chromium.launch(
+        headless=True,
+        args=[
+            '--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage',
+            '--disable-blink-features=AutomationControlled',
+            '--disable-features=IsolateOrigins,site-per-process',
+            '--disable-web-security'
+        ]
+    )
+    
+    context = await browser.new_context(
+        user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36", # Use a current User-Agent
+        viewport={"width": 1920, "height": 1080},
+        locale="en-US",
+        bypass_csp=True,  # Bypass Content Security Policy
+        ignore_https_errors=True,
+        extra_http_headers={
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept-Encoding": "gzip, deflate, br",
+            "Sec-Ch-Ua-Mobile": "?0",
+            "Sec-Ch-Ua-Platform": '"macOS"',
+            "Sec-Fetch-Dest": "document",
+            "Sec-Fetch-Mode": "navigate",
+            "Sec-Fetch-Site": "none",
+            "Sec-Fetch-User": "?1",
+            "Upgrade-Insecure-Requests": "1"
+        }
+    )
+    
+    page = await context.new_page()
     
-    for attempt in range(retries + 1):
+    # Apply a minimal, custom stealth script instead of the full library
+    await page.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    """)
+    return browser, page
+
+
+# --- Scrape steps ---
+
+async def _navigate(page, url: str):
+    print(f"Navigating to {url}...")
+    response = await page.goto(url, wait_until="load", timeout=10000)
+    if response:
+        print(f"Initial response status: {response.status}")
+
+
+async def _settle(page, static: bool):
+    if not static:
+        # A very long, patient wait for client-side JavaScript to render
+        print("Performing long static wait for SPA hydration (10 seconds)...")
+        await page.wait_for_timeout(10000)
+    else:
+        await page.wait_for_timeout(config.STATIC_SETTLE_MS)
+    
+    # Optional: Scroll down to trigger lazy-loaded elements
+    try:
+        print("Scrolling page to trigger lazy-loading...")
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await page.wait_for_timeout(2000) # Wait for content to load
+        await page.evaluate("window.scrollTo(0, 0)") # Scroll back up
+        await page.wait_for_timeout(1000)
+    except Exception as scroll_err:
+        print(f"Could not scroll page, continuing anyway: {scroll_err}")
+
+
+async def _capture_desktop(page) -> str:
+    print("Taking desktop screenshot...")
+    desktop_buffer = await page.screenshot(full_page=True, timeout=30000)
+    return base64.b64encode(desktop_buffer).decode('utf-8')
+
+
+async def _extract_html(page) -> str:
+    # Runs before the mobile capture so layout extraction sees the desktop viewport.
+    if config.SCRAPE_EXTRACTION_MODE == "layout":
+        return await _extract_layout_html(page)
+    print("Extracting and cleaning HTML content...")
+    html_content_raw = await page.content() # Get full page content
+    
+    if not html_content_raw or len(html_content_raw) < 200 or "Application error" in html_content_raw:
+        print("Scraped content is empty or an error page. Failing this attempt.")
+        raise ValueError("Scraped content was an empty or known error page.")
+    
+    return clean_html_for_llm(html_content_raw)
+
+
+async def _capture_mobile(page) -> str:
+    print("Taking mobile screenshot...")
+    await page.set_viewport_size({"width": 390, "height": 844})
+    await page.wait_for_timeout(1500) # Wait for resize
+    mobile_buffer = await page.screenshot(full_page=True, timeout=30000)
+    return base64.b64encode(mobile_buffer).decode('utf-8')
+
+
+class _ScrapeSession:
+    """
+    The browser and page one scrape works on. The page steps (navigate, settle) are re-run only
+    when the page was lost (crash, disconnect) or never became ready.
+    """
+
+    def __init__(self, p, url: str, static: bool, retries: int | None):
+        self.p = p
+        self.url = url
+        self.static = static
+        self.retries = retries
+        self.browser = None
+        self.page = None
+        self.ready = False
+        self.navigations = 0
+        self.last_error: Exception | None = None
+
+    def step_retries(self, step: str) -> int:
+        return self.retries if self.retries is not None else config.SCRAPE_STEP_RETRIES[step]
+
+    def page_alive(self) -> bool:
+        return self.page is not None and not self.page.is_closed() and self.browser.is_connected()
+
+    async def close(self):
+        if self.browser and self.browser.is_connected():
+            await self.browser.close()
+        self.browser = self.page = None
+
+    async def attempt(self, step: str, func, *args):
+        """One attempt at one step under the step's timeout. Time spent on failed attempts is wasted browser time."""
+        started = time.monotonic()
+        timeout = config.SCRAPE_STEP_TIMEOUT_SECONDS[step]
         try:
-            async with async_playwright() as p:
-                print(f"Attempt {attempt + 1}: Launching browser...")
-                
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage',
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--disable-web-security'
-                    ]
-                )
-                
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36", # Use a current User-Agent
-                    viewport={"width": 1920, "height": 1080},
-                    locale="en-US",
-                    bypass_csp=True,  # Bypass Content Security Policy
-                    ignore_https_errors=True,
-                    extra_http_headers={
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                        "Accept-Language": "en-US,en;q=0.9",
-                        "Accept-Encoding": "gzip, deflate, br",
-                        "Sec-Ch-Ua-Mobile": "?0",
-                        "Sec-Ch-Ua-Platform": '"macOS"',
-                        "Sec-Fetch-Dest": "document",
-                        "Sec-Fetch-Mode": "navigate",
-                        "Sec-Fetch-Site": "none",
-                        "Sec-Fetch-User": "?1",
-                        "Upgrade-Insecure-Requests": "1"
-                    }
-                )
-                
-                page = await context.new_page()
-                
-                # Apply a minimal, custom stealth script instead of the full library
-                await page.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                """)
-                
-                print(f"Navigating to {url}...")
-                response = await page.goto(url, wait_until="load", timeout=10000)
-                
-                if response:
-                    print(f"Initial response status: {response.status}")
-                
-                # A very long, patient wait for client-side JavaScript to render
-                print("Performing long static wait for SPA hydration (10 seconds)...")
-                await page.wait_for_timeout(10000)
-                
-                # Optional: Scroll down to trigger lazy-loaded elements
-                try:
-                    print("Scrolling page to trigger lazy-loading...")
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await page.wait_for_timeout(2000) # Wait for content to load
-                    await page.evaluate("window.scrollTo(0, 0)") # Scroll back up
-                    await page.wait_for_timeout(1000)
-                except Exception as scroll_err:
-                    print(f"Could not scroll page, continuing anyway: {scroll_err}")
-
-                print("Taking desktop screenshot...")
-                desktop_buffer = await page.screenshot(full_page=True, timeout=30000)
-                
-                print("Taking mobile screenshot...")
-                await page.set_viewport_size({"width": 390, "height": 844})
-                await page.wait_for_timeout(1500) # Wait for resize
-                mobile_buffer = await page.screenshot(full_page=True, timeout=30000)
-                
-                desktop_base64 = base64.b64encode(desktop_buffer).decode('utf-8')
-                mobile_base64 = base64.b64encode(mobile_buffer).decode('utf-8')
-                
-                print("Extracting and cleaning HTML content...")
-                html_content_raw = await page.content() # Get full page content
-                
-                if not html_content_raw or len(html_content_raw) < 200 or "Application error" in html_content_raw:
-                    print("Scraped content is empty or an error page. Failing this attempt.")
-                    raise ValueError("Scraped content was an empty or known error page.")
-                
-                simplified_html_output = clean_html_for_llm(html_content_raw)
-                
-                await browser.close()
-                browser = None
-                
-                return ScrapedContext(
-                    desktop_screenshot_base64=desktop_base64,
-                    mobile_screenshot_base64=mobile_base64,
-                    simplified_html=simplified_html_output
-                )
-                
+            return await asyncio.wait_for(func(*args), timeout=timeout)
         except Exception as e:
-            print(f"Error during scraping attempt {attempt + 1} for {url}: {type(e).__name__} - {e}\n{traceback.format_exc()}")
-            last_exception = e
-            if browser and browser.is_connected():
-                await browser.close()
-            if attempt < retries:
-                await asyncio.sleep(3)
-            else:
-                raise HTTPException(status_code=422, detail=f"Failed to scrape the reference URL after multiple attempts. It may be heavily protected or incompatible. Final error: {str(last_exception)}")
-    
-    raise HTTPException(status_code=500, detail="Scraping failed unexpectedly after all attempts.")
\ No newline at end of file
+            if isinstance(e, TimeoutError):
+                e = TimeoutError(f"Step '{step}' timed out after {timeout}s")
+            scrape_stats.step_failures[step] += 1
+            scrape_stats.wasted_browser_seconds += time.monotonic() - started
+            self.last_error = e
+            print(f"Scrape step '{step}' failed for {self.url}: {type(e).__name__} - {e}")
+            if not self.page_alive():
+                self.ready = False
+            raise e
+
+    async def run_step(self, step: str, func, *args):
+        for attempt in range(self.step_retries(step) + 1):
+            try:
+                return await self.attempt(step, func, *args)
+            except Exception:
+                if attempt >= self.step_retries(step):
+                    raise
+                await asyncio.sleep(config.SCRAPE_STEP_RETRY_DELAY_SECONDS)
+
+    async def _navigate(self):
+        if not self.page_alive():
+            await self.close()
+            print("Launching browser...")
+            self.browser, self.page = await _launch_page(self.p)
+        await _navigate(self.page, self.url)
+
+    async def ensure_ready(self):
+        """Launches (or relaunches) the browser and runs navigate + settle if the page isn't ready."""
+        if self.ready and self.page_alive():
+            return
+        if self.navigations:
+            scrape_stats.relaunches += 1
+            print(f"Page for {self.url} was lost; re-running navigate/settle only.")
+        started = time.monotonic()
+        await self.run_step("navigate", self._navigate)
+        try:
+            await self.run_step("settle", _settle, self.page, self.static)
+        except Exception as e:
+            # Settling only improves fidelity; capture what the page shows now.
+            print(f"Settle step failed, capturing anyway: {e}")
+        if self.navigations:
+            scrape_stats.wasted_browser_seconds += time.monotonic() - started
+        self.navigations += 1
+        self.ready = True
+
+
+_STEP_FUNCS = {"desktop_capture": _capture_desktop, "html_extract": _extract_html, "mobile_capture": _capture_mobile}
+
+
+async def _capture_artifacts(session: _ScrapeSession, artifacts: dict) -> None:
+    """
+    Runs the artifact steps whose artifact is not in `artifacts` yet, adding each one as it is
+    captured. A failed step is retried on its own, after navigate/settle if the page was lost.
+    Raises only if navigation fails for good.
+    """
+    for step, artifact in ARTIFACT_STEPS.items():
+        if artifact in artifacts:
+            continue
+        for attempt in range(session.step_retries(step) + 1):
+            await session.ensure_ready()
+            try:
+                artifacts[artifact] = await session.attempt(step, _STEP_FUNCS[step], session.page)
+                break
+            except Exception:
+                if attempt >= session.step_retries(step):
+                    break
+                # An all-or-nothing retry would have thrown these away.
+                scrape_stats.artifacts_kept_on_retry += sum(1 for name in artifacts if name != "simplified_html" or not session.static)
+                await asyncio.sleep(config.SCRAPE_STEP_RETRY_DELAY_SECONDS)
+
+
+def _scrape_result(url: str, artifacts: dict, last_error: Exception | None) -> ScrapedContext:
+    """The captured artifacts as a ScrapedContext, degraded if some are missing. Raises 422 if all are."""
+    missing = [name for name in ARTIFACT_STEPS.values() if not artifacts.get(name)]
+    if len(missing) == len(ARTIFACT_STEPS):
+        scrape_stats.failed += 1
+        raise HTTPException(status_code=422, detail=f"Failed to scrape the reference URL after multiple attempts. It may be heavily protected or incompatible. Final error: {str(last_error)}")
+    if missing:
+        scrape_stats.degraded += 1
+        print(f"Scrape of {url} is degraded; missing: {', '.join(missing)}")
+
+    return ScrapedContext(
+        desktop_screenshot_base64=artifacts.get("desktop_screenshot", ""),
+        mobile_screenshot_base64=artifacts.get("mobile_screenshot", ""),
+        simplified_html=artifacts.get("simplified_html"),
+        degraded=bool(missing),
+        missing_artifacts=missing,
+    )
+
+
+async def _scrape_website_context(url: str, retries: int | None, static_html: str | None = None) -> ScrapedContext:
+    """
+    Browser scrape as checkpointed steps. Each artifact (desktop screenshot, HTML, mobile
+    screenshot) is kept once captured; a failed step is retried on its own and, if the page
+    was lost, only navigate/settle are re-run before it. When a step runs out of retries the
+    artifacts captured so far are returned, flagged as degraded.
+    With `static_html` (from the HTTP probe) only the screenshots are taken.
+    """
+    from playwright.async_api import async_playwright
+    scrape_stats.scrapes += 1
+    artifacts = {"simplified_html": static_html} if static_html is not None else {}
+
+    async with async_playwright() as p:
+        session = _ScrapeSession(p, url, static_html is not None, retries)
+        try:
+            await _capture_artifacts(session, artifacts)
+        except Exception as e:
+            # Only navigation failing for good ends up here; keep whatever was captured.
+            print(f"Error during scraping of {url}: {type(e).__name__} - {e}\n{traceback.format_exc()}")
+            session.last_error = e
+        finally:
+            await session.close()
+
+    return _scrape_result(url, artifacts, session.last_error)
@@ -0,0 +1,188 @@
+# backend/app/services/static_probe_service.py
+"""
+Pre-flight HTTP probe that decides whether a reference site needs a real browser.
+
+Plain static pages (server-rendered HTML + CSS, little JavaScript) look the same from a
+single GET as after a 10-second hydration wait in Chromium, so their simplified HTML can be
+built straight from the HTTP response. Every decision is printed and appended to
+config.STATIC_PROBE_AUDIT_LOG so misclassifications can be audited later.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from html.parser import HTMLParser
+
+from app.core import config, metrics
+
+_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+
+# Markup left behind by client-rendered frameworks; a page carrying any of them is hydrated in the browser.
+_SPA_MARKERS = {
+    "next": re.compile(r'id=["\']__next["\']|__NEXT_DATA__'),
+    "nuxt": re.compile(r'id=["\']__nuxt["\']|window\.__NUXT__'),
+    "gatsby": re.compile(r'id=["\']___gatsby["\']'),
+    "angular": re.compile(r'ng-version=|<app-root'),
+    "react": re.compile(r'data-reactroot'),
+    "empty_mount": re.compile(r'<div[^>]+id=["\'](?:root|app|svelte)["\'][^>]*>\s*</div>', re.IGNORECASE),
+}
+_NON_VISIBLE_TAGS = {"script", "style", "noscript", "template", "svg", "head", "title"}
+
+_client = None
+_decisions = {"static": 0, "dynamic": 0, "error": 0}
+
+
+class _PageSignals(HTMLParser):
+    """Single pass over the document counting visible body text and script weight."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.text_chars = 0
+        self.external_scripts = 0
+        self.inline_script_bytes = 0
+        self._hidden_depth = 0
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script":
+            self._in_script = True
+            if dict(attrs).get("src"):
+                self.external_scripts += 1
+        if tag in _NON_VISIBLE_TAGS:
+            self._hidden_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_script = False
+        if tag in _NON_VISIBLE_TAGS and self._hidden_depth:
+            self._hidden_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.inline_script_bytes += len(data)
+        elif not self._hidden_depth:
+            self.text_chars += len(data.strip())
+
+
+def classify_static_html(html: str) -> tuple[bool, dict]:
+    """
+    Static-page classifier. Returns (is_static, signals), where signals["reasons"] lists why a
+    page was judged to need a browser (empty when it is static).
+    """
+    parser = _PageSignals()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        return False, {"reasons": [f"unparseable: {e}"]}
+
+    spa_markers = [name for name, pattern in _SPA_MARKERS.items() if pattern.search(html)]
+    reasons = []
+    if spa_markers:
+        reasons.append(f"spa_markers={','.join(spa_markers)}")
+    if parser.text_chars < config.STATIC_PROBE_MIN_TEXT_CHARS:
+        reasons.append(f"text_chars={parser.text_chars}<{config.STATIC_PROBE_MIN_TEXT_CHARS}")
+    if parser.external_scripts > config.STATIC_PROBE_MAX_EXTERNAL_SCRIPTS:
+        reasons.append(f"external_scripts={parser.external_scripts}>{config.STATIC_PROBE_MAX_EXTERNAL_SCRIPTS}")
+    if parser.inline_script_bytes > config.STATIC_PROBE_MAX_INLINE_SCRIPT_BYTES:
+        reasons.append(f"inline_script_bytes={parser.inline_script_bytes}>{config.STATIC_PROBE_MAX_INLINE_SCRIPT_BYTES}")
+
+    return not reasons, {
+        "text_chars": parser.text_chars,
+        "external_scripts": parser.external_scripts,
+        "inline_script_bytes": parser.inline_script_bytes,
+        "spa_markers": spa_markers,
+        "reasons": reasons,
+    }
+
+
+def _get_client():
+    # One pooled client per process; httpx is imported on first use like the other SDKs.
+    global _client
+    if _client is None:
+        import httpx
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=config.STATIC_PROBE_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={
+                "User-Agent": _USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _append_audit_line(line: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(config.STATIC_PROBE_AUDIT_LOG), exist_ok=True)
+        with open(config.STATIC_PROBE_AUDIT_LOG, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"Static probe: could not write audit log: {e}")
+
+
+async def _audit(decision: dict) -> None:
+    print(f"Static probe: {decision['url']} -> {decision['decision']} "
+          f"({'; '.join(decision.get('reasons') or []) or 'static'}) in {decision['elapsed_ms']}ms")
+    await asyncio.to_thread(_append_audit_line, json.dumps(decision) + "\n")
+
+
+async def probe_static_page(url: str) -> tuple[bool, str | None]:
+    """
+    Fetches `url` over HTTP and classifies it.
+
+    Returns:
+        (is_static, raw_html). raw_html is only returned for static pages. Any fetch error
+        counts as "needs a browser" so the regular scrape path handles (and reports) it.
+    """
+    started = time.monotonic()
+    decision = {"url": url, "at": time.time()}
+    html = None
+    is_static = False
+    try:
+        async with _get_client().stream("GET", url) as response:
+            decision["status"] = response.status_code
+            decision["final_url"] = str(response.url)
+            content_type = response.headers.get("content-type", "")
+            if response.status_code >= 400:
+                decision["reasons"] = [f"status={response.status_code}"]
+            elif "html" not in content_type:
+                decision["reasons"] = [f"content_type={content_type or 'missing'}"]
+            else:
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > config.STATIC_PROBE_MAX_BYTES:
+                        break
+                if len(body) > config.STATIC_PROBE_MAX_BYTES:
+                    decision["reasons"] = [f"bytes>{config.STATIC_PROBE_MAX_BYTES}"]
+                else:
+                    html = body.decode(response.encoding or "utf-8", errors="replace")
+                    is_static, signals = await asyncio.to_thread(classify_static_html, html)
+                    decision.update(signals)
+        decision["decision"] = "static" if is_static else "dynamic"
+    except Exception as e:
+        decision["decision"] = "error"
+        decision["reasons"] = [f"{type(e).__name__}: {e}"]
+
+    _decisions[decision["decision"]] += 1
+    decision["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    await _audit(decision)
+    return is_static, html if is_static else None
+
+
+metrics.register("static_probe", lambda: {
+    "enabled": config.STATIC_PROBE_ENABLED,
+    "mode": config.STATIC_SCRAPE_MODE,
+    "decisions": dict(_decisions),
+})
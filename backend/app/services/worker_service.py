@@ -0,0 +1,300 @@
+# backend/app/services/worker_service.py
+"""
+Worker tier: leases jobs from the job queue and runs the scrape/LLM pipelines.
+
+Browser work runs in a dedicated pool of browser processes and LLM calls in a separate pool
+of processes, so neither competes with the worker's own event loop (lease heartbeats) or
+with the API. Each pool process keeps one event loop for its lifetime.
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+
+from app.core import config, metrics
+from app.models.pydantic_models import Job, PortfolioBuildConfig
+from app.services import scraper_service, scrape_cache_service, portfolio_service, clone_service, admission_service
+from app.services.job_queue import JobQueue, get_job_queue
+
+# --- Pool processes ---
+
+_child_loop: asyncio.AbstractEventLoop | None = None
+
+def _run_in_child(func, *args):
+    """Runs coroutine function `func(*args)` inside a pool process; errors come back as values."""
+    global _child_loop
+    if _child_loop is None:
+        _child_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_child_loop)
+    try:
+        return ("ok", _child_loop.run_until_complete(func(*args)))
+    except HTTPException as e:
+        return ("error", e.status_code, str(e.detail))
+    except Exception as e:
+        print(f"Error in pool process {os.getpid()}: {type(e).__name__} - {e}\n{traceback.format_exc()}")
+        return ("error", 500, f"{type(e).__name__}: {e}")
+
+
+_pools: dict[str, ProcessPoolExecutor] = {}
+
+def _get_pool(name: str) -> ProcessPoolExecutor:
+    if name not in _pools:
+        size = config.WORKER_BROWSER_PROCESSES if name == "browser" else config.WORKER_LLM_PROCESSES
+        # spawn: Playwright and gRPC (Vertex AI) are not fork-safe.
+        _pools[name] = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+    return _pools[name]
+
+def shutdown_pools() -> None:
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+# Pool calls whose caller was cancelled after the call had started. A pool process can't be
+# interrupted, so these run to completion in the background and their results are dropped.
+_orphaned_pool_calls = {"total": 0, "running": 0}
+
+def _orphaned_call_done(_future) -> None:
+    _orphaned_pool_calls["running"] -= 1
+
+async def _run_in_pool(pool_name: str, func, *args):
+    future = _get_pool(pool_name).submit(_run_in_child, func, *args)
+    try:
+        outcome = await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        # Cancelling a call that is still queued removes it; a running one can't be stopped.
+        if not future.cancel() and not future.done():
+            _orphaned_pool_calls["total"] += 1
+            _orphaned_pool_calls["running"] += 1
+            future.add_done_callback(_orphaned_call_done)
+            print(f"{pool_name} pool call {func.__name__} was abandoned while running; its result will be dropped.")
+        raise
+    if outcome[0] == "error":
+        raise HTTPException(status_code=outcome[1], detail=outcome[2])
+    return outcome[1]
+
+# --- Job handlers ---
+
+async def _handle_build_portfolio(payload: dict) -> dict:
+    build_config = PortfolioBuildConfig(**payload)
+    scrape = asyncio.ensure_future(scrape_cache_service.get_or_scrape(
+        build_config.reference_url,
+        lambda url: _run_in_pool("browser", scraper_service.scrape_website_context, url)
+    ))
+    parse = asyncio.ensure_future(_run_in_pool("llm", portfolio_service.parse_resume, build_config.resume_text))
+    try:
+        scraped_context, resume_json = await asyncio.gather(scrape, parse)
+    except BaseException:
+        scrape.cancel(); parse.cancel()
+        raise
+    portfolio_service.validate_reference_context(build_config.reference_url, scraped_context)
+    html = await _run_in_pool("llm", portfolio_service.generate_portfolio_html, scraped_context, resume_json)
+    result = await portfolio_service.publish_portfolio(html, resume_json, payload.get("filename_suffix", ""))
+    return result.model_dump()
+
+async def _handle_scrape_reference(payload: dict) -> dict:
+    """Scrapes a batch's reference URL into the scrape cache that its build_portfolio jobs read."""
+    reference_url = payload["reference_url"]
+    scraped_context = await scrape_cache_service.get_or_scrape(
+        reference_url,
+        lambda url: _run_in_pool("browser", scraper_service.scrape_website_context, url)
+    )
+    portfolio_service.validate_reference_context(reference_url, scraped_context)
+    return {"reference_url": reference_url}
+
+async def _handle_clone_website(payload: dict) -> dict:
+    url = payload["url"]
+    context_data = await _run_in_pool("browser", scraper_service.scrape_website_context, url)
+    clone_service.validate_clone_context(context_data)
+    existing, fingerprint = await clone_service.find_unchanged_clone(url, context_data, payload.get("force_regenerate", False))
+    if existing is not None:
+        return existing.model_dump()
+    html = await _run_in_pool("llm", clone_service.generate_clone_html, url, context_data)
+    cloned = clone_service.save_clone_html(url, html)
+    await clone_service.record_clone(url, fingerprint, cloned)
+    return cloned.model_dump()
+
+JOB_HANDLERS = {
+    "build_portfolio": _handle_build_portfolio,
+    "clone_website": _handle_clone_website,
+    "scrape_reference": _handle_scrape_reference,
+}
+
+# --- API side ---
+
+async def submit_and_wait(kind: str, payload: dict) -> dict:
+    """Enqueues a job for the worker tier and waits for its result (API tier, queue mode)."""
+    queue = get_job_queue()
+    job = await queue.enqueue(kind, payload)
+    print(f"Enqueued {kind} job {job.id}; waiting for a worker...")
+    try:
+        job = await queue.wait(job.id, timeout=config.JOB_WAIT_TIMEOUT_SECONDS)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if job.status == "failed":
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error or "Job failed.")
+    return job.result
+
+class _QueueStatsCache:
+    """
+    Latest job queue stats, refreshed every JOB_QUEUE_STATS_REFRESH_SECONDS in the background.
+    Admission checks and /metrics read this instead of querying the queue (a sqlite connection
+    and GROUP BY for the sqlite backend) on every request.
+    """
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.value: dict = {"jobs": {}}
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.value = await self.queue.stats_async()
+            except Exception as e:
+                print(f"Failed to refresh job queue stats: {type(e).__name__} - {e}")
+            await asyncio.sleep(config.JOB_QUEUE_STATS_REFRESH_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def queued(self) -> int:
+        return self.value["jobs"].get("queued", 0)
+
+
+_queue_stats: _QueueStatsCache | None = None
+
+def enable_queue_mode() -> None:
+    """Wires the job queue into the API tier's metrics and admission control. Call from the event loop."""
+    global _queue_stats
+    _queue_stats = _QueueStatsCache(get_job_queue())
+    _queue_stats.start()
+    metrics.register("job_queue", lambda: _queue_stats.value)
+    admission_service.register_queue_depth_source("jobs", _queue_stats.queued)
+
+# --- Worker loop ---
+
+def _is_retryable(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+class Worker:
+    """
+    Leases up to `concurrency` jobs at a time, heartbeats their leases while they run and
+    reports the outcome. Retryable failures (5xx, 429) are requeued with exponential backoff;
+    a job whose lease is lost (e.g. this worker stalled) is abandoned, since another worker
+    may already own it. A pool call the job was waiting on can't be interrupted: it finishes
+    in the background, its result is dropped, and it is counted in `orphaned_pool_calls`.
+    """
+
+    def __init__(self, queue: JobQueue | None = None, concurrency: int | None = None, worker_id: str | None = None):
+        self.queue = queue or get_job_queue()
+        self.concurrency = concurrency or config.WORKER_CONCURRENCY
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.running: dict[str, asyncio.Task] = {}
+        self._abandoned: set[str] = set()
+        self.completed = 0
+        self.failed = 0
+        self.lost_leases = 0
+
+    def _info(self) -> dict:
+        return {"pid": os.getpid(), "running": len(self.running), "completed": self.completed, "failed": self.failed,
+                "lost_leases": self.lost_leases, "orphaned_pool_calls": dict(_orphaned_pool_calls)}
+
+    async def _liveness_loop(self):
+        while True:
+            try:
+                await self.queue.record_worker_heartbeat(self.worker_id, self._info())
+            except Exception as e:
+                print(f"Worker {self.worker_id}: failed to record heartbeat: {e}")
+            await asyncio.sleep(config.WORKER_HEARTBEAT_SECONDS)
+
+    async def _keep_lease(self, job: Job, work: asyncio.Task):
+        while not work.done():
+            await asyncio.sleep(config.WORKER_HEARTBEAT_SECONDS)
+            if not await self.queue.heartbeat(job.id, self.worker_id, config.JOB_LEASE_SECONDS):
+                print(f"Worker {self.worker_id}: lost lease on job {job.id}; abandoning it.")
+                self._abandoned.add(job.id)
+                self.lost_leases += 1
+                work.cancel()
+                return
+
+    async def _process(self, job: Job):
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            await self.queue.fail(job.id, self.worker_id, f"Unknown job kind: {job.kind}", 400)
+            return
+        print(f"Worker {self.worker_id}: running {job.kind} job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+        work = asyncio.create_task(handler(job.payload))
+        lease_keeper = asyncio.create_task(self._keep_lease(job, work))
+        try:
+            result = await work
+            if await self.queue.complete(job.id, self.worker_id, result):
+                self.completed += 1
+            else:
+                print(f"Worker {self.worker_id}: lost lease on job {job.id} before it finished; dropping its result.")
+                self.lost_leases += 1
+        except asyncio.CancelledError:
+            if job.id not in self._abandoned:
+                raise
+            self._abandoned.discard(job.id)
+        except Exception as e:
+            if isinstance(e, HTTPException):
+                status_code, detail = e.status_code, str(e.detail)
+            else:
+                print(f"Worker {self.worker_id}: job {job.id} crashed: {type(e).__name__} - {e}\n{traceback.format_exc()}")
+                status_code, detail = 500, f"{type(e).__name__}: {e}"
+            retry_delay = config.JOB_RETRY_BASE_DELAY_SECONDS * (2 ** (job.attempts - 1)) if _is_retryable(status_code) else None
+            await self.queue.fail(job.id, self.worker_id, detail, status_code, retry_delay)
+            self.failed += 1
+        finally:
+            lease_keeper.cancel()
+
+    @staticmethod
+    async def _acquire_slot(slots: asyncio.Semaphore, stop: asyncio.Event) -> bool:
+        """Waits for a free job slot. Returns False (holding no slot) if `stop` is set first."""
+        acquire = asyncio.ensure_future(slots.acquire())
+        stopped = asyncio.ensure_future(stop.wait())
+        try:
+            await asyncio.wait({acquire, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+            if not acquire.done():
+                acquire.cancel()
+        if acquire.done() and not acquire.cancelled():
+            if not stop.is_set():
+                return True
+            slots.release()
+        return False
+
+    async def run(self, stop: asyncio.Event | None = None):
+        stop = stop or asyncio.Event()
+        print(f"Worker {self.worker_id} started (concurrency={self.concurrency}).")
+        liveness = asyncio.create_task(self._liveness_loop())
+        slots = asyncio.Semaphore(self.concurrency)
+        try:
+            while not stop.is_set():
+                if not await self._acquire_slot(slots, stop):
+                    break
+                job = await self.queue.lease(self.worker_id, config.JOB_LEASE_SECONDS)
+                if job is None:
+                    slots.release()
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=config.JOB_POLL_INTERVAL_SECONDS)
+                    except TimeoutError:
+                        pass
+                    continue
+                task = asyncio.create_task(self._process(job))
+                self.running[job.id] = task
+                task.add_done_callback(lambda t, job_id=job.id: (self.running.pop(job_id, None), slots.release()))
+        finally:
+            tasks = [liveness, *self.running.values()]
+            for task in tasks:
+                task.cancel()
+            # Leases of cancelled jobs simply expire and another worker picks them up.
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print(f"Worker {self.worker_id} stopped.")
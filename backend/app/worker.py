@@ -0,0 +1,35 @@
+# backend/app/worker.py
+"""
+Worker tier entry point. Leases jobs enqueued by the API tier (EXECUTION_MODE=queue) and runs
+them, with scraping and LLM calls in their own process pools.
+
+Requires a shared queue backend, e.g.:
+    JOB_QUEUE_BACKEND=sqlite python -m app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import signal
+
+from app.core import config
+from app.services import worker_service
+
+
+async def main(concurrency: int, worker_id: str | None):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await worker_service.Worker(concurrency=concurrency, worker_id=worker_id).run(stop)
+    finally:
+        worker_service.shutdown_pools()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a pipeline worker.")
+    parser.add_argument("--concurrency", type=int, default=config.WORKER_CONCURRENCY, help="Jobs leased at once.")
+    parser.add_argument("--worker-id", default=None, help="Stable identifier (defaults to host-pid-random).")
+    args = parser.parse_args()
+    if config.JOB_QUEUE_BACKEND == "memory":
+        raise SystemExit("The memory queue backend only works inside the API process. Set JOB_QUEUE_BACKEND=sqlite.")
+    asyncio.run(main(args.concurrency, args.worker_id))
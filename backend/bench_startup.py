@@ -0,0 +1,112 @@
+"""
+Startup benchmark for the API process.
+
+Measures two things:
+1. Import cost of `app.main`, using `python -X importtime` (top modules by cumulative time).
+2. Optionally (--serve), wall time from launching uvicorn until `/` answers and
+   until `/ready` reports the lazily-loaded subsystems as warm.
+
+Usage:
+    python bench_startup.py [--top 15] [--runs 3] [--serve] [--port 8765]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_imports(top: int) -> tuple[float, list[tuple[int, str]]]:
+    """Imports app.main in a fresh interpreter and returns (total seconds, [(cumulative_us, module)])."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit("Importing app.main failed; see stderr above.")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|", 2)
+            entries.append((int(cumulative.strip()), name.rstrip()))
+        except ValueError:
+            continue
+
+    # Top-level imports are the ones without indentation in the module column.
+    total_us = sum(us for us, name in entries if not name.startswith("  "))
+    heaviest = sorted(entries, key=lambda e: e[0], reverse=True)[:top]
+    return total_us / 1_000_000, heaviest
+
+
+def _get_json(url: str):
+    with urllib.request.urlopen(url, timeout=1) as resp:
+        return json.loads(resp.read())
+
+
+def measure_serving(port: int, timeout: float) -> dict:
+    """Launches uvicorn and times the first health check and full warm-up."""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"first_health_check_s": None, "vertex_ai_warm_s": None, "subsystems": None}
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if result["first_health_check_s"] is None:
+                    _get_json(f"http://127.0.0.1:{port}/")
+                    result["first_health_check_s"] = round(time.perf_counter() - start, 3)
+                ready = _get_json(f"http://127.0.0.1:{port}/ready")
+                result["subsystems"] = ready["subsystems"]
+                if ready["status"] != "warming":
+                    if ready["subsystems"]["vertex_ai"] == "ready":
+                        result["vertex_ai_warm_s"] = round(time.perf_counter() - start, 3)
+                    break
+            except OSError:
+                pass
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Number of heaviest imports to list.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of import measurements to take.")
+    parser.add_argument("--serve", action="store_true", help="Also time uvicorn until / and /ready answer.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for warm-up with --serve.")
+    args = parser.parse_args()
+
+    totals = []
+    heaviest = []
+    for _ in range(args.runs):
+        total, heaviest = measure_imports(args.top)
+        totals.append(total)
+
+    print(f"import app.main: median {statistics.median(totals):.3f}s over {args.runs} run(s)")
+    print("\nHeaviest imports (cumulative, last run):")
+    for us, name in heaviest:
+        print(f"  {us / 1000:9.1f} ms  {name.strip()}")
+
+    if args.serve:
+        print("\nServing:")
+        for key, value in measure_serving(args.port, args.timeout).items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
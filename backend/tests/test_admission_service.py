@@ -0,0 +1,88 @@
+# backend/tests/test_admission_service.py
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI
+
+from app.api import endpoints
+from app.core import config
+from app.models.pydantic_models import ClonedHtmlFileResponse, ScrapedContext
+from app.services import admission_service, batch_service
+
+
+class BatchAdmissionTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self._saved = (config.ADMISSION_MAX_QUEUE_LENGTH, config.EXECUTION_MODE)
+        config.ADMISSION_MAX_QUEUE_LENGTH = 2
+        config.EXECUTION_MODE = "inline"
+        self.release_generation = asyncio.Event()
+        patches = [
+            mock.patch.object(admission_service, "current_rss_mb", lambda: None),
+            mock.patch.object(batch_service.scrape_cache_service, "get_or_scrape", self._scrape),
+            mock.patch.object(batch_service.portfolio_service, "parse_resume", self._parse_resume),
+            mock.patch.object(batch_service.portfolio_service, "validate_reference_context", lambda url, context: None),
+            mock.patch.object(batch_service.portfolio_service, "generate_and_publish", self._generate_and_publish),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        app = FastAPI()
+        app.include_router(endpoints.router)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        config.ADMISSION_MAX_QUEUE_LENGTH, config.EXECUTION_MODE = self._saved
+
+    async def _scrape(self, reference_url):
+        return ScrapedContext(desktop_screenshot_base64="", mobile_screenshot_base64="", simplified_html="<main></main>")
+
+    async def _parse_resume(self, resume_text):
+        return {"name": resume_text}
+
+    async def _generate_and_publish(self, scraped_context, resume_json, filename_suffix=""):
+        if filename_suffix != "_0":
+            await self.release_generation.wait()
+        return ClonedHtmlFileResponse(message="ok", file_path=f"p{filename_suffix}.html", view_link="https://cdn/p.html")
+
+    async def test_streaming_batch_counts_against_queue_length(self):
+        items = [{"reference_url": "https://a.com", "resume_text": f"resume {i}"} for i in range(3)]
+        response = await endpoints.build_portfolio_batch_endpoint(endpoints.BatchPortfolioBuildRequest(items=items))
+        self.assertEqual(admission_service._admitted_in_flight, 3)
+
+        sent: asyncio.Queue = asyncio.Queue()
+        async def send(message):
+            await sent.put(message)
+        async def receive():
+            await asyncio.Event().wait()
+        stream = asyncio.create_task(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+        self.assertEqual((await sent.get())["type"], "http.response.start")
+        self.assertIn(b'"index":0', (await sent.get())["body"])
+        # Item 0 has been sent; items 1 and 2 are still generating.
+        self.assertEqual(admission_service._admitted_in_flight, 2)
+
+        single = await self.client.post("/build-portfolio", json={"reference_url": "https://b.com", "resume_text": "other"})
+        self.assertEqual(single.status_code, 503)
+        self.assertIn("Retry-After", single.headers)
+
+        self.release_generation.set()
+        await stream
+        self.assertEqual(admission_service._admitted_in_flight, 0)
+
+    async def test_unstarted_stream_releases_admission(self):
+        items = [{"reference_url": "https://a.com", "resume_text": "resume"}]
+        response = await endpoints.build_portfolio_batch_endpoint(endpoints.BatchPortfolioBuildRequest(items=items))
+        self.assertEqual(admission_service._admitted_in_flight, 1)
+
+        async def failing_send(message):
+            raise OSError("client went away")
+        with self.assertRaises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, failing_send)
+        self.assertEqual(admission_service._admitted_in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
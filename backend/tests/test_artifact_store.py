@@ -0,0 +1,142 @@
+# backend/tests/test_artifact_store.py
+import base64
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.core import config
+from app.models.pydantic_models import ScrapedContext
+from app.services import artifact_store, scraper_service
+
+_DESKTOP = bytes(range(256)) * 3 + b"\r\n--not-a-boundary\r\n"
+_MOBILE = b"\x89PNG\r\n\x1a\n"
+_HTML = "<main><h1>Café</h1><script>alert(1)</script></main>"
+
+
+def _context(**overrides) -> ScrapedContext:
+    fields = {
+        "desktop_screenshot_base64": base64.b64encode(_DESKTOP).decode(),
+        "mobile_screenshot_base64": base64.b64encode(_MOBILE).decode(),
+        "simplified_html": _HTML,
+    }
+    return ScrapedContext(**{**fields, **overrides})
+
+
+def _parse_multipart(body: bytes, boundary: str) -> list[tuple[dict, bytes]]:
+    """Splits a multipart body by its Content-Length headers, checking the framing on the way."""
+    parts, position = [], 0
+    delimiter = f"--{boundary}".encode("ascii")
+    while True:
+        assert body[position:position + len(delimiter)] == delimiter, f"expected boundary at {position}"
+        position += len(delimiter)
+        if body[position:] == b"--\r\n":
+            return parts
+        header_end = body.index(b"\r\n\r\n", position)
+        headers = dict(line.split(": ", 1) for line in body[position + 2:header_end].decode("ascii").split("\r\n"))
+        start = header_end + 4
+        end = start + int(headers["Content-Length"])
+        assert body[end:end + 2] == b"\r\n", f"part {headers['Content-Disposition']} is not CRLF-terminated"
+        parts.append((headers, body[start:end]))
+        position = end + 2
+
+
+class Base64Test(unittest.TestCase):
+
+    def test_decoded_size_matches_for_every_padding(self):
+        for length in range(10):
+            data = bytes(range(length))
+            encoded = base64.b64encode(data).decode()
+            self.assertEqual(artifact_store.base64_decoded_size(encoded), length, encoded)
+
+    def test_chunked_decode_matches_single_decode(self):
+        for chunk_chars in (4, 8, 12):
+            for length in (0, 1, 2, 3, 11, 12, 13, 14):
+                data = bytes(range(length))
+                encoded = base64.b64encode(data).decode()
+                with mock.patch.object(artifact_store, "_BASE64_CHUNK_CHARS", chunk_chars):
+                    self.assertEqual(b"".join(artifact_store.iter_base64_decoded(encoded)), data, (chunk_chars, length))
+
+    def test_padding_only_in_final_chunk(self):
+        encoded = base64.b64encode(b"abcdefg").decode() # 12 chars ending in "="
+        with mock.patch.object(artifact_store, "_BASE64_CHUNK_CHARS", 4):
+            chunks = list(artifact_store.iter_base64_decoded(encoded))
+        self.assertEqual(chunks, [b"abc", b"def", b"g"])
+
+
+class ArtifactEndpointsTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.context = _context()
+        patches = [
+            mock.patch.object(config, "ARTIFACT_DIR", tmp_dir.name),
+            mock.patch.object(scraper_service, "scrape_website_context", self._scrape),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        app = FastAPI()
+        app.include_router(endpoints.router)
+        self.client = TestClient(app)
+
+    async def _scrape(self, url):
+        return self.context
+
+    def _scrape_request(self, format: str):
+        return self.client.post(f"/get-scraped-context?format={format}", json={"url": "https://example.com"})
+
+    def test_multipart_framing(self):
+        response = self._scrape_request("multipart")
+        self.assertEqual(response.status_code, 200)
+        media_type, boundary = response.headers["content-type"].split("; boundary=")
+        self.assertEqual(media_type, "multipart/mixed")
+        parts = _parse_multipart(response.content, boundary)
+        self.assertEqual([headers["Content-Type"] for headers, _ in parts],
+                         ["application/json", "image/png", "image/png", "text/plain; charset=utf-8"])
+        self.assertEqual(parts[0][0]["Content-Disposition"], 'inline; name="metadata"')
+        self.assertEqual(parts[1][0]["Content-Disposition"], 'inline; name="desktop_screenshot"; filename="desktop.png"')
+        self.assertEqual(json.loads(parts[0][1]),
+                         {"original_url": "https://example.com", "degraded": False, "missing_artifacts": []})
+        self.assertEqual([body for _, body in parts[1:]], [_DESKTOP, _MOBILE, _HTML.encode("utf-8")])
+
+    def test_multipart_skips_missing_artifacts(self):
+        self.context = _context(mobile_screenshot_base64="", degraded=True, missing_artifacts=["mobile_screenshot"])
+        response = self._scrape_request("multipart")
+        parts = _parse_multipart(response.content, response.headers["content-type"].split("; boundary=")[1])
+        self.assertEqual([headers["Content-Disposition"].split(";")[1] for headers, _ in parts],
+                         [' name="metadata"', ' name="desktop_screenshot"', ' name="simplified_html"'])
+        self.assertEqual(json.loads(parts[0][1])["missing_artifacts"], ["mobile_screenshot"])
+
+    def test_html_artifact_is_served_as_sandboxed_text(self):
+        listing = self._scrape_request("artifacts").json()
+        self.assertEqual(listing["artifacts"]["simplified_html"]["bytes"], len(_HTML.encode("utf-8")))
+        self.assertEqual(listing["artifacts"]["desktop_screenshot"]["bytes"], len(_DESKTOP))
+        response = self.client.get(f"/artifacts/{listing['artifact_id']}/simplified_html")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "text/plain; charset=utf-8")
+        for name, value in artifact_store.SECURITY_HEADERS.items():
+            self.assertEqual(response.headers[name], value)
+        self.assertEqual(response.text, _HTML)
+
+    def test_screenshot_artifact_is_raw_png(self):
+        listing = self._scrape_request("artifacts").json()
+        response = self.client.get(f"/artifacts/{listing['artifact_id']}/mobile_screenshot")
+        self.assertEqual(response.headers["content-type"], "image/png")
+        self.assertEqual(response.headers["X-Content-Type-Options"], "nosniff")
+        self.assertEqual(response.content, _MOBILE)
+
+    def test_unknown_or_invalid_artifact_is_not_found(self):
+        listing = self._scrape_request("artifacts").json()
+        self.assertEqual(self.client.get(f"/artifacts/{listing['artifact_id']}/secrets").status_code, 404)
+        self.assertEqual(self.client.get("/artifacts/..%2F..%2Fetc/simplified_html").status_code, 404)
+        self.assertEqual(self.client.get(f"/artifacts/{'0' * 32}/simplified_html").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
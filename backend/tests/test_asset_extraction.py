@@ -0,0 +1,81 @@
+# backend/tests/test_asset_extraction.py
+import unittest
+from unittest import mock
+
+from app.core import config
+from app.services import asset_extraction_service, s3_service
+
+_CSS = "\n".join(f".c{i} {{ color: #{i:06x}; }}" for i in range(100))
+_ICON = "<path d='" + "M0 0L10 10" * 30 + "'/>"
+
+
+class ExtractSharedAssetsTest(unittest.TestCase):
+
+    def test_css_style_blocks_are_externalized(self):
+        for opening_tag in ("<style>", '<style type="text/css">', "<style type='TEXT/CSS' media='screen'>"):
+            html, assets = asset_extraction_service.extract_shared_assets(f"<html><head>{opening_tag}{_CSS}</style></head></html>")
+            self.assertEqual(len(assets), 1, opening_tag)
+            self.assertIn(f'<link rel="stylesheet" href="{config.CLOUD_FRONT_DOMAIN}/', html)
+            self.assertNotIn("<style", html)
+
+    def test_non_css_style_blocks_stay_inline(self):
+        # The Tailwind Play CDN compiles text/tailwindcss blocks in-page; it never fetches linked files.
+        source = f'<html><head><style type="text/tailwindcss">@layer components {{ .btn {{ @apply px-4; }} }}\n{_CSS}</style></head></html>'
+        html, assets = asset_extraction_service.extract_shared_assets(source)
+        self.assertEqual(assets, [])
+        self.assertEqual(html, source)
+
+    def test_relative_css_references_stay_inline(self):
+        for reference in ('@import "theme.css";', "@import 'theme.css' screen;", "@import url(theme.css);",
+                          ".hero { background: url( 'img/bg.png'); }"):
+            source = f"<html><head><style>{reference}\n{_CSS}</style></head></html>"
+            html, assets = asset_extraction_service.extract_shared_assets(source)
+            self.assertEqual((html, assets), (source, []), reference)
+
+    def test_absolute_css_references_are_externalized(self):
+        for reference in ('@import "https://fonts.googleapis.com/css2?family=Inter";', "@import url('//cdn.example.com/a.css');",
+                          '.hero { background: url("https://example.com/bg.png"); }', ".icon { fill: url(#grad); }"):
+            _, assets = asset_extraction_service.extract_shared_assets(f"<html><head><style>{reference}\n{_CSS}</style></head></html>")
+            self.assertEqual(len(assets), 1, reference)
+
+    def test_markup_inside_scripts_is_untouched(self):
+        script = f"<script>const tpl = `<style>{_CSS}</style><svg class='x'>{_ICON}</svg><svg>{_ICON}</svg>`;</script>"
+        html, assets = asset_extraction_service.extract_shared_assets(f"<html><body>{script}</body></html>")
+        self.assertEqual(assets, [])
+        self.assertIn(script, html)
+
+    def test_svg_inside_script_does_not_count_as_repeat(self):
+        source = f"<html><body><svg>{_ICON}</svg><script>el.innerHTML = '<svg>{_ICON}</svg>';</script></body></html>"
+        self.assertEqual(asset_extraction_service.extract_shared_assets(source), (source, []))
+
+    def test_repeated_svgs_outside_scripts_are_shared(self):
+        script = f"<script>el.innerHTML = '<svg>{_ICON}</svg>';</script>"
+        html, assets = asset_extraction_service.extract_shared_assets(f"<body><svg>{_ICON}</svg>{script}<svg class='b'>{_ICON}</svg></body>")
+        self.assertEqual(len(assets), 1)
+        self.assertEqual(html.count("<use href="), 2)
+        self.assertIn(script, html)
+
+
+class KnownAssetKeysTest(unittest.TestCase):
+
+    def setUp(self):
+        patches = [mock.patch.object(s3_service, "_known_asset_keys", {}), mock.patch.object(config, "SHARED_ASSET_MAX_KNOWN_KEYS", 10)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_pruned_to_80_percent_of_cap_least_recently_used_first(self):
+        for i in range(10):
+            s3_service._remember_asset(f"assets/{i}.css")
+        self.assertTrue(s3_service._asset_known("assets/0.css"))
+        s3_service._remember_asset("assets/10.css")
+        self.assertEqual(len(s3_service._known_asset_keys), 8)
+        self.assertTrue(s3_service._asset_known("assets/0.css"))
+        self.assertTrue(s3_service._asset_known("assets/10.css"))
+        self.assertFalse(s3_service._asset_known("assets/1.css"))
+        self.assertFalse(s3_service._asset_known("assets/3.css"))
+        self.assertTrue(s3_service._asset_known("assets/4.css"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# backend/tests/test_batch_service.py
+# run_batch with the scrape, resume parse and generation steps replaced by in-memory fakes.
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.core import config
+from app.models.pydantic_models import ClonedHtmlFileResponse, PortfolioBuildConfig, ScrapedContext
+from app.services import batch_service
+
+
+def _item(reference_url: str, resume_text: str = "Jane Doe\nEngineer") -> PortfolioBuildConfig:
+    return PortfolioBuildConfig(reference_url=reference_url, resume_text=resume_text)
+
+
+class RunBatchTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.scraped_urls: list[str] = []
+        self.generation_started = asyncio.Event()
+        self.cancelled_generations: list[str] = []
+        self.block_suffixes: set[str] = set()
+        self._saved_mode = config.EXECUTION_MODE
+        config.EXECUTION_MODE = "inline"
+        patches = [
+            mock.patch.object(batch_service.scrape_cache_service, "get_or_scrape", self._scrape),
+            mock.patch.object(batch_service.portfolio_service, "parse_resume", self._parse_resume),
+            mock.patch.object(batch_service.portfolio_service, "validate_reference_context", lambda url, context: None),
+            mock.patch.object(batch_service.portfolio_service, "generate_and_publish", self._generate_and_publish),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        config.EXECUTION_MODE = self._saved_mode
+
+    async def _scrape(self, reference_url: str) -> ScrapedContext:
+        self.scraped_urls.append(reference_url)
+        await asyncio.sleep(0)
+        if "broken" in reference_url:
+            raise HTTPException(status_code=502, detail=f"Could not scrape {reference_url}")
+        return ScrapedContext(desktop_screenshot_base64="", mobile_screenshot_base64="", simplified_html="<main></main>")
+
+    async def _parse_resume(self, resume_text: str) -> dict:
+        if "unparseable" in resume_text:
+            raise ValueError("bad resume")
+        return {"name": resume_text.splitlines()[0]}
+
+    async def _generate_and_publish(self, scraped_context, resume_json, filename_suffix=""):
+        self.generation_started.set()
+        if filename_suffix in self.block_suffixes:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled_generations.append(filename_suffix)
+                raise
+        return ClonedHtmlFileResponse(message="ok", file_path=f"portfolio{filename_suffix}.html", view_link=f"https://cdn/portfolio{filename_suffix}.html")
+
+    async def _collect(self, items):
+        return sorted([result async for result in batch_service.run_batch(items)], key=lambda r: r.index)
+
+    async def test_one_scrape_per_normalized_reference_url(self):
+        items = [_item(url) for url in (
+            "https://a.com", "https://a.com/", "HTTPS://A.COM",
+            "https://b.com/page", "https://b.com/page/", "https://b.com/page",
+        )]
+        results = await self._collect(items)
+        self.assertEqual(len(self.scraped_urls), 2)
+        self.assertEqual(sorted(self.scraped_urls), ["https://a.com", "https://b.com/page"])
+        self.assertEqual([r.status for r in results], ["ok"] * 6)
+        self.assertEqual([r.file_path for r in results], [f"portfolio_{i}.html" for i in range(6)])
+
+    async def test_item_errors_are_isolated(self):
+        items = [
+            _item("https://a.com"),
+            _item("https://broken.com"),
+            _item("https://a.com", resume_text="unparseable"),
+            _item("https://broken.com/"),
+            _item("https://a.com/"),
+        ]
+        results = await self._collect(items)
+        self.assertEqual([r.status for r in results], ["ok", "error", "error", "error", "ok"])
+        self.assertEqual(results[1].status_code, 502)
+        self.assertEqual(results[3].status_code, 502)
+        self.assertEqual(results[2].status_code, 500)
+        self.assertEqual(self.scraped_urls.count("https://broken.com"), 1)
+
+    async def test_client_disconnect_cancels_remaining_items(self):
+        self.block_suffixes = {"_1", "_2"}
+        results = batch_service.run_batch([_item("https://a.com"), _item("https://a.com"), _item("https://b.com")])
+        first = await results.__anext__()
+        self.assertEqual(first.index, 0)
+        await results.aclose() # What StreamingResponse does when the client goes away
+        await asyncio.sleep(0)
+        self.assertEqual(sorted(self.cancelled_generations), ["_1", "_2"])
+
+    async def test_queue_mode_runs_items_as_jobs(self):
+        config.EXECUTION_MODE = "queue"
+        jobs = []
+        async def submit_and_wait(kind, payload):
+            jobs.append((kind, payload))
+            if kind == "scrape_reference":
+                return {"reference_url": payload["reference_url"]}
+            return {"message": "ok", "file_path": f"job{payload['filename_suffix']}.html", "view_link": "https://cdn/job.html"}
+        with mock.patch.object(batch_service.worker_service, "submit_and_wait", submit_and_wait):
+            results = await self._collect([_item("https://a.com"), _item("https://a.com/"), _item("https://b.com")])
+        self.assertEqual(self.scraped_urls, [])
+        self.assertEqual(sorted(p["reference_url"] for kind, p in jobs if kind == "scrape_reference"), ["https://a.com", "https://b.com"])
+        self.assertEqual(sorted(p["filename_suffix"] for kind, p in jobs if kind == "build_portfolio"), ["_0", "_1", "_2"])
+        # Every item's build job is enqueued after its reference's scrape job finished.
+        self.assertEqual([kind for kind, _ in jobs[:2]], ["scrape_reference"] * 2)
+        self.assertEqual([r.file_path for r in results], ["job_0.html", "job_1.html", "job_2.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# backend/tests/test_change_detection_service.py
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from app.core import config
+from app.services import change_detection_service
+
+_PAGE = "<main>" + "".join(f"<section><h2>Part {i}</h2><p>Text <a href='#'>link</a></p></section>" for i in range(20)) + "</main>"
+
+
+def _flip_bits(hex_hash: str, count: int) -> str:
+    return f"{int(hex_hash, 16) ^ ((1 << count) - 1):016x}"
+
+
+def _fingerprint(structure: str | None = "0" * 16, desktop: dict | None = None, mobile: dict | None = None) -> dict:
+    return {"desktop": desktop, "mobile": mobile, "structure": structure}
+
+
+def _record_in_process(index_path: str, worker: int, count: int) -> None:
+    config.CHANGE_INDEX_PATH = index_path
+    for i in range(count):
+        asyncio.run(change_detection_service.record(
+            f"https://site{worker}-{i}.example.com", _fingerprint(), f"clone{worker}-{i}.html", f"/tmp/clone{worker}-{i}.html"
+        ))
+
+
+class StructureHashTest(unittest.TestCase):
+
+    def test_empty_html_has_no_hash(self):
+        self.assertIsNone(change_detection_service.structure_hash(""))
+        self.assertIsNone(change_detection_service.structure_hash(None))
+
+    def test_text_changes_do_not_change_the_hash(self):
+        edited = _PAGE.replace("Part 3", "Chapter three").replace("Text", "Other words")
+        self.assertEqual(change_detection_service.structure_hash(_PAGE), change_detection_service.structure_hash(edited))
+
+    def test_small_structure_change_stays_within_threshold(self):
+        edited = _PAGE.replace("<p>Text <a href='#'>link</a></p></section>", "<p>Text <a href='#'>link</a></p><span>new</span></section>", 1)
+        diff = change_detection_service.difference(
+            _fingerprint(change_detection_service.structure_hash(_PAGE)),
+            _fingerprint(change_detection_service.structure_hash(edited)),
+        )
+        self.assertGreater(diff, 0)
+        self.assertLessEqual(diff, config.CHANGE_DETECTION_THRESHOLD)
+
+    def test_unrelated_structure_exceeds_threshold(self):
+        other = "<div>" + "<ul><li><img src='x'></li><li><button>Go</button></li></ul>" * 15 + "</div>"
+        diff = change_detection_service.difference(
+            _fingerprint(change_detection_service.structure_hash(_PAGE)),
+            _fingerprint(change_detection_service.structure_hash(other)),
+        )
+        self.assertGreater(diff, config.CHANGE_DETECTION_THRESHOLD)
+
+
+class DifferenceTest(unittest.TestCase):
+
+    def test_structure_bits_at_threshold(self):
+        base = "0123456789abcdef"
+        at_threshold = int(config.CHANGE_DETECTION_THRESHOLD * 64) # Most differing bits still reused
+        self.assertEqual(change_detection_service.difference(_fingerprint(base), _fingerprint(base)), 0.0)
+        self.assertLessEqual(change_detection_service.difference(_fingerprint(base), _fingerprint(_flip_bits(base, at_threshold))),
+                             config.CHANGE_DETECTION_THRESHOLD)
+        self.assertGreater(change_detection_service.difference(_fingerprint(base), _fingerprint(_flip_bits(base, at_threshold + 1))),
+                           config.CHANGE_DETECTION_THRESHOLD)
+
+    def test_largest_part_wins(self):
+        bands = {"method": "dhash", "bands": ["0" * 16] * 4}
+        changed_band = {"method": "dhash", "bands": ["0" * 16] * 3 + ["f" * 16]}
+        diff = change_detection_service.difference(_fingerprint(desktop=bands, mobile=bands), _fingerprint(desktop=bands, mobile=changed_band))
+        self.assertEqual(diff, 0.25)
+
+    def test_extra_bands_count_as_fully_different(self):
+        short = {"method": "dhash", "bands": ["0" * 16] * 10}
+        longer = {"method": "dhash", "bands": ["0" * 16] * 11}
+        self.assertAlmostEqual(change_detection_service.difference(_fingerprint(desktop=short), _fingerprint(desktop=longer)), 1 / 11)
+
+    def test_exact_hashes_match_or_not(self):
+        exact = {"method": "exact", "sha256": "a" * 64}
+        self.assertEqual(change_detection_service.difference(_fingerprint(desktop=exact), _fingerprint(desktop=dict(exact))), 0.0)
+        self.assertEqual(change_detection_service.difference(_fingerprint(desktop=exact), _fingerprint(desktop={**exact, "sha256": "b" * 64})), 1.0)
+
+    def test_incomparable_fingerprints_are_unrelated(self):
+        exact = {"method": "exact", "sha256": "a" * 64}
+        dhash = {"method": "dhash", "bands": ["0" * 16]}
+        self.assertEqual(change_detection_service.difference(_fingerprint(desktop=exact), _fingerprint(desktop=dhash)), 1.0)
+        self.assertEqual(change_detection_service.difference(_fingerprint(desktop=exact), _fingerprint()), 1.0)
+        self.assertEqual(change_detection_service.difference(_fingerprint(), _fingerprint(structure=None)), 1.0)
+        self.assertEqual(change_detection_service.difference(_fingerprint(structure=None), _fingerprint(structure=None)), 1.0)
+
+
+class RecordTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.index_path = os.path.join(tmp_dir.name, "change_index", "clones.json")
+        patch = mock.patch.object(config, "CHANGE_INDEX_PATH", self.index_path)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def test_lookup_returns_recorded_clone(self):
+        await change_detection_service.record("https://Example.com", _fingerprint(), "a.html", "/tmp/a.html")
+        entry = await change_detection_service.lookup("https://example.com/")
+        self.assertEqual((entry["filename"], entry["fingerprint"]), ("a.html", _fingerprint()))
+        self.assertIsNone(await change_detection_service.lookup("https://other.com"))
+
+    async def test_concurrent_records_are_all_kept(self):
+        await asyncio.gather(*(change_detection_service.record(f"https://site{i}.com", _fingerprint(), f"{i}.html", f"/tmp/{i}.html")
+                               for i in range(20)))
+        with open(self.index_path, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 20)
+
+    def test_records_from_several_processes_are_all_kept(self):
+        with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for future in [pool.submit(_record_in_process, self.index_path, worker, 10) for worker in range(4)]:
+                future.result()
+        with open(self.index_path, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# backend/tests/test_coalescing_service.py
+import asyncio
+import unittest
+
+from app.models.pydantic_models import UrlRequest
+from app.services.coalescing_service import RequestCoalescer, url_request_key
+
+
+class RequestCoalescerTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.coalescer = RequestCoalescer("test", ttl_seconds=60, max_cached_results=10)
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def _pipeline(self):
+        self.calls += 1
+        await self.release.wait()
+        return f"result-{self.calls}"
+
+    async def test_concurrent_callers_share_one_execution(self):
+        waiters = [asyncio.create_task(self.coalescer.run("key", self._pipeline)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*waiters), ["result-1"] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.coalescer.snapshot()["executed"], 1)
+        self.assertEqual(self.coalescer.snapshot()["coalesced"], 4)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_task(self):
+        first = asyncio.create_task(self.coalescer.run("key", self._pipeline))
+        second = asyncio.create_task(self.coalescer.run("key", self._pipeline))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertTrue(first.cancelled())
+        self.release.set()
+        self.assertEqual(await second, "result-1")
+        self.assertEqual(self.calls, 1)
+
+    async def test_results_expire_after_ttl(self):
+        self.coalescer.ttl_seconds = 0.05
+        self.release.set()
+        self.assertEqual(await self.coalescer.run("key", self._pipeline), "result-1")
+        self.assertEqual(await self.coalescer.run("key", self._pipeline), "result-1")
+        self.assertEqual(self.coalescer.snapshot()["cache_hits"], 1)
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self.coalescer.run("key", self._pipeline), "result-2")
+
+    async def test_failures_are_not_cached(self):
+        async def failing():
+            self.calls += 1
+            raise RuntimeError("boom")
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                await self.coalescer.run("key", failing)
+        self.assertEqual(self.calls, 2)
+
+
+class UrlRequestKeyTest(unittest.TestCase):
+
+    def test_force_regenerate_changes_key(self):
+        req = UrlRequest(url="https://example.com/")
+        self.assertNotEqual(url_request_key(req), url_request_key(req, force_regenerate=True))
+
+    def test_equivalent_urls_share_key(self):
+        self.assertEqual(url_request_key(UrlRequest(url="https://Example.com/")), url_request_key(UrlRequest(url="https://example.com")))
+
+
+if __name__ == "__main__":
+    unittest.main()
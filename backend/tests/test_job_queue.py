@@ -0,0 +1,202 @@
+# backend/tests/test_job_queue.py
+# Lease, heartbeat, retry and dead-letter behavior, run against both queue backends.
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.services import worker_service
+from app.services.job_queue import InMemoryJobQueue, SQLiteJobQueue
+
+
+class _JobQueueContract:
+    """Mixed into one TestCase per backend; `make_queue` builds a fresh, empty queue."""
+
+    def make_queue(self):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.queue = self.make_queue()
+
+    async def test_lease_claims_each_job_once(self):
+        job = await self.queue.enqueue("build_portfolio", {"n": 1})
+        leased = await self.queue.lease("w1", lease_seconds=60)
+        self.assertEqual((leased.id, leased.status, leased.worker_id, leased.attempts), (job.id, "running", "w1", 1))
+        self.assertIsNone(await self.queue.lease("w2", lease_seconds=60))
+
+    async def test_expired_lease_is_leased_again(self):
+        job = await self.queue.enqueue("build_portfolio", {})
+        await self.queue.lease("w1", lease_seconds=0.01)
+        await asyncio.sleep(0.05)
+        leased = await self.queue.lease("w2", lease_seconds=60)
+        self.assertEqual((leased.id, leased.worker_id, leased.attempts), (job.id, "w2", 2))
+        # The first worker no longer owns the job and can't report on it.
+        self.assertFalse(await self.queue.heartbeat(job.id, "w1", 60))
+        self.assertFalse(await self.queue.complete(job.id, "w1", {"from": "w1"}))
+        self.assertTrue(await self.queue.complete(job.id, "w2", {"from": "w2"}))
+        self.assertEqual((await self.queue.get(job.id)).result, {"from": "w2"})
+
+    async def test_heartbeat_extends_lease(self):
+        job = await self.queue.enqueue("build_portfolio", {})
+        await self.queue.lease("w1", lease_seconds=0.05)
+        self.assertTrue(await self.queue.heartbeat(job.id, "w1", 60))
+        await asyncio.sleep(0.1)
+        self.assertIsNone(await self.queue.lease("w2", lease_seconds=60))
+
+    async def test_retryable_failure_is_requeued(self):
+        job = await self.queue.enqueue("build_portfolio", {}, max_attempts=3)
+        await self.queue.lease("w1", lease_seconds=60)
+        self.assertTrue(await self.queue.fail(job.id, "w1", "upstream error", 502, retry_delay=0.05))
+        self.assertEqual((await self.queue.get(job.id)).status, "queued")
+        self.assertIsNone(await self.queue.lease("w1", lease_seconds=60)) # Still backing off
+        await asyncio.sleep(0.1)
+        self.assertEqual((await self.queue.lease("w1", lease_seconds=60)).attempts, 2)
+
+    async def test_failure_without_retry_is_terminal(self):
+        job = await self.queue.enqueue("build_portfolio", {})
+        await self.queue.lease("w1", lease_seconds=60)
+        await self.queue.fail(job.id, "w1", "bad request", 400)
+        failed = await self.queue.get(job.id)
+        self.assertEqual((failed.status, failed.status_code, failed.error), ("failed", 400, "bad request"))
+        self.assertIsNone(await self.queue.lease("w1", lease_seconds=60))
+
+    async def test_retries_stop_after_max_attempts(self):
+        job = await self.queue.enqueue("build_portfolio", {}, max_attempts=2)
+        for _ in range(2):
+            await self.queue.lease("w1", lease_seconds=60)
+            await self.queue.fail(job.id, "w1", "upstream error", 502, retry_delay=0)
+        failed = await self.queue.get(job.id)
+        self.assertEqual((failed.status, failed.attempts, failed.status_code), ("failed", 2, 502))
+        self.assertIsNone(await self.queue.lease("w1", lease_seconds=60))
+
+    async def test_lease_expiring_on_final_attempt_fails_job(self):
+        job = await self.queue.enqueue("build_portfolio", {}, max_attempts=1)
+        await self.queue.lease("w1", lease_seconds=0.01)
+        await asyncio.sleep(0.05)
+        self.assertIsNone(await self.queue.lease("w2", lease_seconds=60))
+        failed = await self.queue.get(job.id)
+        self.assertEqual((failed.status, failed.status_code), ("failed", 500))
+        self.assertIsNone(failed.worker_id)
+
+    async def test_stats_count_jobs_per_status(self):
+        await self.queue.enqueue("build_portfolio", {})
+        await self.queue.enqueue("build_portfolio", {})
+        await self.queue.lease("w1", lease_seconds=60)
+        await self.queue.record_worker_heartbeat("w1", {"running": 1})
+        stats = await self.queue.stats_async()
+        self.assertEqual(stats["jobs"], {"queued": 1, "running": 1})
+        self.assertEqual(stats["live_workers"], {"w1": {"running": 1}})
+
+
+class InMemoryJobQueueTest(_JobQueueContract, unittest.IsolatedAsyncioTestCase):
+
+    def make_queue(self):
+        return InMemoryJobQueue()
+
+
+class SQLiteJobQueueTest(_JobQueueContract, unittest.IsolatedAsyncioTestCase):
+
+    def make_queue(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return SQLiteJobQueue(os.path.join(tmp_dir.name, "jobs.sqlite3"))
+
+
+class WorkerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.queue = InMemoryJobQueue()
+        self.worker = worker_service.Worker(self.queue, concurrency=2, worker_id="w1")
+        self.release = asyncio.Event()
+        self.cancelled = []
+        handlers = {"blocking": self._blocking, "flaky": self._flaky}
+        patch = mock.patch.dict(worker_service.JOB_HANDLERS, handlers)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def _blocking(self, payload):
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(payload["n"])
+            raise
+        return {"n": payload["n"]}
+
+    async def _flaky(self, payload):
+        raise HTTPException(status_code=503, detail="try again")
+
+    async def test_lost_lease_drops_result(self):
+        job = await self.queue.enqueue("blocking", {"n": 1})
+        leased = await self.queue.lease("w1", lease_seconds=60)
+        with mock.patch.object(worker_service.config, "WORKER_HEARTBEAT_SECONDS", 0.01), \
+             mock.patch.object(self.queue, "heartbeat", mock.AsyncMock(return_value=False)):
+            await self.worker._process(leased)
+        self.assertEqual(self.cancelled, [1])
+        self.assertEqual(self.worker.lost_leases, 1)
+        self.assertEqual(self.worker.completed, 0)
+        self.assertEqual((await self.queue.get(job.id)).status, "running")
+
+    async def test_result_after_lease_moved_is_dropped(self):
+        job = await self.queue.enqueue("blocking", {"n": 1})
+        leased = await self.queue.lease("w1", lease_seconds=0.01)
+        await asyncio.sleep(0.05)
+        await self.queue.lease("w2", lease_seconds=60)
+        self.release.set()
+        await self.worker._process(leased)
+        self.assertEqual(self.worker.lost_leases, 1)
+        self.assertEqual((await self.queue.get(job.id)).worker_id, "w2")
+
+    async def test_retryable_failure_is_requeued_with_backoff(self):
+        job = await self.queue.enqueue("flaky", {})
+        with mock.patch.object(worker_service.config, "JOB_RETRY_BASE_DELAY_SECONDS", 60):
+            await self.worker._process(await self.queue.lease("w1", lease_seconds=60))
+        requeued = await self.queue.get(job.id)
+        self.assertEqual((requeued.status, requeued.status_code), ("queued", 503))
+        self.assertGreater(requeued.available_at, requeued.updated_at + 59)
+
+    async def test_stop_waits_for_cancelled_jobs(self):
+        for n in range(2):
+            await self.queue.enqueue("blocking", {"n": n})
+        stop = asyncio.Event()
+        with mock.patch.object(worker_service.config, "JOB_POLL_INTERVAL_SECONDS", 0.01):
+            run = asyncio.create_task(self.worker.run(stop))
+            while len(self.worker.running) < 2:
+                await asyncio.sleep(0.01)
+            stop.set()
+            await run
+        self.assertEqual(sorted(self.cancelled), [0, 1])
+
+
+class RunInPoolTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cancelled_running_call_is_counted_as_orphaned(self):
+        started, finish = threading.Event(), threading.Event()
+        def run_in_child(func, *args):
+            started.set()
+            finish.wait(5)
+            return ("ok", func.__name__)
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        saved = dict(worker_service._orphaned_pool_calls)
+        self.addCleanup(worker_service._orphaned_pool_calls.update, saved)
+        with mock.patch.dict(worker_service._pools, {"llm": pool}), \
+             mock.patch.object(worker_service, "_run_in_child", run_in_child):
+            call = asyncio.create_task(worker_service._run_in_pool("llm", self.test_cancelled_running_call_is_counted_as_orphaned))
+            await asyncio.to_thread(started.wait, 5)
+            call.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await call
+            self.assertEqual(worker_service._orphaned_pool_calls["total"], saved["total"] + 1)
+            self.assertEqual(worker_service._orphaned_pool_calls["running"], saved["running"] + 1)
+            finish.set()
+            await asyncio.to_thread(pool.shutdown)
+        self.assertEqual(worker_service._orphaned_pool_calls["running"], saved["running"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# backend/tests/test_layout_extractor.py
+import unittest
+from unittest import mock
+
+from app.core import config
+from app.services import layout_extractor
+
+_LAYOUT = {
+    "title": "Acme & Co",
+    "lang": "en",
+    "viewport": {"width": 1280, "height": 800},
+    "document_height": 2400,
+    "fonts": ["Inter"],
+    "node_count": 6,
+    "truncated": True,
+    "root": {"t": "body", "b": [0, 0, 1280, 2400], "s": {"background-color": "rgb(255, 255, 255)"}, "c": [
+        {"t": "h1", "b": [40, 40, 600, 48], "s": {"font-size": "40px"}, "c": ["Hello <world>"]},
+        {"t": "img", "a": {"src": "/logo.png", "alt": "Logo"}, "b": [40, 100, 64, 64]},
+        {"svg": '<svg width="16" height="16"></svg>'},
+        {"t": "div", "b": [0, 200, 1280, 400], "c": [
+            {"t": "div", "b": [0, 200, 1280, 400], "c": [
+                {"t": "p", "b": [40, 210, 600, 20], "c": ["Deep", {"t": "strong", "b": [80, 210, 40, 20], "c": ["text"]}]},
+            ]},
+        ]},
+    ]},
+}
+
+
+class RenderLayoutTreeTest(unittest.TestCase):
+
+    def test_output_format(self):
+        rendered = layout_extractor.render_layout_tree(_LAYOUT).split("\n")
+        self.assertEqual(rendered[:4], ["<!DOCTYPE html>", '<html lang="en">', "<head>", " <title>Acme &amp; Co</title>"])
+        self.assertEqual(rendered[4], " <!-- Rendered layout at 1280x800, document height 2400px, 6 visible elements (truncated). "
+                                      "Loaded fonts: Inter. data-box = x,y,width,height -->")
+        self.assertEqual(rendered[6:10], [
+            '<body style="background-color: rgb(255, 255, 255)" data-box="0,0,1280,2400">',
+            ' <h1 style="font-size: 40px" data-box="40,40,600,48">Hello &lt;world&gt;</h1>',
+            ' <img src="/logo.png" alt="Logo" data-box="40,100,64,64">',
+            ' <svg width="16" height="16"></svg>',
+        ])
+        self.assertIn('   <p data-box="40,210,600,20">', rendered)
+        self.assertIn('    <strong data-box="80,210,40,20">text</strong>', rendered)
+        self.assertEqual(rendered[-2:], ["</body>", "</html>"])
+
+    def test_deep_nesting_is_flattened_to_text(self):
+        with mock.patch.object(config, "LAYOUT_MAX_RENDER_DEPTH", 2):
+            rendered = layout_extractor.render_layout_tree(_LAYOUT).split("\n")
+        self.assertIn('  <div data-box="0,200,1280,400">Deep text</div>', rendered)
+        self.assertFalse(any("<p " in line or "<strong" in line for line in rendered))
+        self.assertEqual(max(len(line) - len(line.lstrip(" ")) for line in rendered), 2)
+
+    def test_empty_layout(self):
+        self.assertEqual(layout_extractor.render_layout_tree({"root": None}), "<!-- Layout extraction returned no visible content -->")
+
+
+if __name__ == "__main__":
+    unittest.main()
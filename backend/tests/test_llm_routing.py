@@ -0,0 +1,86 @@
+# backend/tests/test_llm_routing.py
+# Model tier routing and hedging, run against the fake model (no Vertex AI SDK needed).
+import asyncio
+import unittest
+
+from app.core import config
+from app.services import fake_llm, llm_service
+
+_PATCHED = ("LLM_FAKE_MODEL", "MODEL_ROUTING_ENABLED", "HEDGE_ENABLED", "HEDGE_AFTER_SECONDS")
+
+
+def _features(html_chars=1_000, screenshot_height=2_000, resume_chars=0) -> dict:
+    return {"html_chars": html_chars, "screenshot_height": screenshot_height, "resume_chars": resume_chars}
+
+
+class ChooseModelTierTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = {name: getattr(config, name) for name in _PATCHED}
+        config.MODEL_ROUTING_ENABLED = True
+
+    def tearDown(self):
+        for name, value in self._saved.items():
+            setattr(config, name, value)
+
+    def test_small_page_goes_to_fast_tier(self):
+        self.assertEqual(llm_service.choose_model_tier(_features()), ("fast", "simple_page"))
+
+    def test_large_inputs_go_to_pro_tier(self):
+        self.assertEqual(llm_service.choose_model_tier(_features(html_chars=config.ROUTE_FAST_MAX_HTML_CHARS + 1)), ("pro", "large_html"))
+        self.assertEqual(llm_service.choose_model_tier(_features(screenshot_height=config.ROUTE_FAST_MAX_SCREENSHOT_HEIGHT + 1)), ("pro", "tall_page"))
+        self.assertEqual(llm_service.choose_model_tier(_features(resume_chars=config.ROUTE_FAST_MAX_RESUME_CHARS + 1)), ("pro", "large_resume"))
+
+    def test_routing_disabled_uses_pro(self):
+        config.MODEL_ROUTING_ENABLED = False
+        self.assertEqual(llm_service.choose_model_tier(_features()), ("pro", "routing_disabled"))
+
+
+class HedgedGenerationTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self._saved = {name: getattr(config, name) for name in _PATCHED}
+        self._saved_stats = llm_service.routing_stats
+        config.LLM_FAKE_MODEL = True
+        config.MODEL_ROUTING_ENABLED = True
+        config.HEDGE_ENABLED = True
+        config.HEDGE_AFTER_SECONDS = 0.05
+        llm_service.routing_stats = llm_service.RoutingStats()
+
+    def tearDown(self):
+        for name, value in self._saved.items():
+            setattr(config, name, value)
+        llm_service.routing_stats = self._saved_stats
+        fake_llm._latency_samplers.clear()
+
+    async def _generate(self) -> str:
+        # Long enough HTML to be routed to pro, so the hedge applies.
+        cleaned_html = "<div>" + "x" * config.ROUTE_FAST_MAX_HTML_CHARS + "</div>"
+        return await llm_service.generate_html_with_llm(cleaned_html, "", "")
+
+    async def test_fast_primary_wins_without_hedge(self):
+        fake_llm.set_latency_sampler(config.MODEL_TIERS["pro"], lambda: 0.0)
+        html = await self._generate()
+        self.assertIn(config.MODEL_TIERS["pro"], html)
+        stats = llm_service.routing_stats.snapshot()
+        self.assertEqual(stats["hedges_fired"], 0)
+        self.assertEqual(stats["winners"], {"pro:primary": 1})
+
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        fake_llm.set_latency_sampler(config.MODEL_TIERS["pro"], lambda: 5.0)
+        fake_llm.set_latency_sampler(config.MODEL_TIERS["fast"], lambda: 0.0)
+        html = await self._generate()
+        await asyncio.sleep(0.01) # The cancelled primary records its call once the cancellation is delivered
+        self.assertIn(config.MODEL_TIERS["fast"], html)
+        stats = llm_service.routing_stats.snapshot()
+        self.assertEqual(stats["hedges_fired"], 1)
+        self.assertEqual(stats["winners"], {"fast:hedge": 1})
+        pro = stats["tiers"]["pro"]
+        self.assertEqual(pro["cancelled"], 1)
+        # The cancelled primary's prompt tokens are still counted towards its cost.
+        self.assertGreater(pro["input_tokens"], config.ROUTE_FAST_MAX_HTML_CHARS // 4)
+        self.assertGreater(pro["estimated_cost_usd"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
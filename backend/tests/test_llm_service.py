@@ -0,0 +1,22 @@
+# backend/tests/test_llm_service.py
+# Run from backend/: python -m unittest discover tests
+import unittest
+
+from app.services import llm_service
+
+
+class ValidateHtmlStructureTest(unittest.TestCase):
+
+    def test_complete_document(self):
+        html = "<!DOCTYPE html><html><head><title>x</title></head><body><ul><li>a<li>b</ul><p>x</body></html>"
+        self.assertEqual(llm_service.validate_html_structure(html), [])
+
+    def test_truncated_document_closed_by_html_end_tag(self):
+        # A half-finished page the STOP shortcut completes with "</html>" must not validate.
+        html = '<!DOCTYPE html><html><head></head><body><main><section><div class="card"><p>Half a page</html>'
+        problems = llm_service.validate_html_structure(html)
+        self.assertEqual(problems, ["unclosed tags: main, section, div"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# backend/tests/test_profiling_service.py
+import importlib
+import unittest
+import warnings
+from unittest import mock
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.core import config
+from app.services import profiling_service
+
+
+def _request(headers: dict | None = None, query: str = "") -> Request:
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers, "query_string": query.encode()})
+
+
+class RequireAdminTest(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+
+        @app.get("/profiles", dependencies=[Depends(profiling_service.require_admin)])
+        async def profiles():
+            return {"profiles": []}
+
+        self.client = TestClient(app)
+
+    def test_no_token_configured_hides_endpoint(self):
+        with mock.patch.object(config, "PROFILING_ADMIN_TOKEN", ""):
+            self.assertEqual(self.client.get("/profiles").status_code, 404)
+            self.assertEqual(self.client.get("/profiles", headers={"X-Admin-Token": ""}).status_code, 404)
+
+    def test_missing_or_wrong_token_is_forbidden(self):
+        with mock.patch.object(config, "PROFILING_ADMIN_TOKEN", "s3cret"):
+            self.assertEqual(self.client.get("/profiles").status_code, 403)
+            self.assertEqual(self.client.get("/profiles", headers={"X-Admin-Token": "wrong"}).status_code, 403)
+
+    def test_valid_token_is_allowed(self):
+        with mock.patch.object(config, "PROFILING_ADMIN_TOKEN", "s3cret"):
+            self.assertEqual(self.client.get("/profiles", headers={"X-Admin-Token": "s3cret"}).status_code, 200)
+
+
+class ProfileRequestedTest(unittest.TestCase):
+
+    def setUp(self):
+        patches = [mock.patch.object(config, "PROFILING_ENABLED", True), mock.patch.object(config, "PROFILING_ADMIN_TOKEN", "s3cret")]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_admin_opt_in_by_header_or_query(self):
+        self.assertTrue(profiling_service._profile_requested(_request({"X-Profile": "1", "X-Admin-Token": "s3cret"})))
+        self.assertTrue(profiling_service._profile_requested(_request({"X-Profile": "true", "X-Admin-Token": "s3cret"})))
+        self.assertTrue(profiling_service._profile_requested(_request({"X-Admin-Token": "s3cret"}, query="profile=1")))
+
+    def test_not_requested(self):
+        self.assertFalse(profiling_service._profile_requested(_request({"X-Admin-Token": "s3cret"})))
+        self.assertFalse(profiling_service._profile_requested(_request({"X-Profile": "0", "X-Admin-Token": "s3cret"})))
+
+    def test_requires_admin_token(self):
+        self.assertFalse(profiling_service._profile_requested(_request({"X-Profile": "1"})))
+        self.assertFalse(profiling_service._profile_requested(_request({"X-Profile": "1", "X-Admin-Token": "wrong"})))
+
+    def test_requires_profiling_enabled(self):
+        with mock.patch.object(config, "PROFILING_ENABLED", False):
+            self.assertFalse(profiling_service._profile_requested(_request({"X-Profile": "1", "X-Admin-Token": "s3cret"})))
+
+
+class ProfilingMiddlewareTest(unittest.TestCase):
+
+    def _middleware_installed(self) -> bool:
+        import app.main
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning) # on_event
+            main = importlib.reload(app.main)
+        return any(m.cls is BaseHTTPMiddleware for m in main.app.user_middleware)
+
+    def test_installed_only_when_request_profiling_is_enabled(self):
+        with mock.patch.object(config, "PROFILING_ENABLED", False), mock.patch.object(config, "SLOW_REQUEST_SAMPLER_ENABLED", False):
+            self.assertFalse(self._middleware_installed())
+        with mock.patch.object(config, "PROFILING_ENABLED", False), mock.patch.object(config, "SLOW_REQUEST_SAMPLER_ENABLED", True):
+            self.assertTrue(self._middleware_installed())
+        with mock.patch.object(config, "PROFILING_ENABLED", True), mock.patch.object(config, "SLOW_REQUEST_SAMPLER_ENABLED", False):
+            self.assertTrue(self._middleware_installed())
+
+
+if __name__ == "__main__":
+    unittest.main()
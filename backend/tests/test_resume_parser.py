@@ -0,0 +1,95 @@
+# backend/tests/test_resume_parser.py
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.core import config
+from app.services import llm_service, resume_parser
+
+_RESUME = """Jane Doe
+jane@example.com | https://jane.dev
+Software Engineer
+
+Experience
+{experience}
+- Built the billing platform
+
+Skills
+Python, Go
+
+Education
+MIT, BS Computer Science, 2016
+
+Projects
+{projects}
+"""
+
+
+def _parse(experience="Senior Engineer | Acme Corp | 2020 - Present", projects="Widget - a widget"):
+    return resume_parser.parse_resume_locally(_RESUME.format(experience=experience, projects=projects))
+
+
+class ParseResumeLocallyTest(unittest.TestCase):
+
+    def test_company_before_role(self):
+        resume, confidence, _fields = _parse(experience="Acme Corp | Senior Engineer | 2020 - Present")
+        self.assertEqual(resume["experience"][0]["role"], "Senior Engineer")
+        self.assertEqual(resume["experience"][0]["company"], "Acme Corp")
+        self.assertGreaterEqual(confidence, 0.75)
+
+    def test_ambiguous_role_company_order_lowers_confidence(self):
+        _resume, confidence, fields = _parse(experience="Zorblax | Quux | 2020 - Present")
+        self.assertLess(confidence, 0.75)
+        self.assertIn("experience", fields)
+
+    def test_project_link_in_bullet(self):
+        resume, _confidence, _fields = _parse(projects="- https://foo.com")
+        self.assertEqual(resume["projects"][0]["link"], "https://foo.com")
+
+    def test_project_links_stay_out_of_contact_info(self):
+        resume, _confidence, _fields = _parse(projects="Widget (https://widget.io)\n- Live demo (https://demo.io)")
+        self.assertEqual(resume["contact_info"]["portfolio"], "https://jane.dev")
+        self.assertEqual(resume["projects"][0]["name"], "Widget")
+        self.assertEqual(resume["projects"][0]["description"], "Live demo")
+        self.assertEqual(resume["projects"][0]["link"], "https://widget.io")
+
+    def test_pasted_json_with_string_skills(self):
+        resume, _confidence, _fields = resume_parser.parse_resume_locally('{"name": "A", "skills": "Python, Go"}')
+        self.assertEqual(resume["skills"], ["Python", "Go"])
+
+    def test_title_words_are_not_company_hints(self):
+        for header in ("Software Engineer | Google | 2020 - Present", "Google | Software Engineer | 2020 - Present",
+                       "Systems Analyst at Initech, 2019 - 2021"):
+            resume, _confidence, fields = _parse(experience=header)
+            entry = resume["experience"][0]
+            self.assertIn(entry["role"], ("Software Engineer", "Systems Analyst"), header)
+            self.assertIn(entry["company"], ("Google", "Initech"), header)
+            self.assertNotIn("experience", fields, header)
+
+    def test_sections_without_heading_are_not_required(self):
+        resume, _confidence, fields = resume_parser.parse_resume_locally(_RESUME.split("\nProjects")[0])
+        self.assertEqual(resume["projects"], [])
+        self.assertNotIn("projects", fields)
+        _resume, _confidence, fields = _parse(projects="")
+        self.assertIn("projects", fields)
+
+
+class ParseResumeToJsonTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_failed_llm_fill_returns_local_parse(self):
+        resume_text = _RESUME.format(experience="Zorblax | Quux | 2020 - Present", projects="Widget - a widget")
+        local_json, confidence, fields = resume_parser.parse_resume_locally(resume_text)
+        self.assertTrue(config.RESUME_LOCAL_LOW_CONFIDENCE <= confidence < config.RESUME_LOCAL_HIGH_CONFIDENCE)
+        self.assertEqual(fields, ["experience"])
+        failing_llm = mock.AsyncMock(side_effect=HTTPException(status_code=500, detail="Vertex AI not initialized"))
+        fallbacks = llm_service.resume_parse_stats.fill_fallbacks
+        with mock.patch.object(config, "RESUME_LOCAL_PARSE_ENABLED", True), \
+             mock.patch.object(llm_service, "_parse_resume_with_llm", failing_llm):
+            self.assertEqual(await llm_service.parse_resume_to_json(resume_text), local_json)
+        failing_llm.assert_awaited_once()
+        self.assertEqual(llm_service.resume_parse_stats.fill_fallbacks, fallbacks + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# backend/tests/test_scrape_cache_service.py
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app.models.pydantic_models import ScrapedContext
+from app.services import scrape_cache_service
+from app.services.scrape_cache_service import ScrapeCache
+
+
+def _context(html: str = "<main></main>") -> ScrapedContext:
+    return ScrapedContext(desktop_screenshot_base64="ZGVza3RvcA==", mobile_screenshot_base64="bW9iaWxl", simplified_html=html)
+
+
+class ScrapeCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache = ScrapeCache(tmp_dir.name, ttl_seconds=3600, max_memory_entries=0, max_disk_entries=2, max_disk_bytes=10**9)
+
+    def _atime(self, url: str) -> float:
+        return os.stat(self.cache._path(url)).st_atime
+
+    async def test_scraped_at_does_not_mark_entry_used(self):
+        await self.cache.put("https://a.com", _context())
+        path = self.cache._path("https://a.com/")
+        os.utime(path, (1_000, os.stat(path).st_mtime))
+        with mock.patch.object(self.cache, "_read_disk", side_effect=AssertionError("entry was read")):
+            scraped_at = await self.cache.scraped_at("https://a.com")
+        self.assertAlmostEqual(scraped_at, os.stat(path).st_mtime, places=3)
+        self.assertEqual(self._atime("https://a.com/"), 1_000)
+
+    async def test_disk_hit_marks_entry_used_and_keeps_scrape_time(self):
+        await self.cache.put("https://a.com", _context())
+        scraped_at = await self.cache.scraped_at("https://a.com")
+        path = self.cache._path("https://a.com/")
+        os.utime(path, (1_000, scraped_at))
+        self.assertEqual(await self.cache.get("https://a.com"), _context())
+        self.assertGreater(self._atime("https://a.com/"), 1_000)
+        self.assertEqual(await self.cache.scraped_at("https://a.com"), scraped_at)
+
+    async def test_least_recently_used_entry_is_evicted(self):
+        for url in ("https://a.com", "https://b.com"):
+            await self.cache.put(url, _context(url))
+        for url, atime in (("https://a.com/", 2_000), ("https://b.com/", 1_000)):
+            os.utime(self.cache._path(url), (atime, os.stat(self.cache._path(url)).st_mtime))
+        await self.cache.put("https://c.com", _context())
+        self.assertIsNotNone(await self.cache.get("https://a.com"))
+        self.assertIsNone(await self.cache.get("https://b.com"))
+        self.assertEqual(self.cache.stats["disk_evictions"], 1)
+
+    async def test_expired_entry_is_deleted_on_read(self):
+        await self.cache.put("https://a.com", _context())
+        self.cache.ttl_seconds = 0
+        self.assertIsNone(await self.cache.get("https://a.com"))
+        self.assertFalse(os.path.exists(self.cache._path("https://a.com/")))
+
+
+class GetOrScrapeTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        cache = ScrapeCache(tmp_dir.name, ttl_seconds=3600, max_memory_entries=10, max_disk_entries=10, max_disk_bytes=10**9)
+        patch = mock.patch.object(scrape_cache_service, "scrape_cache", cache)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.scrapes = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def _scrape(self, url):
+        self.scrapes += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return _context(url)
+
+    async def _until_waiting(self, count: int):
+        coalescer = scrape_cache_service.coalescing_service.reference_scrape_coalescer
+        while coalescer._waiters.get("https://a.com/", 0) < count:
+            await asyncio.sleep(0.001)
+
+    async def test_concurrent_misses_share_one_scrape(self):
+        waiters = [asyncio.create_task(scrape_cache_service.get_or_scrape(url, self._scrape))
+                   for url in ("https://a.com", "https://a.com/", "https://A.com")]
+        await self._until_waiting(3)
+        self.release.set()
+        results = await asyncio.gather(*waiters)
+        self.assertEqual(self.scrapes, 1)
+        self.assertEqual(len({result.simplified_html for result in results}), 1)
+        self.assertIsNotNone(await scrape_cache_service.scrape_cache.get("https://a.com"))
+
+    async def test_scrape_is_cancelled_when_all_waiters_are(self):
+        waiters = [asyncio.create_task(scrape_cache_service.get_or_scrape("https://a.com", self._scrape)) for _ in range(2)]
+        await self._until_waiting(2)
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        self.assertFalse(self.cancelled)
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        self.assertTrue(self.cancelled)
+        self.assertEqual(self.scrapes, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+# backend/tests/test_scraper_service.py
+# Checkpointed scrape steps, run against a fake browser page instead of Playwright.
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.core import config
+from app.services import scraper_service
+
+
+class _FakeBrowser:
+
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+
+class _FakePage:
+
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class ScrapeStepsTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.launches = 0
+        self.navigations = 0
+        self.calls = {step: 0 for step in scraper_service.ARTIFACT_STEPS}
+        # step -> outcomes of its successive calls: "ok", "fail", or "crash" (fails and loses the page)
+        self.outcomes: dict[str, list[str]] = {}
+        self._saved_stats = scraper_service.scrape_stats
+        scraper_service.scrape_stats = scraper_service.ScrapeStats()
+        patches = [
+            mock.patch.object(scraper_service, "_launch_page", self._launch_page),
+            mock.patch.object(scraper_service, "_navigate", self._navigate),
+            mock.patch.object(scraper_service, "_settle", self._settle),
+            mock.patch.object(config, "SCRAPE_STEP_RETRY_DELAY_SECONDS", 0),
+            mock.patch.dict(scraper_service._STEP_FUNCS, {step: self._step(step) for step in scraper_service.ARTIFACT_STEPS}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        scraper_service.scrape_stats = self._saved_stats
+
+    async def _launch_page(self, p):
+        self.launches += 1
+        return _FakeBrowser(), _FakePage()
+
+    async def _navigate(self, page, url):
+        self.navigations += 1
+
+    async def _settle(self, page, static):
+        pass
+
+    def _step(self, step):
+        async def run(page):
+            outcomes = self.outcomes.get(step, [])
+            outcome = outcomes[self.calls[step]] if self.calls[step] < len(outcomes) else "ok"
+            self.calls[step] += 1
+            if outcome == "crash":
+                page.closed = True
+            if outcome != "ok":
+                raise RuntimeError(f"{step} failed")
+            return f"{step}-artifact"
+        return run
+
+    async def _scrape(self, static_html=None, retries=None):
+        session = scraper_service._ScrapeSession(None, "https://example.com", static_html is not None, retries)
+        artifacts = {"simplified_html": static_html} if static_html is not None else {}
+        try:
+            await scraper_service._capture_artifacts(session, artifacts)
+        finally:
+            await session.close()
+        return scraper_service._scrape_result("https://example.com", artifacts, session.last_error)
+
+    async def test_all_steps_succeed(self):
+        context = await self._scrape()
+        self.assertFalse(context.degraded)
+        self.assertEqual(context.simplified_html, "html_extract-artifact")
+        self.assertEqual((self.launches, self.navigations), (1, 1))
+
+    async def test_resumes_from_checkpoint_after_page_loss(self):
+        self.outcomes = {"html_extract": ["crash", "ok"]}
+        context = await self._scrape()
+        self.assertFalse(context.degraded)
+        # The desktop screenshot taken before the crash is kept, not captured again.
+        self.assertEqual(self.calls, {"desktop_capture": 1, "html_extract": 2, "mobile_capture": 1})
+        self.assertEqual((self.launches, self.navigations), (2, 2))
+        stats = scraper_service.scrape_stats.snapshot()
+        self.assertEqual(stats["relaunches"], 1)
+        self.assertEqual(stats["artifacts_kept_on_retry"], 1)
+
+    async def test_failed_step_is_retried_without_renavigating(self):
+        self.outcomes = {"desktop_capture": ["fail", "ok"]}
+        await self._scrape()
+        self.assertEqual(self.calls["desktop_capture"], 2)
+        self.assertEqual((self.launches, self.navigations), (1, 1))
+
+    async def test_exhausted_step_returns_degraded_result(self):
+        self.outcomes = {"mobile_capture": ["fail"] * 5}
+        context = await self._scrape()
+        self.assertTrue(context.degraded)
+        self.assertEqual(context.missing_artifacts, ["mobile_screenshot"])
+        self.assertEqual(context.desktop_screenshot_base64, "desktop_capture-artifact")
+        self.assertEqual(self.calls["mobile_capture"], config.SCRAPE_STEP_RETRIES["mobile_capture"] + 1)
+        stats = scraper_service.scrape_stats.snapshot()
+        self.assertEqual(stats["degraded"], 1)
+        # Only failures followed by a retry keep artifacts; the final failure doesn't count.
+        self.assertEqual(stats["artifacts_kept_on_retry"], 2 * config.SCRAPE_STEP_RETRIES["mobile_capture"])
+
+    async def test_retries_override_applies_per_step(self):
+        self.outcomes = {"desktop_capture": ["fail"] * 5}
+        context = await self._scrape(retries=2)
+        self.assertEqual(self.calls["desktop_capture"], 3)
+        self.assertEqual(context.missing_artifacts, ["desktop_screenshot"])
+
+    async def test_static_html_is_not_extracted_again(self):
+        context = await self._scrape(static_html="<main>static</main>")
+        self.assertEqual(self.calls["html_extract"], 0)
+        self.assertEqual(context.simplified_html, "<main>static</main>")
+
+    async def test_nothing_captured_raises(self):
+        self.outcomes = {step: ["fail"] * 5 for step in scraper_service.ARTIFACT_STEPS}
+        with self.assertRaises(HTTPException) as raised:
+            await self._scrape()
+        self.assertEqual(raised.exception.status_code, 422)
+        self.assertEqual(scraper_service.scrape_stats.snapshot()["failed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+# backend/tests/test_static_probe_service.py
+import unittest
+
+from app.core import config
+from app.services import static_probe_service
+
+_PARAGRAPH = "<p>" + "Static sites render their content on the server. " * 10 + "</p>"
+
+
+def _page(body: str, head: str = "") -> str:
+    return f"<!DOCTYPE html><html><head><title>Site</title>{head}</head><body>{body}</body></html>"
+
+
+class ClassifyStaticHtmlTest(unittest.TestCase):
+
+    def test_content_rich_page_is_static(self):
+        is_static, signals = static_probe_service.classify_static_html(_page(f"<main><h1>Hello</h1>{_PARAGRAPH}</main>"))
+        self.assertTrue(is_static)
+        self.assertEqual(signals["reasons"], [])
+        self.assertGreaterEqual(signals["text_chars"], config.STATIC_PROBE_MIN_TEXT_CHARS)
+
+    def test_spa_shell_needs_browser(self):
+        html = _page('<div id="root"></div><script src="/static/js/main.js"></script>')
+        is_static, signals = static_probe_service.classify_static_html(html)
+        self.assertFalse(is_static)
+        self.assertEqual(signals["spa_markers"], ["empty_mount"])
+        self.assertTrue(any(reason.startswith("text_chars=") for reason in signals["reasons"]))
+
+    def test_framework_markers_win_over_text(self):
+        html = _page(f'<div id="__next">{_PARAGRAPH}</div><script id="__NEXT_DATA__" type="application/json">{{}}</script>')
+        is_static, signals = static_probe_service.classify_static_html(html)
+        self.assertFalse(is_static)
+        self.assertEqual(signals["reasons"], ["spa_markers=next"])
+
+    def test_noscript_text_is_not_visible_content(self):
+        html = _page(f'<noscript>{_PARAGRAPH}</noscript><div id="app" data-v-app><span>Loading</span></div>')
+        is_static, signals = static_probe_service.classify_static_html(html)
+        self.assertFalse(is_static)
+        self.assertLess(signals["text_chars"], config.STATIC_PROBE_MIN_TEXT_CHARS)
+
+    def test_script_heavy_page_needs_browser(self):
+        scripts = "".join(f'<script src="/chunk{i}.js"></script>' for i in range(config.STATIC_PROBE_MAX_EXTERNAL_SCRIPTS + 1))
+        inline = "<script>" + "x" * (config.STATIC_PROBE_MAX_INLINE_SCRIPT_BYTES + 1) + "</script>"
+        is_static, signals = static_probe_service.classify_static_html(_page(_PARAGRAPH + scripts + inline))
+        self.assertFalse(is_static)
+        self.assertEqual(signals["external_scripts"], config.STATIC_PROBE_MAX_EXTERNAL_SCRIPTS + 1)
+        self.assertEqual(len(signals["reasons"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()